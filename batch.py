@@ -0,0 +1,223 @@
+from array import array
+from functools import lru_cache
+import numpy as np
+
+"""
+Batch Clause Encoding
+
+Builds the clauses of regular constraint families as numpy integer arrays instead of a Python list per clause. A group
+of clauses with the same number of literals is a 2D array with a row per clause, the groups are joined into a flat
+0-terminated buffer (the layout of cnf.CNFEncoding.clauses) and added to a backend with a single add_clauses() call.
+Auxiliary variables are numbered in consecutive blocks with aux(count).
+
+The batch encodings write the same clauses as the scalar encodings of cardinality.py, in another order, so their
+clause estimates hold. They are used by cardinality.at_most_k() for large constraints, where the clauses outnumber the
+literals by a factor of k (i.e. the capacity of a section over every student wishing for the course).
+
+The clauses of an encoding only depend on the number of literals and the bound, so each encoding is built once per
+size as a template over the positions of its literals and auxiliary variables (see Template), and every constraint of
+that size is a single lookup of its literals in the template.
+
+Classes:
+- Template: The clauses of an encoding over placeholder variables.
+
+Functions:
+- clause_buffer(groups): Joins groups of clauses into a flat 0-terminated buffer.
+- add_groups(sink, groups): Adds groups of clauses to a backend.
+- template(encoding, n, k): Returns the template of an encoding over n literals.
+- pairwise(sink, literals): The pairwise at-most-one encoding.
+- sequential(sink, literals, k): The sequential counter.
+- totalizer(sink, literals, k): The truncated totalizer.
+"""
+
+#the number of templates kept per encoding, the sizes of the constraints of a cohort repeat
+TEMPLATES = 64
+
+def clause_buffer(groups):
+    """
+    Joins groups of clauses into a flat buffer with a 0 after every clause.
+
+    Args:
+        groups (list): 2D integer arrays, a row of literals per clause.
+
+    Returns:
+        tuple: The array('i') buffer, the number of clauses and a dictionary mapping the variables fixed by a unit clause
+            to their value.
+    """
+    parts = []
+    count = 0
+    units = {}
+    for group in groups:
+        if len(group) == 0:
+            continue
+        count += len(group)
+        if group.shape[1] == 1:
+            units.update((abs(int(literal)), bool(literal > 0)) for literal in group[:, 0])
+        parts.append(np.hstack([group, np.zeros((len(group), 1), dtype=group.dtype)]).ravel())
+    buffer = array("i")
+    if len(parts) > 0:
+        buffer.frombytes(np.concatenate(parts).astype(np.intc).tobytes())
+    return buffer, count, units
+
+def add_groups(sink, groups):
+    """
+    Adds groups of clauses to a backend implementing add_clauses(clauses, count, units).
+    """
+    buffer, count, units = clause_buffer(groups)
+    if count > 0:
+        sink.add_clauses(buffer, count, units)
+
+def _pairwise(sink, literals, k):
+    """
+    At most one of the literals, a binary clause per pair.
+    """
+    literals = np.asarray(literals, dtype=np.int64)
+    first, second = np.triu_indices(len(literals), 1)
+    add_groups(sink, [np.column_stack([-literals[first], -literals[second]])])
+
+def _sequential(sink, literals, k):
+    """
+    At most k of the literals, the sequential counter of Sinz. s[i][j] is true if at least j + 1 of the first i + 1
+    literals are true, numbered row by row in a block of (n - 1) * k auxiliary variables.
+    """
+    x = np.asarray(literals, dtype=np.int64)
+    n = len(x)
+    s = sink.aux((n - 1) * k) + np.arange((n - 1) * k, dtype=np.int64).reshape(n - 1, k)
+    inner = np.arange(1, n - 1) #the literals with a register before and after them
+
+    groups = [
+        -s[0, 1:, None], #the first register counts at most one
+        np.array([[-x[0], s[0, 0]], [-x[n - 1], -s[n - 2, k - 1]]]),
+        np.column_stack([-x[inner], s[inner, 0]]),
+        np.column_stack([-s[inner - 1, 0], s[inner, 0]]),
+        np.column_stack([-x[inner], -s[inner - 1, k - 1]]),
+    ]
+    if k > 1:
+        i, j = np.meshgrid(inner, np.arange(1, k), indexing="ij")
+        i, j = i.ravel(), j.ravel()
+        groups.append(np.column_stack([-s[i - 1, j], s[i, j]]))
+        groups.append(np.column_stack([-x[i], -s[i - 1, j - 1], s[i, j]]))
+    add_groups(sink, groups)
+
+class Template:
+    """
+    The clauses of an encoding over placeholder variables, 1 to n stand for the literals and n + 1 onwards for the
+    auxiliary variables. Also a clause sink, the encodings are built into it once.
+
+    Attributes:
+    - n: The number of literals.
+    - auxiliary: The number of auxiliary variables.
+    - clauses: The flat 0-terminated buffer of placeholder literals.
+    - count: The number of clauses.
+    - units: The placeholder literals of the unit clauses.
+    - outputs: The placeholders of the outputs of a totalizer tree, None for the other encodings.
+    """
+    def __init__(self, n):
+        self.n = n
+        self.auxiliary = 0
+        self.clauses = np.zeros(0, dtype=np.intc)
+        self.count = 0
+        self.units = np.zeros(0, dtype=np.intc)
+        self.outputs = None
+
+    def aux(self, count=1):
+        self.auxiliary += count
+        return self.n + self.auxiliary - count + 1
+
+    def add_clauses(self, clauses, count, units):
+        self.clauses = np.concatenate([self.clauses, np.frombuffer(clauses, dtype=np.intc)])
+        self.count += count
+        self.units = np.concatenate([self.units, np.array([variable if value else -variable for variable, value in units.items()], dtype=np.intc)])
+
+    def instantiate(self, sink, literals):
+        """
+        Adds the clauses of the template over the literals to a backend, with new auxiliary variables.
+
+        Returns:
+            numpy.ndarray: The literals of the outputs of a totalizer tree, None for the other encodings.
+        """
+        first = sink.aux(self.auxiliary) if self.auxiliary > 0 else 0
+        values = np.concatenate([[0], np.asarray(literals, dtype=np.int64), first + np.arange(self.auxiliary, dtype=np.int64)])
+        if self.count > 0:
+            clauses = np.sign(self.clauses) * values[np.abs(self.clauses)]
+            units = np.sign(self.units) * values[np.abs(self.units)]
+            buffer = array("i")
+            buffer.frombytes(clauses.astype(np.intc).tobytes())
+            sink.add_clauses(buffer, self.count, {abs(int(literal)): bool(literal > 0) for literal in units})
+        return None if self.outputs is None else values[self.outputs]
+
+@lru_cache(maxsize=TEMPLATES)
+def _tree(n, k):
+    """
+    Returns the template of a totalizer tree over n literals, output i is true if at least i + 1 of the literals are
+    true. The subtrees are instantiated from their own templates, a tree has at most two sizes of subtrees per level,
+    and the auxiliary variables are numbered in the order of cardinality._totalize().
+    """
+    built = Template(n)
+    if n == 1:
+        built.outputs = np.array([1])
+        return built
+
+    literals = np.arange(1, n + 1, dtype=np.int64)
+    middle = n // 2
+    left = _tree(middle, k).instantiate(built, literals[:middle])
+    right = _tree(n - middle, k).instantiate(built, literals[middle:])
+    size = min(n, k + 1)
+    outputs = built.aux(size) + np.arange(size, dtype=np.int64)
+
+    #a true left (right) output i implies output i, and a true left output i with a true right output j implies output i + j + 1
+    groups = []
+    for child in (left, right):
+        reach = min(len(child), size)
+        groups.append(np.column_stack([outputs[:reach], -child[:reach]]))
+    i, j = np.meshgrid(np.arange(1, len(left) + 1), np.arange(1, len(right) + 1), indexing="ij")
+    keep = (i + j <= size).ravel()
+    i, j = i.ravel()[keep], j.ravel()[keep]
+    groups.append(np.column_stack([outputs[i + j - 1], -left[i - 1], -right[j - 1]]))
+    add_groups(built, groups)
+    built.outputs = outputs
+    return built
+
+def _totalizer(sink, literals, k):
+    """
+    At most k of the literals, the totalizer of Bailleux and Boufkhad with outputs truncated at k + 1.
+    """
+    outputs = _tree(len(literals), k).instantiate(sink, literals)
+    add_groups(sink, [np.array([[-outputs[k]]])])
+
+BUILDERS = {"pairwise": _pairwise, "sequential": _sequential, "totalizer": _totalizer}
+
+@lru_cache(maxsize=TEMPLATES)
+def template(encoding, n, k):
+    """
+    Returns the template of an encoding over n literals, built once per size.
+
+    Args:
+        encoding (str): One of "pairwise" (k is 1), "sequential" or "totalizer".
+        n (int): The number of literals.
+        k (int): The bound.
+
+    Returns:
+        Template: The clauses of the encoding over placeholder variables.
+    """
+    built = Template(n)
+    BUILDERS[encoding](built, np.arange(1, n + 1, dtype=np.int64), k)
+    return built
+
+def pairwise(sink, literals):
+    """
+    At most one of the literals, a binary clause per pair.
+    """
+    template("pairwise", len(literals), 1).instantiate(sink, literals)
+
+def sequential(sink, literals, k):
+    """
+    At most k of the literals, the sequential counter of Sinz.
+    """
+    template("sequential", len(literals), k).instantiate(sink, literals)
+
+def totalizer(sink, literals, k):
+    """
+    At most k of the literals, the totalizer of Bailleux and Boufkhad with outputs truncated at k + 1.
+    """
+    template("totalizer", len(literals), k).instantiate(sink, literals)
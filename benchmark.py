@@ -0,0 +1,593 @@
+import os, sys
+import json
+import time
+import random
+import math
+import tempfile
+import importlib
+
+import numpy as np
+
+import nnf
+from bauhaus import Encoding, proposition
+
+import datalayer
+import sat_solver
+import cnf
+import cardinality
+import conflicts
+import estimator
+import executor
+import preprocessing
+import profiles
+import pruning
+import utils
+
+"""
+Benchmarks for the theory builder on synthetic student cohorts.
+
+A synthetic cohort reuses the course catalog (courses, sections and requirements) of a test data set and replaces its
+students with generated ones, so the builder can be profiled at cohort scale.
+"""
+
+USAGE = '\n\tpython3 benchmark.py build [students]\n\tpython3 benchmark.py students [students]\n\tpython3 benchmark.py workers [students]\n\tpython3 benchmark.py cardinality [students]\n\tpython3 benchmark.py requirements [rules]\n\tpython3 benchmark.py constants\n\tpython3 benchmark.py preprocessing [students]\n\tpython3 benchmark.py estimator [students]\n\tpython3 benchmark.py components [students]\n\tpython3 benchmark.py executor [rounds]\n'
+CATALOG = "data/testing/test-medium-friendship"
+
+def synthetic_cohort(location=CATALOG, count=100, wishes=5, friend_rate=0.0, seed=204, seat_slack=None, unrestricted=False):
+    """
+    Creates a data layer with a synthetic cohort of students on the catalog of a test data set.
+
+    Args:
+        location (str, optional): The location of the test data set providing the catalog.
+        count (int, optional): The number of students to generate.
+        wishes (int, optional): The number of courses each student wishes to take.
+        friend_rate (float, optional): The probability that two students are friends sharing all common courses.
+        seed (int, optional): The random seed of the cohort.
+        seat_slack (float, optional): Leaves every section seats for seat_slack times its share of the students wishing
+            for the course, by default the catalog enrolment is kept.
+        unrestricted (bool, optional): Only wish for courses without prerequisite, corequisite or exclusion rules.
+
+    Returns:
+        dict: a dictionary containting the Courses, Departments, Students, Requirements data objects
+    """
+    objects = utils.create_data_layer(location)
+    rng = random.Random(seed)
+
+    #full year courses (i.e. MATH-110A and MATH-110B) are wished for by their shared course code
+    offered = set()
+    for course in datalayer.Courses.ALLCOURSES:
+        if len(course.sections) == 0:
+            continue
+        if unrestricted and isinstance(course.requirements, datalayer.CourseRequirement) and any(course.requirements[rule].criteria != "NONE" for rule in ["PREREQUISITE", "COREQUISITE", "EXCLUSION"]):
+            continue
+        if course.id[-1] in "AB" and course.id[:-1] + "A" in datalayer.Courses.ALLCOURSES and course.id[:-1] + "B" in datalayer.Courses.ALLCOURSES:
+            offered.add(course.id[:-1])
+        else:
+            offered.add(course.id)
+    offered = sorted(offered)
+
+    student_data = []
+    for index in range(count):
+        student_data.append({
+            "name": f"Synthetic{index}",
+            "academic_year": "FIRSTYEAR",
+            "program": "COMPSCI",
+            "completed_courses": [],
+            "course_wish_list": rng.sample(offered, min(wishes, len(offered))),
+            "friends": [],
+        })
+
+    if friend_rate > 0:
+        for index, student in enumerate(student_data):
+            for other in student_data[index + 1:]:
+                if rng.random() < friend_rate:
+                    shared = [c for c in student["course_wish_list"] if c in other["course_wish_list"]]
+                    student["friends"].append({"name": other["name"], "shared_courses": shared})
+                    other["friends"].append({"name": student["name"], "shared_courses": shared})
+
+    with tempfile.TemporaryDirectory() as directory:
+        students_file = os.path.join(directory, "students.json")
+        with open(students_file, "w") as file:
+            json.dump(student_data, file)
+        objects["students"] = datalayer.mapStudents(students_file)
+
+    if seat_slack is not None:
+        for course in datalayer.Courses.ALLCOURSES:
+            wishing = sum(1 for student in student_data if course.id in student["course_wish_list"] or course.id[:-1] in student["course_wish_list"])
+            sections = list(course.sections)
+            for section in sections:
+                section.enrollment_total = max(0, section.enrollment_capacity - math.ceil(seat_slack * wishing / len(sections)))
+
+    return objects
+
+def fresh_solver():
+    """
+    Reloads the sat_solver module so that every benchmark run starts from an empty encoding.
+
+    Returns:
+        module: The reloaded sat_solver module.
+    """
+    return importlib.reload(sat_solver)
+
+def profile_build(objects, backend="nnf"):
+    """
+    Measures the time it takes to build and compile the theory of a data layer.
+
+    Args:
+        objects (dict): A dictionary of datalayer collections.
+        backend (str, optional): The encoding backend, "nnf" or "cnf".
+
+    Returns:
+        dict: The build and compile times in seconds and the number of propositions and constraints created.
+    """
+    solver = fresh_solver()
+    start = time.perf_counter()
+    T = solver.build_theory(objects, backend)
+    built = time.perf_counter()
+    if backend == "nnf":
+        T.compile()
+    compiled = time.perf_counter()
+
+    return {
+        "students": len(objects["students"]),
+        "backend": backend,
+        "build_seconds": round(built - start, 3),
+        "compile_seconds": round(compiled - built, 3),
+        "propositions": len(solver.B.variables), #the propositions of the theory
+        "constraints": len(solver.E._custom_constraints) + len(solver.E.constraints) if backend == "nnf" else T.clause_count,
+    }
+
+def benchmark_build(sizes):
+    for size in sizes:
+        for backend in ["nnf", "cnf"]:
+            print(profile_build(synthetic_cohort(count=size), backend))
+
+def benchmark_students(sizes, backend="cnf"):
+    """
+    Measures the time spent on the constraints of each student of synthetic cohorts, see sat_solver.BUILD_TIMES, and
+    reports the slowest student. The cohort constraints (section capacities and friendships) are built after the students.
+    """
+    for size in sizes:
+        objects = synthetic_cohort(count=size, friend_rate=0.01)
+        solver = fresh_solver()
+        start = time.perf_counter()
+        solver.build_theory(objects, backend)
+        built = time.perf_counter()
+
+        times = sorted(solver.BUILD_TIMES.values())
+        slowest = max(solver.BUILD_TIMES, key=solver.BUILD_TIMES.get)
+        print({
+            "students": size,
+            "backend": backend,
+            "build_seconds": round(built - start, 3),
+            "student_seconds": round(sum(times), 3),
+            "mean_ms": round(1000 * sum(times) / len(times), 3),
+            "median_ms": round(1000 * times[len(times) // 2], 3),
+            "p95_ms": round(1000 * times[int(len(times) * 0.95)], 3),
+            "max_ms": round(1000 * times[-1], 3),
+            "slowest": slowest,
+        })
+
+def benchmark_workers(sizes, counts=(1, 2, 4, 8), backend="cnf"):
+    """
+    Measures the build time of synthetic cohorts with the students sharded across worker processes, see
+    sat_solver.build_theory(). The section capacities and friendships are built by the parent process.
+    """
+    for size in sizes:
+        objects = synthetic_cohort(count=size, friend_rate=0.01)
+        for workers in counts:
+            solver = fresh_solver()
+            offerings = pruning.prune(objects)
+            start = time.perf_counter()
+            T = solver.build_theory(objects, backend, offerings=offerings, workers=workers)
+            built = time.perf_counter()
+
+            print({
+                "students": size,
+                "workers": workers,
+                "cpus": os.cpu_count(),
+                "build_seconds": round(built - start, 3),
+                "student_seconds": round(sum(solver.BUILD_TIMES.values()), 3),
+                "clauses": T.clause_count if backend == "cnf" else len(solver.B.clauses.clauses),
+            })
+
+def benchmark_components(sizes, backends=("cnf", "nnf"), degree=0.5):
+    """
+    Measures the time to solve loosely coupled synthetic cohorts as a single theory and as a theory per independent
+    component, see decomposition.py. Every section is given a seat for every student of the cohort and every student
+    has degree friends on average, so the friends are the only students that interact.
+    """
+    for size in sizes:
+        objects = synthetic_cohort(count=size, wishes=3, friend_rate=degree / size, unrestricted=True)
+        for section in datalayer.Sections.ALLSECTIONS:
+            section.enrollment_capacity = max(section.enrollment_capacity, section.enrollment_total + size)
+        conflicts.index_offerings(objects["students"], pruning.prune(objects)) #parse the meetings of the sections once, before timing
+        for backend in backends:
+            for decompose in [False, True]:
+                solver = fresh_solver()
+                start = time.perf_counter()
+                result = solver.execute(objects, backend, screen=False, decompose=decompose)
+                solved = time.perf_counter()
+                print({
+                    "students": size,
+                    "backend": backend,
+                    "decompose": decompose,
+                    "parts": len(result["Components"]),
+                    "largest": max(result["Components"]),
+                    "seconds": round(solved - start, 3),
+                    "satisfiable": result["Solution"] is not None,
+                })
+
+def benchmark_executor(rounds=5, counts=(1, 2, 4, 8), backends=("cnf", "nnf"), location="tests.config.json"):
+    """
+    Measures the throughput of executor.SolverExecutor on the test cases. The theory of every test case is prepared once
+    as sat_solver.execute() solves it (see sat_solver.prepare_theory()) and submitted rounds times to a pool of 1, 2, 4
+    and 8 worker processes, against solving every theory in this thread. The pool is started before timing.
+
+    Args:
+        rounds (int, optional): The number of times every theory is solved.
+        counts (list, optional): The numbers of worker processes.
+        backends (list, optional): The encoding backends.
+        location (str, optional): The test case configuration file.
+    """
+    with open(location, "r") as file:
+        cases = json.load(file)
+
+    for backend in backends:
+        theories = []
+        for case in cases:
+            try:
+                objects = utils.create_data_layer(case["location"])
+                solver = fresh_solver()
+                theories.append(solver.prepare_theory(objects, backend, cohort_profiles=solver.find_cohort_profiles(objects, utils.get_multiplicity_preference())))
+            except (FileNotFoundError, SystemExit) as error: #a test case without clauses is not solved
+                print({"test": case["test"], "backend": backend, "skipped": str(error) or "no clauses"})
+        jobs = theories * rounds
+
+        start = time.perf_counter()
+        solutions = [T.solve() for T in jobs]
+        solved = time.perf_counter()
+        print({"backend": backend, "workers": 0, "cpus": os.cpu_count(), "solves": len(jobs), "seconds": round(solved - start, 3), "solves_per_second": round(len(jobs) / (solved - start), 1)})
+        expected = [solution is not None for solution in solutions]
+
+        for workers in counts:
+            with executor.SolverExecutor(workers) as pool:
+                pool.solve(jobs[0]) #the workers are started
+                start = time.perf_counter()
+                solutions = [future.result() for future in [pool.submit(T) for T in jobs]]
+                solved = time.perf_counter()
+            print({
+                "backend": backend,
+                "workers": workers,
+                "cpus": os.cpu_count(),
+                "solves": len(jobs),
+                "seconds": round(solved - start, 3),
+                "solves_per_second": round(len(jobs) / (solved - start), 1),
+                "same": [solution is not None for solution in solutions] == expected,
+            })
+
+def benchmark_cardinality(sizes, wishes=3):
+    """
+    Compares the cardinality encodings on synthetic cohorts competing for limited seats, every section has seats for
+    10% more than its share of the students wishing for the course.
+
+    The pairwise encoding of at most k constraints grows with the binomial coefficient (n choose k + 1), so the capacity
+    family is left on "auto" when the other families are pairwise.
+    """
+    for size in sizes:
+        for encoding in cardinality.ENCODINGS:
+            encodings = {family: encoding for family in cardinality.DEFAULT_FAMILIES}
+            if encoding == "pairwise":
+                encodings["capacity"] = "auto"
+
+            objects = synthetic_cohort(count=size, wishes=wishes, seat_slack=1.1, unrestricted=True)
+            solver = fresh_solver()
+            start = time.perf_counter()
+            T = solver.build_theory(objects, "cnf", encodings)
+            built = time.perf_counter()
+            solution = T.solve()
+            solved = time.perf_counter()
+
+            print({
+                "students": size,
+                "encoding": encoding,
+                "variables": len(T.labels) - 1,
+                "clauses": T.clause_count,
+                "build_seconds": round(built - start, 3),
+                "solve_seconds": round(solved - built, 3),
+                "satisfiable": solution is not None,
+            })
+
+#a proposition per course code of a catalog rule, only used to measure the encoding of the rules
+RULES = Encoding()
+
+@proposition(RULES)
+class RuleCourse:
+    def __init__(self, code):
+        self.code = code
+
+    def __repr__(self):
+        return self.code
+
+def parse_rule(rule):
+    """
+    Parses a catalog rule into a bauhaus formula over RuleCourse propositions, the way sat_solver maps the rules.
+
+    Args:
+        rule (str): A requirement rule, i.e. "(CISC-101 OR CISC-121) AND MATH-110".
+
+    Returns:
+        tuple: The parsed datalayer.RequirementRule and the formula of the rule.
+    """
+    parsed = datalayer.RequirementRule.parse(rule)
+    courses = {code: RuleCourse(code) for code in parsed.courses}
+    return parsed, parsed.instantiate(courses.__getitem__)
+
+def distributed_clauses(formula, positive=True):
+    """
+    Returns the number of clauses of the CNF of a formula (or its negation) when OR is distributed over AND.
+    """
+    typ = getattr(formula, "typ", None)
+    if typ is None or typ == "var":
+        return 1
+    if typ == "not":
+        return distributed_clauses(formula.args[0], not positive)
+    children = [distributed_clauses(arg, positive) for arg in formula.args]
+    if (typ == "and") == positive:
+        return sum(children)
+    return math.prod(children)
+
+def benchmark_requirements(count=10, location="data/reference/requirements.json"):
+    """
+    Measures the CNF size of the equivalence requirement_met <-> rule for the catalog rules with the largest distributed
+    CNF, comparing distribution of OR over AND with the Tseitin definitions of tseitin.py.
+
+    Args:
+        count (int, optional): The number of rules to report.
+        location (str, optional): The requirements.json file of the catalog.
+    """
+    with open(location, "r") as file:
+        catalog = json.load(file)
+
+    measured = []
+    malformed = 0
+    for course in catalog:
+        for requirement in course["requirements"]:
+            if requirement["type"] not in ["PREREQUISITE", "COREQUISITE", "EXCLUSION"] or requirement["criteria"] == "NONE":
+                continue
+            try:
+                parsed, formula = parse_rule(requirement["criteria"])
+            except ValueError:
+                malformed += 1
+                continue
+
+            T = cnf.CNFEncoding()
+            T.add_equivalence("met", formula)
+            measured.append({
+                "course": course["id"],
+                "type": requirement["type"],
+                "atoms": len(parsed.courses),
+                "distributed_clauses": distributed_clauses(formula, True) + distributed_clauses(formula, False),
+                "tseitin_clauses": T.clause_count,
+                "tseitin_definitions": len(T.definitions),
+            })
+
+    print(f"{len(measured)} rules measured, {malformed} malformed rules skipped")
+    for rule in sorted(measured, key=lambda rule: -rule["distributed_clauses"])[:count]:
+        print(rule)
+
+def benchmark_constants(location="tests.config.json"):
+    """
+    Measures the variables and clauses removed by the constant propagation of cnf.CNFEncoding.simplify() on every test case.
+
+    Args:
+        location (str, optional): The test case configuration file.
+    """
+    with open(location, "r") as file:
+        cases = json.load(file)
+
+    for case in cases:
+        try:
+            objects = utils.create_data_layer(case["location"])
+        except FileNotFoundError as error:
+            print({"test": case["test"], "skipped": str(error)})
+            continue
+        solver = fresh_solver()
+        T = solver.build_theory(objects, "cnf")
+        start = time.perf_counter()
+        reduction = T.simplify()
+        simplified = time.perf_counter()
+
+        print({
+            "test": case["test"],
+            "variables": f"{reduction['before']['variables']} -> {reduction['after']['variables']}",
+            "clauses": f"{reduction['before']['clauses']} -> {reduction['after']['clauses']}",
+            "simplify_seconds": round(simplified - start, 4),
+            "contradiction": T.contradiction,
+        })
+
+def benchmark_preprocessing(sizes=(), location="tests.config.json"):
+    """
+    Compares the constant propagation alone with the full preprocessing of cnf.CNFEncoding.simplify() (see
+    preprocessing.py) on every test case and on synthetic cohorts, by the size of the simplified theory and the time
+    to simplify and solve it.
+
+    Args:
+        sizes (list, optional): The numbers of students of the synthetic cohorts.
+        location (str, optional): The test case configuration file.
+    """
+    with open(location, "r") as file:
+        cases = json.load(file)
+
+    datasets = []
+    for case in cases:
+        try:
+            datasets.append((case["test"], lambda case=case: utils.create_data_layer(case["location"])))
+        except FileNotFoundError as error:
+            print({"test": case["test"], "skipped": str(error)})
+    for size in sizes:
+        datasets.append((f"synthetic-{size}", lambda size=size: synthetic_cohort(count=size, wishes=3, seat_slack=2, unrestricted=True)))
+
+    for name, create in datasets:
+        try:
+            objects = create()
+        except FileNotFoundError as error:
+            print({"test": name, "skipped": str(error)})
+            continue
+        measured = {}
+        for label, techniques in [("constants", ["propagate"]), ("preprocessed", preprocessing.TECHNIQUES)]:
+            solver = fresh_solver()
+            T = solver.build_theory(objects, "cnf")
+            start = time.perf_counter()
+            reduction = T.simplify(techniques)
+            simplified = time.perf_counter()
+            solution = T.solve()
+            solved = time.perf_counter()
+            measured[label] = {
+                "variables": reduction["after"]["variables"],
+                "clauses": reduction["after"]["clauses"],
+                "simplify_seconds": round(simplified - start, 4),
+                "solve_seconds": round(solved - simplified, 4),
+                "satisfiable": solution is not None,
+            }
+        measured["preprocessed"]["techniques"] = reduction["techniques"]
+        print({"test": name, "before": reduction["before"], **measured})
+
+def measure_cohort(objects, backend):
+    """
+    Measures the theory of a data layer as sat_solver.execute() builds it (pruned, with the students of identical
+    profiles encoded once, without screening), and the time to build and solve it.
+
+    Returns:
+        dict: The variables and clauses of the theory before it is simplified, and the build and solve seconds.
+    """
+    solver = fresh_solver()
+    start = time.perf_counter()
+    offerings = pruning.prune(objects)
+    cohort_profiles = profiles.find_profiles(objects["students"], solver.reciprocal_friendships(objects["students"]), objects.get("groups"))
+    T = solver.build_theory(objects, backend, None, offerings, "auto", cohort_profiles)
+    built = time.perf_counter()
+    if backend == "cnf":
+        variables, clauses = len(T.labels) - 1, T.clause_count
+        if clauses > 0:
+            T.simplify(["propagate"])
+            T.solve()
+    elif len(T.propositions) > 0: #bauhaus does not compile a theory without propositions
+        T = T.compile()
+        T = nnf.And(clause for clauses in T.children for clause in clauses.children)
+        variables, clauses = len(T.vars()), len(T.children)
+        T.solve()
+    else:
+        variables, clauses = 0, 0
+    solved = time.perf_counter()
+    return {"variables": variables, "clauses": clauses, "build": built - start, "solve": solved - built}
+
+def fit(rows, targets):
+    """
+    Fits non-negative coefficients of a linear model by least squares, dropping the features with a negative
+    coefficient until none are left.
+
+    Args:
+        rows (list): The feature values of every sample, a list per sample.
+        targets (list): The measured value of every sample.
+
+    Returns:
+        list: The coefficient of every feature.
+    """
+    rows = np.array(rows, dtype=float)
+    targets = np.array(targets, dtype=float)
+    active = list(range(rows.shape[1]))
+    coefficients = np.zeros(rows.shape[1])
+    while len(active) > 0:
+        solution = np.linalg.lstsq(rows[:, active], targets, rcond=None)[0]
+        if (solution >= 0).all():
+            coefficients[active] = solution
+            break
+        active = [feature for feature, value in zip(active, solution) if value >= 0]
+    return coefficients.tolist()
+
+def benchmark_estimator(sizes=(50, 100, 200, 400), nnf_limit=400, location="tests.config.json"):
+    """
+    Calibrates the cost model of estimator.py on the test cases and on synthetic cohorts with and without friends and
+    with plenty of seats or the catalog enrolment. Prints the error of the current MODEL on every data set and the
+    fitted MODEL, to be copied into estimator.py.
+
+    Args:
+        sizes (list, optional): The numbers of students of the synthetic cohorts.
+        nnf_limit (int, optional): The largest synthetic cohort measured with the nnf backend.
+        location (str, optional): The test case configuration file.
+    """
+    with open(location, "r") as file:
+        cases = json.load(file)
+
+    datasets = [(case["test"], lambda case=case: utils.create_data_layer(case["location"]), True) for case in cases]
+    for size in sizes:
+        for wishes, friend_rate, seat_slack in [(3, 0.0, 2), (5, 0.0, None), (5, 0.01, 2)]:
+            datasets.append((
+                f"synthetic-{size}-{wishes}-{friend_rate}-{seat_slack}",
+                lambda size=size, wishes=wishes, friend_rate=friend_rate, seat_slack=seat_slack: synthetic_cohort(count=size, wishes=wishes, friend_rate=friend_rate, seat_slack=seat_slack, unrestricted=True),
+                size <= nnf_limit,
+            ))
+
+    samples = {backend: [] for backend in ["cnf", "nnf"]}
+    for name, create, with_nnf in datasets:
+        for backend in ["cnf", "nnf"] if with_nnf else ["cnf"]:
+            try:
+                objects = create()
+            except FileNotFoundError as error:
+                print({"test": name, "skipped": str(error)})
+                break
+            statistics = estimator.cohort_statistics(objects)
+            measured = measure_cohort(objects, backend)
+            predicted = estimator.Estimate(statistics, backend)
+            samples[backend].append(([statistics[feature] for feature in estimator.FEATURES], measured))
+            print({
+                "test": name,
+                "backend": backend,
+                "variables": f"{measured['variables']} (predicted {predicted.variables})",
+                "clauses": f"{measured['clauses']} (predicted {predicted.clauses})",
+                "build": f"{measured['build']:.3f}s (predicted {predicted.build_seconds:.3f}s)",
+                "solve": f"{measured['solve']:.3f}s (predicted {predicted.solve_seconds:.3f}s)",
+            })
+
+    #the sizes are fitted on the cnf theories, the nnf backend writes the same clauses
+    rows = [row for row, measured in samples["cnf"]]
+    model = {
+        "variables": fit(rows, [measured["variables"] for row, measured in samples["cnf"]]),
+        "clauses": fit(rows, [measured["clauses"] for row, measured in samples["cnf"]]),
+    }
+    for backend in ["cnf", "nnf"]:
+        rows = [row for row, measured in samples[backend]]
+        model[f"{backend}_build"] = fit(rows, [measured["build"] for row, measured in samples[backend]])
+        model[f"{backend}_solve"] = fit(rows, [measured["solve"] for row, measured in samples[backend]])
+
+    print("MODEL = {")
+    for target, coefficients in model.items():
+        print(f'    "{target}": {{' + ", ".join(f'"{feature}": {coefficient:.4g}' for feature, coefficient in zip(estimator.FEATURES, coefficients)) + "},")
+    print("}")
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2 or sys.argv[1] not in ['build', 'students', 'workers', 'cardinality', 'requirements', 'constants', 'preprocessing', 'estimator', 'components', 'executor']:
+        print(USAGE)
+        exit(1)
+    sizes = [int(size) for size in sys.argv[2:]] or [10, 50, 100]
+    if sys.argv[1] == 'build':
+        benchmark_build(sizes)
+    elif sys.argv[1] == 'students':
+        benchmark_students(sizes)
+    elif sys.argv[1] == 'workers':
+        benchmark_workers(sizes)
+    elif sys.argv[1] == 'cardinality':
+        benchmark_cardinality(sizes)
+    elif sys.argv[1] == 'requirements':
+        benchmark_requirements(*sizes)
+    elif sys.argv[1] == 'constants':
+        benchmark_constants()
+    elif sys.argv[1] == 'preprocessing':
+        benchmark_preprocessing([int(size) for size in sys.argv[2:]])
+    elif sys.argv[1] == 'estimator':
+        benchmark_estimator([int(size) for size in sys.argv[2:]] or [50, 100, 200, 400])
+    elif sys.argv[1] == 'components':
+        benchmark_components([int(size) for size in sys.argv[2:]] or [500, 1000, 2000, 4000])
+    elif sys.argv[1] == 'executor':
+        benchmark_executor(*[int(rounds) for rounds in sys.argv[2:3]])
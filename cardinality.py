@@ -0,0 +1,253 @@
+from functools import lru_cache
+from math import comb
+import batch
+
+"""
+Cardinality Encodings
+
+Encodes at-most-one, exactly-one and at-most-k constraints over integer literals. The encodings only need a clause
+sink with four methods, so they are shared by both encoding backends (sat_solver.NNFBackend and cnf.CNFEncoding):
+- var(proposition): Returns the integer variable of a proposition.
+- aux(count): Returns a new auxiliary variable, or the first of count consecutive ones.
+- add_literals(literals): Adds a clause of integer literals.
+- add_clauses(clauses, count, units): Adds a flat 0-terminated buffer of clauses.
+
+Encodings:
+- pairwise: A binary clause per pair (at most one), or a clause per set of k + 1 literals (at most k). No auxiliary variables.
+- sequential: The sequential counter of Sinz, O(n * k) clauses and auxiliary variables.
+- totalizer: The totalizer of Bailleux and Boufkhad with outputs truncated at k + 1, O(n * k) clauses and O(n log n) auxiliary variables.
+- commander: The commander encoding of Klieber and Kwon with groups of 3, O(n) clauses, at most one only.
+- auto: The encoding with the fewest clauses for the size of the group.
+
+Constraints of at least BATCH_CLAUSES clauses are encoded with the numpy encodings of batch.py, that write the same
+clauses without a Python list per clause.
+"""
+
+ENCODINGS = ["pairwise", "sequential", "totalizer", "commander", "auto"]
+
+#the cardinality encoding of each constraint family of sat_solver, overridden by "cardinality_encodings" in config.json
+DEFAULT_FAMILIES = {
+    "term": "auto", #a course is taken in at most one term
+    "section": "auto", #a course is taken in at most one section of a term
+    "capacity": "auto", #a section enrols at most as many students as it has seats left
+    "group": "auto", #a group of friends or a study group meets in at most one section of a course
+}
+
+COMMANDER_GROUP = 3
+
+#the number of clauses from which a pairwise, sequential or totalizer constraint is encoded by batch.py
+BATCH_CLAUSES = 256
+
+#CLAUSE ESTIMATES
+#region
+@lru_cache(maxsize=None)
+def _totalizer_clauses(n, k):
+    """
+    Returns the number of clauses of a truncated totalizer over n literals, excluding the final unit clause.
+    """
+    if n <= 1:
+        return 0
+    left, right = n // 2, n - n // 2
+    outputs = min(n, k + 1)
+    clauses = _totalizer_clauses(left, k) + _totalizer_clauses(right, k)
+    for i in range(min(left, k + 1) + 1):
+        for j in range(min(right, k + 1) + 1):
+            if 1 <= i + j <= outputs:
+                clauses += 1
+    return clauses
+
+@lru_cache(maxsize=None)
+def _commander_clauses(n):
+    """
+    Returns the number of clauses of a commander at-most-one over n literals.
+    """
+    if n <= COMMANDER_GROUP + 1:
+        return comb(n, 2)
+    groups = [min(COMMANDER_GROUP, n - start) for start in range(0, n, COMMANDER_GROUP)]
+    return sum(comb(size, 2) + size for size in groups) + _commander_clauses(len(groups))
+
+def estimate_clauses(encoding, n, k):
+    """
+    Returns the number of clauses an encoding adds for an at-most-k constraint over n literals.
+
+    Args:
+        encoding (str): One of "pairwise", "sequential", "totalizer" or "commander".
+        n (int): The number of literals.
+        k (int): The bound.
+
+    Returns:
+        int or float: The number of clauses, or infinity if the encoding does not support the bound.
+    """
+    if k >= n:
+        return 0
+    if k <= 0:
+        return n
+    if encoding == "pairwise":
+        return comb(n, k + 1)
+    if encoding == "sequential":
+        return 2 * n * k + n - 3 * k - 1
+    if encoding == "totalizer":
+        return _totalizer_clauses(n, k) + 1
+    if encoding == "commander":
+        return _commander_clauses(n) if k == 1 else float("inf")
+    raise ValueError(f"Unknown cardinality encoding {encoding}")
+
+def select_encoding(n, k):
+    """
+    Returns the encoding with the fewest clauses for an at-most-k constraint over n literals, preferring encodings
+    without auxiliary variables on ties.
+
+    Args:
+        n (int): The number of literals.
+        k (int): The bound.
+
+    Returns:
+        str: The selected encoding.
+    """
+    return min(["pairwise", "commander", "sequential", "totalizer"], key=lambda encoding: estimate_clauses(encoding, n, k))
+#endregion
+
+#ENCODINGS
+#region
+def _pairwise(sink, literals, k):
+    from itertools import combinations
+    for chosen in combinations(literals, k + 1):
+        sink.add_literals([-literal for literal in chosen])
+
+def _sequential(sink, literals, k):
+    n = len(literals)
+    #s[i][j] is true if at least j + 1 of the first i + 1 literals are true
+    s = [[sink.aux() for j in range(k)] for i in range(n - 1)]
+
+    sink.add_literals([-literals[0], s[0][0]])
+    for j in range(1, k):
+        sink.add_literals([-s[0][j]])
+
+    for i in range(1, n - 1):
+        sink.add_literals([-literals[i], s[i][0]])
+        sink.add_literals([-s[i - 1][0], s[i][0]])
+        for j in range(1, k):
+            sink.add_literals([-literals[i], -s[i - 1][j - 1], s[i][j]])
+            sink.add_literals([-s[i - 1][j], s[i][j]])
+        sink.add_literals([-literals[i], -s[i - 1][k - 1]])
+
+    sink.add_literals([-literals[n - 1], -s[n - 2][k - 1]])
+
+def _totalize(sink, literals, k):
+    """
+    Returns the unary outputs of a totalizer tree, output i is true if at least i + 1 of the literals are true.
+    """
+    if len(literals) == 1:
+        return list(literals)
+
+    middle = len(literals) // 2
+    left = _totalize(sink, literals[:middle], k)
+    right = _totalize(sink, literals[middle:], k)
+    outputs = [sink.aux() for count in range(min(len(literals), k + 1))]
+
+    for i in range(len(left) + 1):
+        for j in range(len(right) + 1):
+            if 1 <= i + j <= len(outputs):
+                clause = [outputs[i + j - 1]]
+                if i > 0:
+                    clause.append(-left[i - 1])
+                if j > 0:
+                    clause.append(-right[j - 1])
+                sink.add_literals(clause)
+    return outputs
+
+def _totalizer(sink, literals, k):
+    outputs = _totalize(sink, literals, k)
+    sink.add_literals([-outputs[k]])
+
+def _commander(sink, literals):
+    if len(literals) <= COMMANDER_GROUP + 1:
+        _pairwise(sink, literals, 1)
+        return
+
+    commanders = []
+    for start in range(0, len(literals), COMMANDER_GROUP):
+        group = literals[start:start + COMMANDER_GROUP]
+        commander = sink.aux()
+        _pairwise(sink, group, 1)
+        for literal in group:
+            sink.add_literals([-literal, commander])
+        commanders.append(commander)
+    _commander(sink, commanders)
+#endregion
+
+def at_most_k(sink, literals, k, encoding="auto", weights=None):
+    """
+    Adds the clauses of an at-most-k constraint over integer literals to a sink.
+
+    Args:
+        sink: A clause sink implementing aux(count), add_literals(literals) and add_clauses(clauses, count, units).
+        literals (list): The integer literals.
+        k (int): The maximum number of true literals.
+        encoding (str, optional): The cardinality encoding, see ENCODINGS. Defaults to "auto".
+        weights (list, optional): The weight of each literal, a true literal of weight w counts w times. Without weights
+            repeated literals are counted once.
+    """
+    if weights is None:
+        literals = list(dict.fromkeys(literals))
+    else:
+        #every encoding counts the positions of its inputs, so a literal repeated w times counts w times
+        repeated = []
+        for literal, weight in zip(literals, weights):
+            if weight > k:
+                sink.add_literals([-literal])
+            else:
+                repeated.extend([literal] * weight)
+        literals = repeated
+    n = len(literals)
+    if k >= n:
+        return
+    if k <= 0:
+        for literal in literals:
+            sink.add_literals([-literal])
+        return
+
+    if encoding == "auto":
+        encoding = select_encoding(n, k)
+    elif encoding == "commander" and k > 1:
+        encoding = "totalizer" #the commander encoding is defined for at most one only
+
+    large = encoding != "commander" and estimate_clauses(encoding, n, k) >= BATCH_CLAUSES
+    if encoding == "pairwise" and large and k == 1:
+        batch.pairwise(sink, literals)
+    elif encoding == "pairwise":
+        _pairwise(sink, literals, k)
+    elif encoding == "sequential":
+        (batch.sequential if large else _sequential)(sink, literals, k)
+    elif encoding == "totalizer":
+        (batch.totalizer if large else _totalizer)(sink, literals, k)
+    elif encoding == "commander":
+        _commander(sink, literals)
+    else:
+        raise ValueError(f"Unknown cardinality encoding {encoding}")
+
+class CardinalityConstraints:
+    """
+    Base class of the encoding backends, implements the cardinality primitives over the var(), aux(), add_literals() and
+    add_clauses() methods of the backend.
+
+    Methods:
+    - add_at_most_one(propositions, encoding): At most one of the propositions is true.
+    - add_at_most_k(k, propositions, encoding, weights): At most k of the propositions are true, counting each proposition weight times.
+    - add_exactly_one(propositions, encoding): Exactly one of the propositions is true.
+    - add_none_of(propositions): None of the propositions are true.
+    """
+    def add_at_most_one(self, propositions, encoding="auto"):
+        at_most_k(self, [self.var(proposition) for proposition in propositions], 1, encoding)
+
+    def add_at_most_k(self, k, propositions, encoding="auto", weights=None):
+        at_most_k(self, [self.var(proposition) for proposition in propositions], k, encoding, weights)
+
+    def add_exactly_one(self, propositions, encoding="auto"):
+        literals = [self.var(proposition) for proposition in propositions]
+        self.add_literals(literals)
+        at_most_k(self, literals, 1, encoding)
+
+    def add_none_of(self, propositions):
+        for proposition in propositions:
+            self.add_literals([-self.var(proposition)])
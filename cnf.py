@@ -0,0 +1,493 @@
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+from array import array
+
+import nnf
+
+import preprocessing
+from cardinality import CardinalityConstraints
+from tseitin import FormulaDefinitions
+
+"""
+Integer CNF Encoding Backend
+
+Defines an encoding backend that assigns integer variables to propositions and writes clauses straight into a flat
+array('i') buffer, each clause terminated by a 0 exactly as in DIMACS. Unlike the bauhaus Encoding no nnf expression
+trees are built for the constraint families, the buffer is written out as DIMACS and handed to kissat directly.
+Requirement formulas are Tseitin encoded (see tseitin.py).
+
+A reverse map from variables to propositions is kept so that a kissat model can be decoded back into the existing
+proposition classes, i.e. solution[StudentEnrolledCourse(student, course)] works as it does for a bauhaus theory.
+
+Many propositions are pinned to a constant by a unit clause (i.e. CourseTermSectionAvailableCapacity,
+CourseTermSectionTimeConflict, CheckCourse*Exists, Friendship and the requirements of courses without rules). Before
+the theory is written out simplify() substitutes the constants, folds the clauses that use them and drops the satisfied
+clauses, removes duplicate and subsumed clauses, merges equivalent literals and eliminates variables by resolution (see
+preprocessing.py), then renumbers the remaining variables densely. decode() reconstructs the value of the eliminated
+propositions from the model.
+
+The clauses of a very large theory can be streamed into a DIMACS file as they are encoded, see DimacsStream. Only the
+variable map stays in memory, the buffer is written out every FLUSH_LITERALS literals and kissat reads the file. A
+streamed theory is not simplified, kissat propagates the unit clauses itself.
+
+Classes:
+- DimacsStream: A DIMACS file the clauses of a theory are written into as they are encoded.
+- CNFEncoding: Represents an integer CNF theory and implements the constraint primitives used by sat_solver.
+
+Functions:
+- kissat_binary(): Returns the kissat binary.
+- dimacs_text(variables, count, clauses): Returns a flat buffer of clauses as a DIMACS string.
+- model_literals(output): Returns the literals of the model printed by kissat.
+"""
+
+#the number of buffered literals a streamed theory writes out at once
+FLUSH_LITERALS = 1 << 20
+
+#the width of the DIMACS header, room for the largest variable and clause counts
+HEADER_WIDTH = 32
+
+def kissat_binary():
+    """
+    Returns the kissat binary, the one on the PATH or the one shipped with nnf.
+    """
+    if shutil.which('kissat') is not None:
+        return 'kissat'
+    return os.path.join(os.path.dirname(os.path.abspath(nnf.__file__)), 'bin', 'kissat')
+
+def dimacs_text(variables, count, clauses):
+    """
+    Returns a flat buffer of clauses as a DIMACS string.
+
+    Args:
+        variables (int): The number of variables.
+        count (int): The number of clauses.
+        clauses (array): The literals with a 0 after every clause.
+
+    Returns:
+        str: The DIMACS header followed by one clause per line.
+    """
+    header = f"p cnf {variables} {count}\n"
+    if count == 0:
+        return header
+    return header + " ".join(map(str, clauses)).replace(" 0 ", " 0\n") + "\n"
+
+def model_literals(output):
+    """
+    Returns the literals of the model printed by kissat on its "v" lines.
+    """
+    return [int(literal) for line in output.split("\n") if line.startswith("v ") for literal in line[2:].split()]
+
+class DimacsStream:
+    """
+    A DIMACS file the clauses of a theory are written into as they are encoded. The variable and clause counts are only
+    known once every clause is written, so the file starts with a blank header of HEADER_WIDTH characters that is
+    overwritten by finish(). kissat needs the counts before the first clause, it can not read the clauses from a pipe
+    as they are encoded.
+
+    Attributes:
+    - path: The path of the file, a temporary file by default.
+    - literals: The number of literals written, including the 0 after every clause.
+
+    Methods:
+    - write(clauses): Appends a buffer of clauses.
+    - finish(variables, clauses): Writes the header and closes the file, the file can not be written once finished.
+    - remove(): Deletes a temporary file.
+    """
+    def __init__(self, path=None):
+        self.temporary = path is None
+        if self.temporary:
+            descriptor, path = tempfile.mkstemp(prefix="theory-", suffix=".cnf")
+            os.close(descriptor)
+        self.path = path
+        self.literals = 0
+        self.file = open(path, "w")
+        self.file.write(" " * HEADER_WIDTH + "\n")
+
+    def write(self, clauses):
+        """
+        Appends a flat buffer of literals with a 0 after every clause, one clause per line.
+        """
+        self._check()
+        if len(clauses) > 0:
+            self.file.write(" ".join(map(str, clauses)).replace(" 0 ", " 0\n") + "\n")
+            self.literals += len(clauses)
+
+    def finish(self, variables, clauses):
+        """
+        Writes the DIMACS header over the blank header and closes the file.
+
+        Args:
+            variables (int): The number of variables.
+            clauses (int): The number of clauses.
+        """
+        self._check()
+        self.file.seek(0)
+        self.file.write(f"p cnf {variables} {clauses}".ljust(HEADER_WIDTH))
+        self.file.close()
+
+    def _check(self):
+        """
+        Raises a ValueError once the file is finished, a streamed theory can only be sent to the solver once.
+        """
+        if self.file.closed:
+            raise ValueError(f"The DIMACS file {self.path} is already finished, a streamed theory can only be sent to the solver once")
+
+    def remove(self):
+        """
+        Deletes the file if it is a temporary file.
+        """
+        if not self.file.closed:
+            self.file.close()
+        if self.temporary and os.path.exists(self.path):
+            os.remove(self.path)
+
+class CNFEncoding(CardinalityConstraints, FormulaDefinitions):
+    """
+    Represents an integer CNF theory.
+
+    Literals are non-zero integers, a positive integer is a variable and a negative integer its negation.
+    Propositions are numbered on first use, auxiliary variables (i.e. Tseitin definitions) have no proposition.
+
+    Attributes:
+    - clauses: A flat array('i') buffer of literals with a 0 after every clause.
+    - clause_count: The number of clauses in the buffer.
+    - variables: A dictionary mapping propositions to their variable.
+    - labels: A list mapping each variable back to its proposition (None for auxiliary variables), index 0 is unused.
+    - definitions: The Tseitin definitions of sub-formulas, see tseitin.FormulaDefinitions.
+    - units: A dictionary mapping variables fixed by a unit clause to their value.
+    - eliminated: A dictionary mapping the propositions removed by simplify() to their variable before simplify().
+    - preprocessor: The preprocessing.Preprocessor of simplify() that reconstructs the eliminated variables, None before.
+    - renumbered: A list mapping the variables before simplify() to their variable after, 0 for the eliminated variables.
+    - contradiction: True if simplify() derived the empty clause, the theory is unsatisfiable.
+    - stream: The DimacsStream the clauses are written into, None to keep every clause in the buffer.
+    - solved: True once a streamed theory is solved, its DIMACS file is deleted and solve() returns the kept solution.
+    - solution: The solution of a solved streamed theory, None if it is unsatisfiable.
+
+    Methods:
+    - var(proposition): Returns the variable of a proposition.
+    - aux(count): Returns a new auxiliary variable, or the first of count consecutive ones.
+    - literal(formula): Returns a literal equivalent to a proposition, a negated proposition or a formula, see tseitin.FormulaDefinitions.
+    - add_clauses(clauses, count, units): Appends a buffer of clauses.
+    - add_clause(positive, negative): Adds the clause OR(positive) | OR(~negative).
+    - add_implication(premise, options): premise -> OR(options).
+    - add_exclusion(premise, others): premise -> ~OR(others).
+    - add_conflict(propositions): ~AND(propositions).
+    - add_exactly_one(propositions), add_at_most_one(propositions), add_at_most_k(k, propositions), add_none_of(propositions):
+      Cardinality constraints, see cardinality.CardinalityConstraints.
+    - add_equivalence(proposition, formula): proposition <-> formula.
+    - add_formula(formula): Adds an arbitrary bauhaus formula.
+    - flush(): Writes the buffered clauses into the stream.
+    - simplify(techniques): Preprocesses the clauses (see preprocessing.py) and renumbers the remaining variables.
+    - dimacs(): Returns the theory as a DIMACS string.
+    - solve(): Solves the theory with kissat and decodes the model.
+    - keep(solution): Keeps the solution of a streamed theory.
+    """
+    def __init__(self, stream=None):
+        self.clauses = array('i')
+        self.clause_count = 0
+        self.variables = {}
+        self.labels = [None]
+        self.definitions = {}
+        self.units = {}
+        self.eliminated = {}
+        self.preprocessor = None
+        self.renumbered = None
+        self.contradiction = False
+        self.stream = stream
+        self.solved = False
+        self.solution = None
+        self.limit = FLUSH_LITERALS if stream is not None else sys.maxsize #the buffer size that triggers a flush()
+
+    #VARIABLES
+    def var(self, proposition):
+        """
+        Returns the variable of a proposition, numbering the proposition on first use.
+
+        Args:
+            proposition: A proposition object.
+
+        Returns:
+            int: The variable of the proposition.
+        """
+        variable = self.variables.get(proposition)
+        if variable is None:
+            variable = len(self.labels)
+            self.variables[proposition] = variable
+            self.labels.append(proposition)
+        return variable
+
+    def aux(self, count=1):
+        """
+        Returns a new auxiliary variable that does not represent a proposition.
+
+        Args:
+            count (int, optional): The number of new variables, numbered consecutively.
+
+        Returns:
+            int: The new variable, the first of the new variables if count is more than 1.
+        """
+        self.labels.extend([None] * count)
+        return len(self.labels) - count
+
+    #CLAUSES
+    def add_literals(self, literals):
+        """
+        Adds a clause of integer literals to the buffer.
+
+        Args:
+            literals (list): A list of non-zero integer literals.
+        """
+        if len(literals) == 1:
+            self.units[abs(literals[0])] = literals[0] > 0
+        self.clauses.extend(literals)
+        self.clauses.append(0)
+        self.clause_count += 1
+        if len(self.clauses) >= self.limit:
+            self.flush()
+
+    def add_clauses(self, clauses, count, units):
+        """
+        Appends a buffer of clauses, i.e. the clauses encoded by another process.
+
+        Args:
+            clauses (array): A flat array('i') buffer of literals with a 0 after every clause.
+            count (int): The number of clauses in the buffer.
+            units (dict): A dictionary mapping the variables fixed by a unit clause of the buffer to their value.
+        """
+        self.units.update(units)
+        self.clauses.extend(clauses)
+        self.clause_count += count
+        if len(self.clauses) >= self.limit:
+            self.flush()
+
+    def flush(self):
+        """
+        Writes the buffered clauses into the stream and empties the buffer.
+        """
+        if self.stream is not None:
+            self.stream.write(self.clauses)
+            self.clauses = array('i')
+
+    def add_clause(self, positive, negative=()):
+        """
+        Adds the clause OR(positive) | OR(~negative).
+
+        Args:
+            positive (list): Propositions that appear positively.
+            negative (list, optional): Propositions that appear negatively.
+        """
+        variables = self.variables
+        literals = []
+        for proposition in positive:
+            variable = variables.get(proposition)
+            literals.append(variable if variable is not None else self.var(proposition))
+        for proposition in negative:
+            variable = variables.get(proposition)
+            literals.append(-(variable if variable is not None else self.var(proposition)))
+        self.add_literals(literals)
+
+    def add_implication(self, premise, options):
+        """
+        premise -> OR(options)
+        """
+        self.add_clause(options, [premise])
+
+    def add_exclusion(self, premise, others):
+        """
+        premise -> ~OR(others)
+        """
+        for other in others:
+            self.add_clause((), [premise, other])
+
+    def add_conflict(self, propositions):
+        """
+        ~AND(propositions)
+        """
+        self.add_clause((), propositions)
+
+    def add_formula(self, formula):
+        """
+        Adds an arbitrary bauhaus formula that must be satisfied.
+        """
+        typ = getattr(formula, "typ", None)
+        if typ == "and":
+            for arg in formula.args:
+                self.add_formula(arg)
+        elif typ == "or":
+            self.add_literals([self.literal(arg) for arg in formula.args])
+        elif typ == "imp":
+            self.add_literals([-self.literal(formula.args[0]), self.literal(formula.args[1])])
+        else:
+            self.add_literals([self.literal(formula)])
+
+    #SIMPLIFICATION
+    def simplify(self, techniques=preprocessing.TECHNIQUES):
+        """
+        Preprocesses the clauses of the theory, see preprocessing.py. By default the constants fixed by unit clauses are
+        substituted (i.e. a full section fixes CourseTermSectionAvailableCapacity false, which fixes every enrolment in
+        the section false), duplicate and subsumed clauses are removed, equivalent literals are merged and variables
+        are eliminated by resolution.
+
+        The remaining variables are renumbered densely, propositions that no longer occur in any clause are moved to
+        eliminated, their value is reconstructed from the model by decode(). No clauses can be added after the theory
+        is simplified.
+
+        Args:
+            techniques (list, optional): The preprocessing techniques, see preprocessing.TECHNIQUES. ["propagate"] only
+                substitutes the constants.
+
+        Returns:
+            dict: The number of variables and clauses before and after the simplification, and the number of variables
+                or clauses removed by each technique.
+        """
+        if self.stream is not None:
+            raise ValueError("A streamed theory can not be simplified, its clauses are written out")
+        before = {"variables": len(self.labels) - 1, "clauses": self.clause_count}
+
+        clauses = []
+        start = 0
+        literals = self.clauses.tolist()
+        while start < len(literals):
+            end = literals.index(0, start)
+            clauses.append(literals[start:end])
+            start = end + 1
+
+        self.preprocessor = preprocessing.Preprocessor(clauses, len(self.labels) - 1)
+        statistics = self.preprocessor.run(techniques)
+        self.contradiction = self.preprocessor.contradiction
+        remaining = self.preprocessor.clauses
+        self.preprocessor.clauses = None
+
+        #renumber the variables that still occur in a clause
+        renumbered = [0] * len(self.labels)
+        labels = [None]
+        for clause in remaining:
+            for literal in clause:
+                variable = abs(literal)
+                if renumbered[variable] == 0:
+                    renumbered[variable] = len(labels)
+                    labels.append(self.labels[variable])
+
+        for proposition, variable in self.variables.items():
+            if renumbered[variable] == 0:
+                self.eliminated[proposition] = variable
+        self.variables = {proposition: renumbered[variable] for proposition, variable in self.variables.items() if renumbered[variable] != 0}
+        self.labels = labels
+        self.renumbered = renumbered
+
+        self.clauses = array('i')
+        for clause in remaining:
+            self.clauses.extend([renumbered[literal] if literal > 0 else -renumbered[-literal] for literal in clause])
+            self.clauses.append(0)
+        self.clause_count = len(remaining)
+        self.units = {}
+        self.definitions = {}
+        self._true = None
+
+        return {"before": before, "after": {"variables": len(self.labels) - 1, "clauses": self.clause_count}, "techniques": statistics}
+
+    #THEORY
+    def vars(self):
+        """
+        Returns the set of propositions in the theory.
+        """
+        return set(self.variables) | set(self.eliminated)
+
+    def size(self):
+        """
+        Returns the number of literals in the theory.
+        """
+        written = self.stream.literals if self.stream is not None else 0
+        return written + len(self.clauses) - self.clause_count
+
+    def dimacs(self):
+        """
+        Returns the theory as a DIMACS string.
+
+        Returns:
+            str: The DIMACS header followed by one clause per line.
+        """
+        if self.stream is not None:
+            raise ValueError(f"A streamed theory is written into {self.stream.path}")
+        return dimacs_text(len(self.labels) - 1, self.clause_count, self.clauses)
+
+    def solve(self, extra_args=()):
+        """
+        Solves the theory with kissat. The file of a streamed theory is deleted once it is solved, solving it again
+        returns the same solution.
+
+        Args:
+            extra_args (list, optional): Extra arguments to pass to kissat.
+
+        Returns:
+            dict or None: A dictionary mapping every proposition to its value, or None if the theory is unsatisfiable.
+        """
+        if self.contradiction or self.solved:
+            return self.solution
+
+        solver = kissat_binary()
+        if self.stream is not None:
+            self.flush()
+            self.stream.finish(len(self.labels) - 1, self.clause_count)
+            try:
+                process = subprocess.run([solver, *extra_args, self.stream.path], stdout=subprocess.PIPE, universal_newlines=True)
+            finally:
+                self.stream.remove()
+        else:
+            process = subprocess.run([solver, *extra_args], input=self.dimacs(), stdout=subprocess.PIPE, universal_newlines=True)
+
+        if process.returncode == 20:
+            return self.keep(None)
+        if process.returncode != 10:
+            raise RuntimeError(f"kissat failed with code {process.returncode}. Log:\n\n{process.stdout}")
+
+        return self.keep(self.decode(model_literals(process.stdout)))
+
+    def keep(self, solution):
+        """
+        Keeps the solution of a streamed theory, its DIMACS file is deleted once it is solved.
+
+        Args:
+            solution (dict or None): The solution of the theory, None if it is unsatisfiable.
+
+        Returns:
+            dict or None: The solution.
+        """
+        if self.stream is not None:
+            self.solved = True
+            self.solution = solution
+        return solution
+
+    def decode(self, literals):
+        """
+        Decodes a model of integer literals back into the proposition objects.
+
+        Args:
+            literals (list): The literals of a model, variables that are missing are false.
+
+        Returns:
+            dict: A dictionary mapping every proposition to its value.
+        """
+        values = [False] * len(self.labels)
+        for literal in literals:
+            if literal > 0:
+                values[literal] = True
+        solution = {proposition: values[variable] for proposition, variable in self.variables.items()}
+        if self.preprocessor is not None:
+            #the model of the original variables, extended to the variables removed by simplify()
+            model = [values[variable] for variable in self.renumbered]
+            self.preprocessor.extend(model)
+            solution.update({proposition: model[variable] for proposition, variable in self.eliminated.items()})
+        return solution
+
+    def satisfiable(self):
+        """
+        Returns True if the theory has a solution.
+        """
+        return self.solve() is not None
+
+    def __str__(self):
+        return f"CNFEncoding: {len(self.labels) - 1} variables, {self.clause_count} clauses"
@@ -0,0 +1,263 @@
+from datetime import datetime
+import weakref
+import cardinality
+
+"""
+Section Time Conflict Index
+
+Precomputes the pairs of sections that meet at the same time during a term, so the time conflict constraints of
+sat_solver only visit the pairs that actually conflict instead of comparing every section of every pair of courses.
+
+The meetings of the sections of a term are swept in order of their start time, day by day. A meeting conflicts with the
+meetings that are still running when it starts, so the index is built in O(meetings log meetings + conflicting pairs).
+Two sections conflict exactly when Section.has_conflict() returns True: a meeting on the same day whose times overlap,
+TBA meetings never conflict.
+
+Time conflicts are encoded with one of:
+- pairwise: A binary clause for every pair of conflicting sections of different courses, quadratic in the number of
+  sections meeting at the same time.
+- slot: The meetings of a student's sections are cut into time slots, the sections running when a meeting starts. Every
+  section meeting in a slot implies an occupancy variable of its course for the slot, and at most one course occupies
+  each slot, which is linear in the number of meetings. Only the slots that are not contained in the next slot of the
+  day are kept, every pair of overlapping meetings runs together when the later one starts.
+- auto: The encoding with the fewest clauses for each student, see estimate_clauses().
+
+Classes:
+- ConflictIndex: Represents the conflicting section pairs of every term.
+- TimeSlot: Represents the sections of a student that run together when a meeting starts.
+
+Functions:
+- index_offerings(students, offerings): Indexes the sections left for every wished course of a cohort.
+- time_slots(owner): Returns the time slots of the sections of a student during a term.
+- conflicting_pairs(owner, term, index): Returns the conflicting pairs of sections of different courses.
+- uncovered_pairs(owner, term, index, slots): Returns the conflicting pairs that do not run together in any slot.
+- estimate_clauses(encoding, owner, term, index): Returns the number of clauses an encoding adds for a student during a term.
+"""
+
+ENCODINGS = ["pairwise", "slot", "auto"]
+
+MEETINGS = weakref.WeakKeyDictionary() #the parsed meetings of every section, see meetings()
+
+def meetings(section):
+    """
+    Returns the weekly meetings of a section, parsed once per section.
+
+    Args:
+        section (Section): A datalayer Section.
+
+    Returns:
+        list: A (day, start, end) tuple for every meeting that is not TBA, times in minutes since midnight. Meetings
+        without a time (i.e. "TBD") are skipped like TBA meetings.
+    """
+    result = MEETINGS.get(section)
+    if result is None:
+        result = MEETINGS[section] = parse_meetings(section)
+    return result
+
+def parse_meetings(section):
+    """
+    Parses the weekly meetings of a section, see meetings().
+    """
+    result = []
+    for date in section.dates:
+        if not date.is_tba():
+            try:
+                start = datetime.strptime(date.start_time, "%H:%M")
+                end = datetime.strptime(date.end_time, "%H:%M")
+            except ValueError:
+                continue
+            result.append((date.day, start.hour * 60 + start.minute, end.hour * 60 + end.minute))
+    return result
+
+class ConflictIndex:
+    """
+    Represents the conflicting section pairs of every term.
+
+    Attributes:
+    - conflicts: A dictionary mapping each term to a dictionary mapping every indexed Section to the set of Sections it conflicts with.
+
+    Methods:
+    - add_term(term, sections): Indexes the sections of a term.
+    - conflicts_with(term, section): Returns the indexed sections of a term that conflict with a section.
+    """
+    def __init__(self):
+        self.conflicts = {}
+
+    def add_term(self, term, sections):
+        """
+        Indexes the sections of a term, sections that are already indexed for the term are skipped.
+
+        Args:
+            term (Term): The term of the sections.
+            sections (iterable): The Section objects meeting during the term.
+        """
+        index = self.conflicts.setdefault(term, {})
+        sections = [section for section in dict.fromkeys(sections) if section not in index]
+        if len(sections) == 0:
+            return
+
+        days = {}
+        for section in list(index) + sections:
+            for day, start, end in meetings(section):
+                days.setdefault(day, []).append((start, end, section))
+        for section in sections:
+            index[section] = set()
+
+        new = set(sections)
+        for day_meetings in days.values():
+            day_meetings.sort(key=lambda meeting: meeting[0])
+            running = []
+            for start, end, section in day_meetings:
+                running = [meeting for meeting in running if meeting[1] > start]
+                for other_start, other_end, other in running:
+                    #the running meetings started at or before this one, so they overlap if either meeting has a duration
+                    if other is not section and start < other_end and end > other_start and (section in new or other in new):
+                        index[section].add(other)
+                        index[other].add(section)
+                running.append((start, end, section))
+
+    def conflicts_with(self, term, section):
+        """
+        Returns the indexed sections of a term that conflict with a section.
+
+        Returns:
+            set: The conflicting Section objects.
+        """
+        return self.conflicts.get(term, {}).get(section, set())
+
+    def __str__(self):
+        pairs = sum(len(others) for index in self.conflicts.values() for others in index.values()) // 2
+        return f"ConflictIndex: {sum(len(index) for index in self.conflicts.values())} sections, {pairs} conflicting pairs"
+
+def index_offerings(students, offerings):
+    """
+    Indexes the sections left for every wished course of a cohort, term by term.
+
+    Args:
+        students (Students): The students of the cohort.
+        offerings (pruning.Offerings): The terms and sections left for each student.
+
+    Returns:
+        ConflictIndex: The conflicting section pairs of every term.
+    """
+    sections = {}
+    for student in students:
+        for course in student.course_wish_list:
+            for term in offerings.terms(student, course):
+                sections.setdefault(term, {}).update(dict.fromkeys(offerings.sections(student, course, term)))
+
+    index = ConflictIndex()
+    for term, term_sections in sections.items():
+        index.add_term(term, term_sections)
+    return index
+
+class TimeSlot:
+    """
+    Represents the sections of a student that run together when a meeting starts.
+
+    Attributes:
+    - day: The day of the slot.
+    - start: The start of the slot, in minutes since midnight.
+    - courses: A dictionary mapping the Courses running in the slot to their running Sections.
+    """
+    def __init__(self, day, start, courses):
+        self.day = day
+        self.start = start
+        self.courses = courses
+
+    def __str__(self):
+        return f"{self.day} {self.start // 60:02d}:{self.start % 60:02d} " + ", ".join(course.id for course in self.courses)
+
+def time_slots(owner):
+    """
+    Returns the time slots of the sections of a student during a term in which at least two courses run.
+
+    Args:
+        owner (dict): A dictionary mapping the candidate Sections of the student during the term to their Course.
+
+    Returns:
+        list: The TimeSlot objects, in the order of the days and start times.
+    """
+    days = {}
+    for section in owner:
+        for day, start, end in meetings(section):
+            if start < end: #meetings without a duration never run when another meeting starts, see uncovered_pairs()
+                days.setdefault(day, []).append((start, end, section))
+
+    slots = []
+    seen = set()
+    for day, day_meetings in days.items():
+        day_meetings.sort(key=lambda meeting: meeting[0])
+        starts = sorted({meeting[0] for meeting in day_meetings})
+        running = [[section for start, end, section in day_meetings if start <= point < end] for point in starts]
+        for position, sections in enumerate(running):
+            members = set(sections)
+            #the slot is contained in the next one if no meeting ends before the next meeting starts
+            if position + 1 < len(running) and members <= set(running[position + 1]):
+                continue
+            key = frozenset(members)
+            if key in seen:
+                continue
+            seen.add(key)
+            courses = {}
+            for section in dict.fromkeys(sections):
+                courses.setdefault(owner[section], []).append(section)
+            if len(courses) > 1:
+                slots.append(TimeSlot(day, starts[position], courses))
+    return slots
+
+def uncovered_pairs(owner, term, index, slots):
+    """
+    Returns the conflicting pairs of sections of different courses that do not run together in any slot, the pairs with
+    a meeting without a duration. The slot encoding adds a binary clause for each of them.
+
+    Returns:
+        list: (Section, Section) tuples.
+    """
+    covered = set()
+    for slot in slots:
+        sections = [section for sections in slot.courses.values() for section in sections]
+        for section in sections:
+            covered.update((section, other) for other in sections)
+
+    pairs = []
+    for section1, course1 in owner.items():
+        for section2 in index.conflicts_with(term, section1):
+            course2 = owner.get(section2)
+            if course2 is not None and course2 is not course1 and section1.uid < section2.uid and (section1, section2) not in covered:
+                pairs.append((section1, section2))
+    return pairs
+
+def conflicting_pairs(owner, term, index):
+    """
+    Returns the conflicting pairs of sections of different courses, each unordered pair once.
+
+    Returns:
+        list: (Section, Section) tuples.
+    """
+    return uncovered_pairs(owner, term, index, [])
+
+def estimate_clauses(encoding, owner, term, index):
+    """
+    Returns the number of clauses an encoding adds for the time conflicts of a student during a term.
+
+    Args:
+        encoding (str): "pairwise" or "slot".
+        owner (dict): A dictionary mapping the candidate Sections of the student during the term to their Course.
+        term (Term): The term.
+        index (ConflictIndex): The conflict index of the term.
+
+    Returns:
+        int: The number of clauses.
+    """
+    if encoding == "pairwise":
+        return len(conflicting_pairs(owner, term, index))
+    if encoding == "slot":
+        slots = time_slots(owner)
+        clauses = len(uncovered_pairs(owner, term, index, slots))
+        for slot in slots:
+            #a course with a single running section uses the section as its occupancy variable
+            clauses += sum(len(sections) for sections in slot.courses.values() if len(sections) > 1)
+            clauses += cardinality.estimate_clauses(cardinality.select_encoding(len(slot.courses), 1), len(slot.courses), 1)
+        return clauses
+    raise ValueError(f"Unknown time conflict encoding {encoding}")
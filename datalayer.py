@@ -1,3 +1,4 @@
+import re
 import json
 from aenum import MultiValueEnum
 from enum import Enum
@@ -15,6 +16,7 @@ Module-level attributes:
 - testid: A module attribute storing the test id to prevent json remapping. 
 
 Classes:
+- Layer: Identifies a mapping of courses or students, the uids restart at 0 for every mapping.
 - Term: An Enum representing academic terms, defines three academic terms FALL, WINTER, SUMMER.
 - AcademicYear: An Enum representing academic years, defines four academic years FIRSTYEAR, SECONDYEAR, THIRDYEAR, FOURTHYEAR.
 
@@ -22,6 +24,7 @@ Classes:
 - Courses: Represents a collection of Course objects.
 
 - CourseRequirement: Represents all enrolment requirements of a Course.
+- RequirementRule: Represents a node of a parsed requirement rule, course codes combined with AND, OR, NOT.
 - CourseRequirementSpecific: Represents a specific requirement for a Course. ex. PREREQUISITE, COREQUISITE, EXCLUSION, COREQUISITE
 - CourseRequirements: Represents a collection of CourseRequirement objects.
 
@@ -54,6 +57,19 @@ data = None
 testid = 999999
 
 
+class Layer:
+    """
+    Identifies a mapping of courses or students. The uids of the mapped objects restart at 0 for every mapping, so the
+    objects of two data layers with the same uid are told apart by their layer. A cohort is mapped against the catalog
+    loaded before it, so its layer also stands for the uids of the courses and sections it is linked to.
+
+    Attributes:
+    - propositions: The propositions interned over the objects of the layer, see sat_solver.PropositionTable. None until
+      the first proposition is interned.
+    """
+    def __init__(self):
+        self.propositions = None
+
 #ENUM Classes
 class Term(MultiValueEnum):
     """
@@ -112,6 +128,8 @@ class Course:
         academic_org (str): The academic organization offering the course.
         units (float): The number of course units.
         CEAB (dict): A dictionary representing CEAB (Canadian Engineering Accreditation Board) information.
+        uid (int): A dense integer id of the course within the catalog.
+        layer (Layer): The mapping of the catalog the uid belongs to.
 
     Methods:
         __str__(): Returns a string representation of the Course instance.
@@ -140,6 +158,8 @@ class Course:
         self.academic_org = academic_org
         self.units = units
         self.CEAB = CEAB  # CEAB is a dictionary
+        self.uid = None  # dense integer id, assigned by mapCourses
+        self.layer = None  # the mapping the uid belongs to, assigned by mapCourses
 
     @property
     def id(self):
@@ -506,11 +526,13 @@ class Courses(Mapping):
 
     Attributes:
         courses (dict): A dictionary that stores Course objects by their unique IDs.
+        bits (int): A bitset of the collection over the dense catalog course ids (Course.uid).
 
     Methods:
         add_course(self, course): Add a Course object to the collection.
         add_courses(self, courses): Add multiple Course objects to the collection.
         find_course_by_id(self, id): Find a Course by its unique identifier.
+        course_bits(self, id, halves): Get the bitset of a course ID, with the A and B halves of a full year course.
         __str__(self): Returns a string representation of the list of Course objects.
         __iter__(self): Make the Courses class iterable. This method returns an iterator.
         __next__(self): Get the next Course object in the iteration.
@@ -529,6 +551,8 @@ class Courses(Mapping):
                 Default is None, which creates an empty dictionary.
         """
         self._courses = {}  # Use a dictionary to store courses by ID
+        self._bits = 0
+        self._course_bits = {}  # Cache of course_bits, cleared when a course is added
         if courses is not None:
             self.add_courses(courses)
 
@@ -539,6 +563,13 @@ class Courses(Mapping):
         """
         return list(self._courses.values())  # Convert dictionary values to a list
 
+    @property
+    def bits(self):
+        """
+        Get the bitset of the collection, bit Course.uid is set for every Course in the collection.
+        """
+        return self._bits
+
     def add_course(self, course):
         """
         Add a Course to the collection.
@@ -548,6 +579,9 @@ class Courses(Mapping):
         """
         if course is not None:
             self._courses[course.id] = course  # Use course ID as the key in the dictionary
+            if course.uid is not None:
+                self._bits |= 1 << course.uid
+            self._course_bits.clear()
 
     def add_courses(self, courses):
         """
@@ -571,6 +605,28 @@ class Courses(Mapping):
         """
         return self._courses.get(id, None)  # Use dictionary's get method
 
+    def course_bits(self, id, halves=True):
+        """
+        Get the bitset of a course ID over the dense catalog course ids.
+
+        Args:
+            id (str): The course ID, i.e. "MATH-110" or "MATH-110A".
+            halves (bool, optional): Also set the bits of the A and B halves of a full year course (i.e. "MATH-110A" and "MATH-110B").
+
+        Returns:
+            int: The bitset, 0 if no course of the collection matches the ID.
+        """
+        key = (id, halves)
+        bits = self._course_bits.get(key)
+        if bits is None:
+            bits = 0
+            for course_id in ([id, id+"A", id+"B"] if halves else [id]):
+                course = self._courses.get(course_id)
+                if course is not None and course.uid is not None:
+                    bits |= 1 << course.uid
+            self._course_bits[key] = bits
+        return bits
+
     def __str__(self):
         """
         Returns a string representation of the list of Course objects.
@@ -650,6 +706,9 @@ class Courses(Mapping):
             value: The Course object to add to the collection.
         """
         self._courses[key] = value
+        if value.uid is not None:
+            self._bits |= 1 << value.uid
+        self._course_bits.clear()
 
 #Course Requirement Classes
 class CourseRequirement:
@@ -789,6 +848,133 @@ class CourseRequirement:
         """
         self._requirements[key] = value
 
+class RequirementRule:
+    """
+    Represents a node of a parsed requirement rule, i.e. "(CISC-101 OR CISC-121) AND NOT MATH-110".
+
+    Attributes:
+    - op (str): The operator of the node, one of "COURSE", "AND", "OR", "NOT".
+    - args (list): The course code of a "COURSE" node, or the child nodes of an operator.
+    - courses (list): The course codes of the rule in order of first appearance.
+    """
+    #course codes are normalized to the catalog format, some rules omit the hyphen (i.e. MATH110 or CMPE 333)
+    TOKENS = re.compile(r'\s*(?:(\()|(\))|(AND|OR|NOT)\b|([A-Z]{3,4})[- ]?(\d{3}[A-Z]?)\b)')
+
+    def __init__(self, op, args):
+        self.op = op
+        self.args = args
+        if op == "COURSE":
+            self.courses = [args]
+        else:
+            self.courses = list(dict.fromkeys(course for arg in args for course in arg.courses))
+
+    def instantiate(self, atom):
+        """
+        Builds the formula of the rule by walking the tree, AND, OR and NOT are mapped to the &, | and ~ operators of the
+        values returned by atom.
+
+        Args:
+            atom (function): Returns the value (i.e. a bauhaus proposition) of a course code.
+
+        Returns:
+            The formula of the rule.
+        """
+        if self.op == "COURSE":
+            return atom(self.args)
+        if self.op == "NOT":
+            return ~self.args[0].instantiate(atom)
+
+        formula = self.args[0].instantiate(atom)
+        for arg in self.args[1:]:
+            formula = (formula & arg.instantiate(atom)) if self.op == "AND" else (formula | arg.instantiate(atom))
+        return formula
+
+    def evaluate(self, value):
+        """
+        Evaluates the rule in three-valued logic, a course whose value is not known yet evaluates to None.
+
+        Args:
+            value (function): Returns True, False or None (unknown) for a course code.
+
+        Returns:
+            bool or None: The value of the rule, None if it depends on the unknown courses.
+        """
+        if self.op == "COURSE":
+            return value(self.args)
+        if self.op == "NOT":
+            result = self.args[0].evaluate(value)
+            return None if result is None else not result
+
+        results = [arg.evaluate(value) for arg in self.args]
+        decisive = (self.op == "OR") #a true argument decides an OR, a false argument decides an AND
+        if decisive in results:
+            return decisive
+        if None in results:
+            return None
+        return not decisive
+
+    def __str__(self):
+        if self.op == "COURSE":
+            return self.args
+        if self.op == "NOT":
+            return f"NOT {self.args[0]}"
+        return "(" + f" {self.op} ".join(str(arg) for arg in self.args) + ")"
+
+    @staticmethod
+    def parse(criteria):
+        """
+        Parses a requirement rule. NOT binds tighter than AND, and AND binds tighter than OR.
+
+        Args:
+            criteria (str): The requirement rule.
+
+        Returns:
+            RequirementRule: The root node of the rule.
+
+        Raises:
+            ValueError: If the rule is malformed (i.e. unbalanced parentheses or a course code without a hyphen).
+        """
+        tokens = []
+        position = 0
+        criteria = criteria.rstrip()
+        while position < len(criteria):
+            match = RequirementRule.TOKENS.match(criteria, position)
+            if match is None:
+                raise ValueError(f"Unexpected '{criteria[position:].strip()}' in requirement rule '{criteria}'")
+            parenthesis, closing, operator, department, number = match.groups()
+            tokens.append(parenthesis or closing or operator or f"{department}-{number}")
+            position = match.end()
+
+        def expression(index, op):
+            #op is the operator parsed at this level, OR at the top level then AND
+            parse = (lambda index: expression(index, "AND")) if op == "OR" else negation
+            node, index = parse(index)
+            args = [node]
+            while index < len(tokens) and tokens[index] == op:
+                node, index = parse(index + 1)
+                args.append(node)
+            return (args[0] if len(args) == 1 else RequirementRule(op, args)), index
+
+        def negation(index):
+            if index >= len(tokens):
+                raise ValueError(f"Unexpected end of requirement rule '{criteria}'")
+            if tokens[index] == "NOT":
+                node, index = negation(index + 1)
+                return RequirementRule("NOT", [node]), index
+            if tokens[index] == "(":
+                node, index = expression(index + 1, "OR")
+                if index >= len(tokens) or tokens[index] != ")":
+                    raise ValueError(f"Unbalanced parentheses in requirement rule '{criteria}'")
+                return node, index + 1
+            if tokens[index] in ["AND", "OR", ")"]:
+                raise ValueError(f"Unexpected '{tokens[index]}' in requirement rule '{criteria}'")
+            return RequirementRule("COURSE", tokens[index]), index + 1
+
+        rule, index = expression(0, "OR")
+        if index != len(tokens):
+            raise ValueError(f"Unexpected '{tokens[index]}' in requirement rule '{criteria}'")
+        return rule
+
 class CourseRequirementSpecific:
     """
     Represents a specific requirement for a course.
@@ -796,6 +982,7 @@ class CourseRequirementSpecific:
     Attributes:
     - type (str): The type of requirement, e.g., "PREREQUISITE".
     - criteria (str): The criteria for the requirement.
+    - rule (RequirementRule): The criteria parsed once on load, None if the criteria is "NONE".
     """
 
     def __init__(self, type, criteria):
@@ -808,6 +995,13 @@ class CourseRequirementSpecific:
         """
         self._id = type
         self._criteria = criteria
+        self._rule = None
+        self._error = None
+        if criteria != "NONE":
+            try:
+                self._rule = RequirementRule.parse(criteria)
+            except ValueError as error: #malformed rules are only an error for the students that wish to take the course
+                self._error = error
     @property
     def id(self):
         """
@@ -828,6 +1022,21 @@ class CourseRequirementSpecific:
         """
         return self._criteria
     
+    @property
+    def rule(self):
+        """
+        Get the parsed requirement rule.
+
+        Returns:
+        - RequirementRule: the parsed rule, or None if the criteria is "NONE".
+
+        Raises:
+        - ValueError: If the criteria is malformed.
+        """
+        if self._error is not None:
+            raise self._error
+        return self._rule
+
     def __str__(self):
         return f"Type: {self._id} Criteria: {self._criteria}"
 
@@ -1190,6 +1399,7 @@ class Section(TermLevelSection):
         section_type (str): The type of the section (e.g., lecture, lab).
         waitlist_capacity (int): The maximum number of students that can be on the waitlist.
         waitlist_total (int): The current number of students on the waitlist.
+        uid (int): A dense integer id of the section within the catalog.
 
     Methods:
         __str__(): Returns a string representation of the Section instance.
@@ -1213,6 +1423,7 @@ class Section(TermLevelSection):
         self.section_type = section_type
         self.waitlist_capacity = waitlist_capacity
         self.waitlist_total = waitlist_total
+        self.uid = None  # dense integer id, assigned by mapSections
     
     def add_parent_section(self, id, year, term, department, course_code, course_name, units, campus, academic_level, course_sections):
         s = super().__init__(id, year, term, department, course_code, course_name, units, campus, academic_level, course_sections)
@@ -1933,9 +2144,15 @@ class Student:
         - _completed_courses (Courses): A Courses object containing a collection of this students completed of courses.
         - _course_wish_list (Courses): A Courses object containing the courses this student wishes to enroll in this academic year.
         - _friends (Friends): A collection of Friend objects representing a students friends and their shared courses.
+        - uid (int): A dense integer id of the student within the cohort.
+        - layer (Layer): The mapping of the cohort the uid belongs to.
+        - completed_bits (int): A bitset of the completed courses over the dense catalog course ids.
+        - wished_bits (int): A bitset of the wished courses over the dense catalog course ids.
 
     Methods:
         __str__(): Returns a string representation of the Student instance.
+        has_completed(id): Returns True if the student has completed a course, or either half of a full year course.
+        wishes_for(id): Returns True if a course is on the student's wish list.
     """
     def __init__(self, name, academic_year, program, completed_courses, course_wish_list, friends):
         """
@@ -1956,6 +2173,8 @@ class Student:
         self.completed_courses = completed_courses
         self.course_wish_list = course_wish_list
         self.friends = Friends()
+        self.uid = None  # dense integer id, assigned by mapStudents
+        self.layer = None  # the mapping the uid belongs to, assigned by mapStudents
     
     def __str__(self):
         """
@@ -1979,6 +2198,44 @@ class Student:
         else:
             return self.name
 
+    @property
+    def completed_bits(self):
+        """
+        Get the bitset of the completed courses, the A and B halves of full year courses are expanded.
+        """
+        return self._completed_courses.bits
+
+    @property
+    def wished_bits(self):
+        """
+        Get the bitset of the wished courses, the A and B halves of full year courses are expanded.
+        """
+        return self._course_wish_list.bits
+
+    def has_completed(self, id):
+        """
+        Returns True if the student has completed a course or a half of a full year course with the course ID.
+
+        Args:
+            id (str): A course ID, i.e. "MATH-110".
+
+        Returns:
+            bool: True if the course (i.e. "MATH-110", "MATH-110A" or "MATH-110B") was completed, otherwise False.
+        """
+        return (self._completed_courses.bits & Courses.ALLCOURSES.course_bits(id)) != 0
+
+    def wishes_for(self, id):
+        """
+        Returns True if the course with exactly this course ID is on the student's wish list.
+
+        Args:
+            id (str): A course ID, i.e. "MATH-110A".
+
+        Returns:
+            bool: True if the course is on the wish list, otherwise False.
+        """
+        return (self._course_wish_list.bits & Courses.ALLCOURSES.course_bits(id, halves=False)) != 0
+
     @property
     def name(self):
         """
@@ -2657,6 +2914,110 @@ class Friends(Mapping):
         """
         self._friends[key] = value
 
+class StudyGroup:
+    """
+    Represents a group of students that wish to take courses together, in the same section.
+
+    Attributes:
+        - name (str): The name of the group.
+        - members (list): The Student objects of the group.
+        - courses (Courses): The courses the group wishes to take together.
+
+    Methods:
+        __str__(): Returns a string representation of the StudyGroup instance.
+    """
+    def __init__(self, name, members, courses):
+        """
+        Initializes a StudyGroup instance.
+
+        Args:
+            name (str): The name of the group.
+            members (list): The names of the students of the group.
+            courses (list): The ids of the courses the group wishes to take together.
+
+        Raises:
+            ValueError: A member must exist as a Student object and a course as a Course object.
+        """
+        self.name = name
+        self.members = []
+        for member in members:
+            student = Students.ALLSTUDENTS.find_student_by_name(member) if Students.ALLSTUDENTS is not None else None
+            if student is None:
+                raise ValueError(f"a study group member must exist as a student: {member}")
+            self.members.append(student)
+
+        self.courses = Courses()
+        for course_id in courses:
+            course = Courses.ALLCOURSES.find_course_by_id(course_id) if Courses.ALLCOURSES is not None else None
+            if course is None:
+                raise ValueError(f"a study group course must exist as a course: {course_id}")
+            self.courses.add_course(course)
+
+    def __str__(self):
+        """
+        Returns a string representation of the StudyGroup.
+
+        Returns:
+            str: A formatted string with StudyGroup information.
+        """
+        return "{}:{}:{}".format(self.name, [member.name for member in self.members], [course.id for course in self.courses])
+
+class StudyGroups(Mapping):
+    """
+    Represents a collection of StudyGroup objects.
+
+    Attributes:
+        groups (dict): A dictionary that stores StudyGroup objects by their name.
+
+    Methods:
+        add_group(self, group): Add a StudyGroup to the collection.
+        __iter__(self): Returns an iterator over the StudyGroup objects.
+        __getitem__(self, item): Retrieve a StudyGroup object by its name.
+        __len__(self): Get the number of StudyGroup objects in the collection.
+    """
+    ALLGROUPS = None
+
+    def __init__(self, groups=None):
+        self._groups = {}
+        if groups is not None:
+            for group in groups:
+                self.add_group(group)
+
+    @property
+    def groups(self):
+        """
+        Get the dictionary of StudyGroups.
+        """
+        return self._groups
+
+    def add_group(self, group):
+        """
+        Add a study group to the collection.
+
+        Args:
+            group (StudyGroup): The StudyGroup object to be added.
+        """
+        if group is not None:
+            self._groups[group.name] = group
+
+    def __str__(self):
+        return "[{}]".format(", ".join("'{}'".format(name) for name in self._groups))
+
+    def __iter__(self):
+        """
+        Returns an iterator over the StudyGroup objects, the iterators are independent so they can be nested.
+        """
+        return iter(list(self._groups.values()))
+
+    def __getitem__(self, item):
+        return self._groups[item]
+
+    def __len__(self):
+        return len(self._groups)
+
+    def __contains__(self, item):
+        return (item in self._groups) or (getattr(item, "name", None) in self._groups)
+
 def mapDepartments(buildings_file):
     """
     Map data from a buildings.json JSON file to Department objects.
@@ -2748,6 +3109,7 @@ def mapSections(sections_file):
                 each_section_mapped = Section(**each_section)
                 each_section_mapped.add_parent_section(**parent_section) #inialize the parent term section for the child
                 each_section_mapped.dates = SectionDates()
+                each_section_mapped.uid = len(every_section)
                 for date in each_section["dates"]:
                     each_section_mapped.dates.add_date(SectionDate(**date)) #link child date arrays to dates attribute
                 all_course_sections.add_section(each_section_mapped)
@@ -2779,8 +3141,11 @@ def mapCourses(courses_file):
 
     # Iterate through the JSON data and create Course instances
     courses = []  #create a list to store course objects 
-    for course_data in data:
+    layer = Layer()
+    for uid, course_data in enumerate(data):
         course = Course(**course_data)
+        course.uid = uid
+        course.layer = layer
         courses.append(course)
 
 
@@ -2806,8 +3171,11 @@ def mapStudents(students_file):
     all_students = []  # Create a list to store course objects 
 
     # Iterate through the JSON data and create Student instances
-    for student_data in data:
+    layer = Layer()
+    for uid, student_data in enumerate(data):
         student = Student(**student_data)
+        student.uid = uid
+        student.layer = layer
         all_students.append(student)
 
     # Return a collection of CourseSection objects
@@ -2844,6 +3212,27 @@ def mapFriends(student_data):
         
         student_obj.friends = all_friends
 
+def mapStudyGroups(study_groups):
+    """
+    Map study groups to StudyGroups objects, the students and courses of the groups must be mapped first.
+
+    Args:
+        study_groups (str or list): The path to a study groups JSON file, or a list of dictionaries with the "name",
+            "members" (student names) and "courses" (course ids) of each group.
+
+    Returns:
+        StudyGroups: An instance of the StudyGroups class containing a collection of StudyGroup objects.
+
+    Raises:
+        ValueError: A member must exist as a Student object and a course as a Course object.
+    """
+    if isinstance(study_groups, str):
+        with open(study_groups, "r") as json_file:
+            study_groups = json.load(json_file)
+
+    StudyGroups.ALLGROUPS = StudyGroups([StudyGroup(**group) for group in study_groups])
+    return StudyGroups.ALLGROUPS
+
 if __name__ == "__main__":
     pass
     
\ No newline at end of file
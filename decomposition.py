@@ -0,0 +1,144 @@
+import profiles
+
+"""
+Independent Component Decomposition of the Cohort
+
+The constraints of a student only involve the propositions of the student, except for three kinds of constraints that
+couple students:
+- friendship: Mutual friends sharing a course are enrolled in the same section, see sat_solver.friendship().
+- study groups: The members of a study group are enrolled in the same section of each of its courses.
+- capacity: The students wishing for a section with fewer seats left than students are constrained together, see
+  sat_solver.capacity(). A section with enough seats for every student wishing for it (after pruning) has no
+  capacity constraint, and a section without seats is excluded for each student on its own.
+
+The interaction graph links the students of every such constraint, the students of different connected components
+never share a constraint, so each component can be built and solved as a theory of its own and the solutions merged.
+The theory of the cohort is satisfiable if and only if the theory of every component is. Small components are packed
+together up to PACK_STUDENTS students, so a cohort of many single students is not solved one student at a time.
+
+Classes:
+- ComponentTheories: The theories of the components of a cohort, solved separately.
+
+Functions:
+- interaction_components(objects, offerings, friendships): Returns the connected components of the interaction graph.
+- pack(components, size): Packs the small components into parts of up to size students.
+"""
+
+#the components smaller than this are packed together, a theory is built and solved for every part
+PACK_STUDENTS = 200
+
+class ComponentTheories:
+    """
+    The theories of the components of a cohort, solved separately, see sat_solver.execute().
+
+    Attributes:
+    - theories: The compiled bauhaus theory or the CNFEncoding of every part of the cohort.
+
+    Methods:
+    - satisfiable(): Returns True if every theory is satisfiable.
+    - vars(): Returns the set of propositions of every theory.
+    - size(): Returns the size of every theory, summed.
+    """
+    def __init__(self, theories):
+        self.theories = theories
+
+    def satisfiable(self):
+        return all(theory.satisfiable() for theory in self.theories)
+
+    def vars(self):
+        return set().union(*(theory.vars() for theory in self.theories))
+
+    def size(self):
+        return sum(theory.size() for theory in self.theories)
+
+    def __iter__(self):
+        return iter(self.theories)
+
+    def __len__(self):
+        return len(self.theories)
+
+    def __str__(self):
+        return f"ComponentTheories: {len(self.theories)} theories, " + ", ".join(str(theory) if hasattr(theory, "clause_count") else f"{len(theory.children)} clauses" for theory in self.theories)
+
+def interaction_components(objects, offerings, friendships=()):
+    """
+    Returns the connected components of the interaction graph of a cohort, see the module docstring.
+
+    Args:
+        objects (dict): A dictionary of datalayer collections.
+        offerings (pruning.Offerings): The sections left for each student after pruning, see pruning.prune().
+        friendships (list, optional): The mutual friendships, see sat_solver.reciprocal_friendships().
+
+    Returns:
+        list: The students of every component, in the order of the cohort.
+    """
+    students = list(objects["students"])
+    parents = {student.name: student.name for student in students}
+
+    def find(name):
+        while parents[name] != name:
+            parents[name] = parents[parents[name]]
+            name = parents[name]
+        return name
+
+    def join(names):
+        names = [name for name in names if name in parents]
+        for name in names[1:]:
+            parents[find(name)] = find(names[0])
+
+    for student, friend, courses in friendships:
+        join([student.name, friend.name])
+    for group in (objects.get("groups") or []):
+        join([member.name for member in group.members])
+
+    wishing = {} #the students that may be enrolled in each section
+    for student in students:
+        for course in list(student.course_wish_list):
+            for term in offerings.terms(student, course):
+                for section in offerings.sections(student, course, term):
+                    wishing.setdefault(section, []).append(student.name)
+    for section, names in wishing.items():
+        if 0 < section.enrollment_capacity - section.enrollment_total < len(names):
+            join(names)
+
+    components = {}
+    for student in students:
+        components.setdefault(find(student.name), []).append(student)
+    return list(components.values())
+
+def pack(components, size=PACK_STUDENTS):
+    """
+    Packs the components smaller than size into parts of up to size students. A larger component is a part of its
+    own. The components of a single student are packed after the others, those with the same profile next to each
+    other, so the identical students of a part are still encoded once (see profiles.py).
+
+    Args:
+        components (list): The students of every component, see interaction_components().
+        size (int, optional): The number of students of a part.
+
+    Returns:
+        list: The students of every part.
+    """
+    ordered = []
+    single = {} #the components of a single student by profile
+    for component in components:
+        if len(component) == 1:
+            single.setdefault(profiles.profile_key(component[0]), []).append(component)
+        else:
+            ordered.append(component)
+    for same in single.values():
+        ordered.extend(same)
+
+    parts = []
+    packed = []
+    for component in ordered:
+        if len(component) >= size:
+            parts.append(component)
+        elif len(packed) + len(component) > size:
+            parts.append(packed)
+            packed = list(component)
+        else:
+            packed.extend(component)
+    if len(packed) > 0:
+        parts.append(packed)
+    return parts
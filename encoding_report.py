@@ -0,0 +1,117 @@
+"""
+Encoding Statistics Report
+
+Records what every constraint family adds to the theory while it is built, so a blow-up of the theory can be traced to
+the family causing it instead of the overall size. sat_solver.build_theory() measures the counters of the backend
+before and after the constraints of each family are encoded (see sat_solver.family()):
+- propositions: The propositions numbered for the first time, a proposition shared by several families is counted in
+  the first family that uses it.
+- auxiliary: The auxiliary variables of the cardinality encodings and Tseitin definitions.
+- constraints: The constraints yielded by the family, i.e. one add_at_most_k() constraint.
+- clauses: The clauses written to the backend, including the duplicates the nnf backend merges.
+- literals: The literals of the clauses.
+- seconds: The time spent generating and encoding the constraints of the family.
+
+The families are measured for every student in turn and summed. When the theory is built across worker processes each
+shard is measured by its worker, so a proposition shared by the students of several shards is counted once per shard.
+
+Classes:
+- FamilyStatistics: The statistics of a constraint family.
+- EncodingReport: The statistics of every constraint family of a theory.
+"""
+
+FAMILIES = ["rules", "restrictions", "exclusions", "prerequisites", "corequisites", "requirements", "capacity", "friendship"]
+
+COUNTERS = ["propositions", "auxiliary", "constraints", "clauses", "literals", "seconds"]
+
+class FamilyStatistics:
+    """
+    The statistics of a constraint family, see the module docstring.
+
+    Attributes:
+    - propositions, auxiliary, constraints, clauses, literals, seconds: The counters of the family.
+
+    Methods:
+    - add(other): Adds the counters of another FamilyStatistics.
+    - to_dict(): Returns the counters as a JSON serializable dictionary.
+    """
+    def __init__(self, propositions=0, auxiliary=0, constraints=0, clauses=0, literals=0, seconds=0.0):
+        self.propositions = propositions
+        self.auxiliary = auxiliary
+        self.constraints = constraints
+        self.clauses = clauses
+        self.literals = literals
+        self.seconds = seconds
+
+    def add(self, other):
+        for counter in COUNTERS:
+            setattr(self, counter, getattr(self, counter) + getattr(other, counter))
+
+    def to_dict(self):
+        return {counter: round(getattr(self, counter), 4) if counter == "seconds" else getattr(self, counter) for counter in COUNTERS}
+
+class EncodingReport:
+    """
+    The statistics of every constraint family of a theory, in the order of FAMILIES.
+
+    Attributes:
+    - backend: The encoding backend of the theory, "nnf" or "cnf".
+    - families: A dictionary mapping every family to its FamilyStatistics.
+
+    Methods:
+    - record(name, before, after, constraints, seconds): Adds the difference of two backend counters to a family.
+    - merge(other): Adds the statistics of another report, i.e. the report of a shard built by a worker process.
+    - total(): Returns the FamilyStatistics of the whole theory.
+    - to_dict(): Returns the report as a JSON serializable dictionary.
+    """
+    def __init__(self, backend="nnf"):
+        self.backend = backend
+        self.families = {name: FamilyStatistics() for name in FAMILIES}
+
+    def record(self, name, before, after, constraints, seconds):
+        """
+        Adds the constraints encoded by a family to its statistics.
+
+        Args:
+            name (str): The family, one of FAMILIES.
+            before (tuple): The (propositions, variables, clauses, literals) counters of the backend before the
+                constraints were encoded, see sat_solver.backend_counters().
+            after (tuple): The counters of the backend after the constraints were encoded.
+            constraints (int): The number of constraints.
+            seconds (float): The time spent on the constraints.
+        """
+        propositions = after[0] - before[0]
+        self.families[name].add(FamilyStatistics(
+            propositions,
+            after[1] - before[1] - propositions,
+            constraints,
+            after[2] - before[2],
+            after[3] - before[3],
+            seconds,
+        ))
+
+    def merge(self, other):
+        for name, statistics in other.families.items():
+            self.families[name].add(statistics)
+
+    def total(self):
+        total = FamilyStatistics()
+        for statistics in self.families.values():
+            total.add(statistics)
+        return total
+
+    def to_dict(self):
+        return {
+            "backend": self.backend,
+            "families": {name: statistics.to_dict() for name, statistics in self.families.items()},
+            "total": self.total().to_dict(),
+        }
+
+    def __str__(self):
+        rows = [[name] + [f"{statistics.seconds:.3f}" if counter == "seconds" else str(getattr(statistics, counter)) for counter in COUNTERS] for name, statistics in [*self.families.items(), ("total", self.total())]]
+        header = ["family"] + COUNTERS
+        widths = [max(len(row[column]) for row in [header] + rows) for column in range(len(header))]
+        lines = [f"Encoding Statistics ({self.backend}):"]
+        for row in [header] + rows:
+            lines.append("  " + "  ".join(value.ljust(width) if column == 0 else value.rjust(width) for column, (value, width) in enumerate(zip(row, widths))))
+        return "\n".join(lines)
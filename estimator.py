@@ -0,0 +1,287 @@
+import cardinality
+import conflicts
+import profiles
+
+"""
+Encoding Cost Estimator and Admission Control
+
+Predicts the size of the theory of a cohort and the time it takes to build and solve it from cheap statistics of the
+data layer, before any proposition is created:
+- students: The encoded students, a profile of identical students counts as its variants (see profiles.py).
+- wishes: The wished courses of the encoded students.
+- terms: The terms a wished course is offered in, summed over the encoded students.
+- candidates: The sections with seats left of the wished courses, summed over the encoded students.
+- conflicts: The expected conflicting pairs of sections of different wished courses, the pairs of sections of every
+  student in a term times the conflict density of the term (the conflicting share of the pairs of wished sections).
+- capacity: The clauses of the capacity constraints, the cardinality encoding of every section wished by more students
+  than it has seats left, see cardinality.estimate_clauses().
+- friendships: The sections of the courses shared by friends and study groups.
+
+Every prediction is a linear combination of the statistics with the coefficients of MODEL, fitted by least squares on
+benchmark runs of the test cases and synthetic cohorts (python3 benchmark.py estimator, which prints the fitted MODEL).
+
+The web app builds and solves its requests one at a time in the order they arrive (the data layer and the theory are
+module globals, see utils.QueuedRequest). A request is admitted by comparing its estimate to the budgets of
+"admission_budgets" in config.json (see DEFAULT_BUDGETS) before its theory is built:
+- defer: The requests queued ahead of it are predicted to take longer than "busy_seconds", retry later. Decided on
+  arrival by defer(), the request is not estimated since its data layer can only be loaded once it is its turn.
+- accept: The request is solved with the configured settings.
+- reroute: The request is solved with cheaper settings, the cnf backend if the nnf backend would exceed
+  "interactive_seconds", and streaming the clauses into a DIMACS file above "stream_clauses".
+- reject: The request exceeds "max_seconds" or "max_clauses" with the cheapest settings.
+
+Classes:
+- Estimate: The predicted size and cost of the theory of a cohort.
+- Admission: The admission decision of a request.
+
+Functions:
+- cohort_statistics(objects, multiplicity): Returns the statistics of a cohort.
+- estimate(objects, backend, multiplicity): Predicts the size and cost of the theory of a cohort.
+- defer(busy, budgets): Decides whether a request waits for the requests queued ahead of it or is deferred.
+- admit(estimate, budgets): Decides whether a request is solved, with which settings.
+"""
+
+FEATURES = ["students", "wishes", "terms", "candidates", "conflicts", "capacity", "friendships"]
+
+#fitted by python3 benchmark.py estimator, the seconds of "nnf_solve" include compiling the theory
+MODEL = {
+    "variables": {"students": 0, "wishes": 0, "terms": 13.62, "candidates": 0, "conflicts": 0, "capacity": 0.02138, "friendships": 0},
+    "clauses": {"students": 0, "wishes": 10.59, "terms": 0, "candidates": 0, "conflicts": 0, "capacity": 0.8892, "friendships": 0},
+    "cnf_build": {"students": 0, "wishes": 0, "terms": 0.001678, "candidates": 0, "conflicts": 0, "capacity": 0, "friendships": 0},
+    "cnf_solve": {"students": 0, "wishes": 0, "terms": 0, "candidates": 0, "conflicts": 0, "capacity": 3.106e-06, "friendships": 0},
+    "nnf_build": {"students": 0, "wishes": 0, "terms": 0.001584, "candidates": 0, "conflicts": 0, "capacity": 5.531e-07, "friendships": 0},
+    "nnf_solve": {"students": 0, "wishes": 0, "terms": 0, "candidates": 6.079e-05, "conflicts": 0.0006794, "capacity": 1.46e-05, "friendships": 0},
+}
+
+#the budgets of a request, overridden by "admission_budgets" in config.json
+DEFAULT_BUDGETS = {
+    "max_seconds": 600, #reject a request that takes longer to build and solve with the cnf backend
+    "max_clauses": 20000000, #reject a request with more clauses
+    "interactive_seconds": 30, #reroute a request that takes longer with the nnf backend to the cnf backend
+    "stream_clauses": 5000000, #stream the clauses of a larger theory into a DIMACS file
+    "busy_seconds": 60, #defer a request that would wait longer for the requests queued ahead of it
+}
+
+DECISIONS = ["accept", "reroute", "defer", "reject"]
+
+class Estimate:
+    """
+    The predicted size and cost of the theory of a cohort.
+
+    Attributes:
+    - statistics: The statistics of the cohort, see cohort_statistics().
+    - backend: The encoding backend of the build and solve times.
+    - variables: The predicted number of variables.
+    - clauses: The predicted number of clauses.
+    - build_seconds: The predicted time to build the theory.
+    - solve_seconds: The predicted time to solve the theory (and compile it with the nnf backend).
+
+    Methods:
+    - seconds(backend): Returns the predicted time to build and solve the theory with a backend.
+    - to_dict(): Returns the estimate as a JSON serializable dictionary.
+    """
+    def __init__(self, statistics, backend="nnf"):
+        self.statistics = statistics
+        self.backend = backend
+        self.variables = round(predict("variables", statistics))
+        self.clauses = round(predict("clauses", statistics))
+        self.build_seconds = predict(f"{backend}_build", statistics)
+        self.solve_seconds = predict(f"{backend}_solve", statistics)
+
+    def seconds(self, backend=None):
+        """
+        Returns the predicted time to build and solve the theory with a backend, the backend of the estimate by default.
+        """
+        backend = backend or self.backend
+        return predict(f"{backend}_build", self.statistics) + predict(f"{backend}_solve", self.statistics)
+
+    def to_dict(self):
+        return {
+            "backend": self.backend,
+            "variables": self.variables,
+            "clauses": self.clauses,
+            "build_seconds": round(self.build_seconds, 3),
+            "solve_seconds": round(self.solve_seconds, 3),
+            "statistics": {feature: round(value, 1) for feature, value in self.statistics.items()},
+        }
+
+    def __str__(self):
+        return f"Estimate ({self.backend}): {self.variables} variables, {self.clauses} clauses, build {self.build_seconds:.2f}s, solve {self.solve_seconds:.2f}s"
+
+class Admission:
+    """
+    The admission decision of a request.
+
+    Attributes:
+    - decision: One of DECISIONS.
+    - reason: Why the request is not accepted as configured, None if it is.
+    - estimate: The Estimate of the request, None if it is deferred.
+    - settings: The settings the request is solved with instead of the configured ones, i.e. {"backend": "cnf"}.
+    - retry_after: The seconds to wait before retrying a deferred request, None otherwise.
+
+    Methods:
+    - admitted(): Returns True if the request is solved.
+    - to_dict(): Returns the decision as a JSON serializable dictionary.
+    """
+    def __init__(self, decision, estimate, reason=None, settings=None, retry_after=None):
+        self.decision = decision
+        self.estimate = estimate
+        self.reason = reason
+        self.settings = settings or {}
+        self.retry_after = retry_after
+
+    def admitted(self):
+        return self.decision in ("accept", "reroute")
+
+    def to_dict(self):
+        return {
+            "decision": self.decision,
+            "reason": self.reason,
+            "settings": self.settings,
+            "retry_after": self.retry_after,
+            "estimate": self.estimate.to_dict() if self.estimate is not None else None,
+        }
+
+    def __str__(self):
+        return f"Admission: {self.decision}" + (f" ({self.reason})" if self.reason else "")
+
+def predict(target, statistics):
+    """
+    Returns the prediction of MODEL for a target ("variables", "clauses", "cnf_build", ...), never below 0.
+    """
+    return max(0.0, sum(coefficient * statistics.get(feature, 0) for feature, coefficient in MODEL[target].items()))
+
+def cohort_statistics(objects, multiplicity=False):
+    """
+    Returns the statistics of a cohort, see FEATURES.
+
+    Args:
+        objects (dict): A dictionary of datalayer collections.
+        multiplicity (bool, optional): The students with identical profiles are encoded once, see profiles.py. Students
+            with friends or in a study group are never part of a profile.
+
+    Returns:
+        dict: The value of every feature.
+    """
+    students = list(objects["students"])
+    groups = list(objects.get("groups") or [])
+    grouped = {student.name for student in students if len(list(student.friends)) > 0}
+    grouped.update(member.name for group in groups for member in group.members)
+
+    #a student of a profile is encoded as a share of the variants of the profile
+    shares = {}
+    if multiplicity:
+        cohort_profiles = {}
+        for student in students:
+            if student.name not in grouped:
+                cohort_profiles.setdefault(profiles.profile_key(student), []).append(student)
+        for members in cohort_profiles.values():
+            if len(members) > 1:
+                share = len(profiles.variant_weights(len(members))) / len(members)
+                shares.update((member.name, share) for member in members)
+
+    statistics = dict.fromkeys(FEATURES, 0.0)
+    wishing = {} #the number of students wishing for each section with seats left
+    term_sections = {} #the sections with seats left of the wished courses of each term
+    pairs = {} #the pairs of sections of different courses of each student during a term, summed by term
+    for student in students:
+        share = shares.get(student.name, 1.0)
+        statistics["students"] += share
+        counts = {}
+        for course in list(student.course_wish_list):
+            if course is None:
+                continue
+            statistics["wishes"] += share
+            for term in course.sections.get_term_offerings():
+                sections = [section for section in course.sections.get_term_collection(term) if section.enrollment_total < section.enrollment_capacity]
+                statistics["terms"] += share
+                statistics["candidates"] += share * len(sections)
+                counts.setdefault(term, []).append(len(sections))
+                term_sections.setdefault(term, set()).update(sections)
+                for section in sections:
+                    wishing[section] = wishing.get(section, 0) + 1
+        for term, sizes in counts.items():
+            pairs[term] = pairs.get(term, 0) + share * (sum(sizes) ** 2 - sum(size * size for size in sizes)) / 2
+
+        for friend in list(student.friends):
+            statistics["friendships"] += sum(len(course.sections) for course in list(friend.shared_courses) if course is not None)
+    for group in groups:
+        statistics["friendships"] += len(group.members) * sum(len(course.sections) for course in list(group.courses))
+
+    index = conflicts.ConflictIndex()
+    for term, sections in term_sections.items():
+        index.add_term(term, sections)
+        conflicting = sum(len(others) for others in index.conflicts[term].values()) / 2
+        possible = len(sections) * (len(sections) - 1) / 2
+        if possible > 0:
+            statistics["conflicts"] += pairs.get(term, 0) * conflicting / possible
+
+    for section, count in wishing.items():
+        seats = section.enrollment_capacity - section.enrollment_total
+        if count > seats:
+            statistics["capacity"] += cardinality.estimate_clauses(cardinality.select_encoding(count, seats), count, seats)
+
+    return statistics
+
+def estimate(objects, backend="nnf", multiplicity=False):
+    """
+    Predicts the size and cost of the theory of a cohort.
+
+    Args:
+        objects (dict): A dictionary of datalayer collections.
+        backend (str, optional): The encoding backend, "nnf" or "cnf".
+        multiplicity (bool, optional): The students with identical profiles are encoded once, see cohort_statistics().
+
+    Returns:
+        Estimate: The predicted size and cost.
+    """
+    return Estimate(cohort_statistics(objects, multiplicity), backend)
+
+def defer(busy, budgets=None):
+    """
+    Decides whether a request waits for its turn or is deferred, see the module docstring.
+
+    Args:
+        busy (float): The predicted seconds left of the requests queued or being solved, None if there are none.
+        budgets (dict, optional): The budgets, see DEFAULT_BUDGETS.
+
+    Returns:
+        Admission: The "defer" decision, None if the request waits for its turn.
+    """
+    budgets = {**DEFAULT_BUDGETS, **(budgets or {})}
+    if busy is not None and busy > budgets["busy_seconds"]:
+        return Admission("defer", None, f"the requests queued ahead take {busy:.1f}s, more than {budgets['busy_seconds']}s", retry_after=max(1, round(busy)))
+    return None
+
+def admit(estimate, budgets=None):
+    """
+    Decides whether a request is solved, with which settings, see the module docstring. A request is only estimated
+    once it is its turn, see defer().
+
+    Args:
+        estimate (Estimate): The estimate of the request with the configured backend.
+        budgets (dict, optional): The budgets, see DEFAULT_BUDGETS.
+
+    Returns:
+        Admission: The decision.
+    """
+    budgets = {**DEFAULT_BUDGETS, **(budgets or {})}
+    cheapest = min(estimate.seconds("cnf"), estimate.seconds(estimate.backend))
+    if estimate.clauses > budgets["max_clauses"]:
+        return Admission("reject", estimate, f"{estimate.clauses} clauses exceed the budget of {budgets['max_clauses']}")
+    if cheapest > budgets["max_seconds"]:
+        return Admission("reject", estimate, f"{cheapest:.1f}s exceed the budget of {budgets['max_seconds']}s")
+
+    settings = {}
+    reasons = []
+    if estimate.backend != "cnf" and estimate.seconds() > budgets["interactive_seconds"]:
+        settings["backend"] = "cnf"
+        reasons.append(f"{estimate.seconds():.1f}s with the {estimate.backend} backend exceed {budgets['interactive_seconds']}s")
+    if estimate.clauses > budgets["stream_clauses"]:
+        settings["backend"] = "cnf"
+        settings["stream"] = True
+        reasons.append(f"{estimate.clauses} clauses exceed {budgets['stream_clauses']} kept in memory")
+
+    if len(settings) > 0:
+        return Admission("reroute", estimate, ", ".join(reasons), settings)
+    return Admission("accept", estimate)
@@ -0,0 +1,465 @@
+import atexit
+import itertools
+import multiprocessing
+import os
+import signal
+import subprocess
+import threading
+from array import array
+from concurrent import futures
+from multiprocessing import connection
+
+import nnf
+
+import cnf
+
+"""
+Process Pool Solver Executor
+
+Solves compiled theories in a pool of worker processes instead of the caller's thread, so several theories (the test
+cases of a batch, the parts of a decomposed cohort or the requests of the web app) are solved at the same time and a
+solve can be cancelled while kissat runs. submit() returns a SolveFuture (a concurrent.futures.Future), the theory is
+written out in the caller and solved by a worker:
+- cnf.CNFEncoding: The clause buffer, or the DIMACS file of a streamed theory. The model is decoded by the theory.
+- nnf.And: A compiled bauhaus theory in CNF, its variables are numbered in the caller as nnf.kissat.solve() does.
+The propositions stay in the caller, a worker only sees integer clauses and returns the true literals of the model.
+
+A worker starts kissat for one theory at a time and reports its process id. Cancelling a SolveFuture removes a theory
+waiting for a worker, or kills the kissat process of a theory being solved, the worker is then free for the next one.
+kissat is never left running on its own:
+- A worker kills kissat and exits when the process that started the pool exits.
+- A worker that dies is replaced, its kissat process is killed and the future of its theory fails.
+- shutdown() (called at exit) cancels the theories left and stops the workers.
+
+The workers are started with the forkserver (or spawn) start method, they only import this module and never inherit
+the threads of the web app.
+
+Classes:
+- SolveFuture: The future of a theory submitted to a SolverExecutor.
+- SolverExecutor: A pool of worker processes solving theories with kissat.
+- Session: Submits theories to a SolverExecutor under a label, i.e. the test case of a request.
+"""
+
+#the seconds a worker waits for kissat before checking that the process that started the pool is still running
+PARENT_POLL = 1.0
+
+def _run_kissat(source, extra_args, started):
+    """
+    Solves a theory with kissat, in a worker process.
+
+    Args:
+        source (tuple): ("buffer", variables, count, clauses) or ("file", path), see SolverExecutor.submit().
+        extra_args (tuple): Extra arguments to pass to kissat.
+        started (function): Called with the process id of kissat once it is started.
+
+    Returns:
+        tuple: The status, "sat", "unsat" or "killed", and the array('i') of the true literals of a "sat" model.
+    """
+    if source[0] == "buffer":
+        text = cnf.dimacs_text(*source[1:])
+        args = [cnf.kissat_binary(), *extra_args]
+    else:
+        text = None
+        args = [cnf.kissat_binary(), *extra_args, source[1]]
+
+    parent = multiprocessing.parent_process() #the process that started the pool, not the forkserver
+    process = subprocess.Popen(args, stdin=subprocess.PIPE if text is not None else subprocess.DEVNULL, stdout=subprocess.PIPE, universal_newlines=True)
+    started(process.pid)
+    while True:
+        try:
+            output, _ = process.communicate(text, timeout=PARENT_POLL)
+            break
+        except subprocess.TimeoutExpired:
+            text = None #the input is written by the first call
+            if parent is not None and not parent.is_alive(): #the pool is gone, nobody waits for the model
+                process.kill()
+                process.communicate()
+                raise SystemExit()
+
+    if process.returncode == 20:
+        return "unsat", None
+    if process.returncode == 10:
+        return "sat", array("i", (literal for literal in cnf.model_literals(output) if literal > 0))
+    if process.returncode < 0:
+        return "killed", None
+    raise RuntimeError(f"kissat failed with code {process.returncode}. Log:\n\n{output}")
+
+def _work(channel, extra_args):
+    """
+    Solves the theories sent by the executor until it sends None or closes the channel, in a worker process.
+    """
+    signal.signal(signal.SIGINT, signal.SIG_IGN) #a Ctrl-C of the terminal is handled by the executor
+    channel.send(("ready",))
+    while True:
+        try:
+            job = channel.recv()
+        except EOFError:
+            break
+        if job is None:
+            break
+        number, source = job
+        try:
+            status, literals = _run_kissat(source, extra_args, lambda pid: channel.send(("started", number, pid)))
+            channel.send(("done", number, status, literals))
+        except Exception as error:
+            channel.send(("failed", number, str(error)))
+
+class SolveFuture(futures.Future):
+    """
+    The future of a theory submitted to a SolverExecutor. The result is the solution of the theory, a dictionary mapping
+    every proposition to its value, or None if it is unsatisfiable.
+
+    Attributes:
+    - theory: The theory being solved.
+    - label: The label the theory was submitted with, see Session.
+    - pid: The process id of kissat while the theory is being solved, None otherwise.
+
+    Methods:
+    - cancel(): Cancels the solve, also while kissat runs.
+    - running(): Returns True while kissat runs.
+    """
+    def __init__(self, executor, number, theory, label=None):
+        super().__init__()
+        self.executor = executor
+        self.number = number
+        self.theory = theory
+        self.label = label
+        self.pid = None
+        self.source = None #the clauses sent to the worker, see SolverExecutor.submit()
+        self.decode = None #decodes the true literals of a model into a solution
+        self.cleanup = None #removes the DIMACS file of a streamed theory
+
+    def cancel(self):
+        """
+        Cancels the solve: a theory waiting for a worker is removed, the kissat process of a theory being solved is
+        killed. Returns False if the theory is already solved.
+        """
+        with self._condition: #reentrant, a second cancel() must not notify the cancellation again
+            if self.cancelled():
+                return True
+            if not super().cancel(): #the state is never running, a future can be cancelled until it is solved
+                return False
+            self.set_running_or_notify_cancel() #wakes futures.wait(), that only counts notified cancellations as done
+        self.executor._abort(self)
+        return True
+
+    def running(self):
+        return self.pid is not None and not self.done()
+
+class SolverExecutor:
+    """
+    A pool of worker processes solving theories with kissat, see the module docstring.
+
+    Attributes:
+    - workers: The number of worker processes.
+    - extra_args: Extra arguments to pass to kissat.
+
+    Methods:
+    - submit(theory, label): Submits a theory, returns its SolveFuture.
+    - solve(theory): Solves a theory in a worker and waits for its solution.
+    - cancel(label): Cancels every theory submitted with a label.
+    - session(label): Returns a Session submitting theories with a label.
+    - shutdown(wait, cancel): Stops the workers.
+    """
+    def __init__(self, workers=1, extra_args=()):
+        if workers < 1:
+            raise ValueError(f"A solver executor needs at least one worker, not {workers}")
+        self.workers = workers
+        self.extra_args = tuple(extra_args)
+        methods = multiprocessing.get_all_start_methods()
+        self.context = multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+        self.lock = threading.RLock()
+        self.numbers = itertools.count()
+        self.pending = [] #the futures waiting for a worker, in order
+        self.solving = {} #the future of the theory each worker is solving, by worker
+        self.channels = {} #the channel of each worker
+        self.ready = set() #the workers that have started, a worker that dies before is not replaced
+        self.closed = False
+        self.wakeup, self.waker = self.context.Pipe(duplex=False)
+        for _ in range(workers):
+            self._start_worker()
+        self.collector = threading.Thread(target=self._collect, name="solver-executor", daemon=True)
+        self.collector.start()
+        atexit.register(self.shutdown, False, True)
+
+    def _start_worker(self):
+        channel, remote = self.context.Pipe()
+        worker = self.context.Process(target=_work, args=(remote, self.extra_args), daemon=True)
+        worker.start()
+        remote.close()
+        self.channels[worker] = channel
+        self.solving[worker] = None
+
+    def submit(self, theory, label=None):
+        """
+        Submits a theory to be solved by a worker. A theory that can not be satisfiable is not sent to a worker.
+
+        Args:
+            theory (CNFEncoding or nnf.And): A simplified or streamed CNFEncoding, or a compiled bauhaus theory in CNF.
+            label (optional): A label to cancel the theory with, see cancel().
+
+        Returns:
+            SolveFuture: The future of the solution, always returned. Its result is None if the theory is unsatisfiable.
+        """
+        with self.lock:
+            if self.closed:
+                raise RuntimeError("Cannot submit a theory to a solver executor that is shut down")
+            future = SolveFuture(self, next(self.numbers), theory, label)
+
+        if isinstance(theory, cnf.CNFEncoding):
+            if theory.contradiction or theory.solved:
+                future.set_result(theory.solution)
+                return future
+            if theory.stream is not None:
+                theory.flush()
+                theory.stream.finish(len(theory.labels) - 1, theory.clause_count)
+                future.source = ("file", theory.stream.path)
+                future.cleanup = theory.stream.remove
+            else:
+                future.source = ("buffer", len(theory.labels) - 1, theory.clause_count, theory.clauses)
+            future.decode = theory.decode
+        elif isinstance(theory, nnf.NNF):
+            if not theory.is_CNF():
+                raise ValueError("Sentence must be in CNF")
+            #number the variables as nnf.kissat.solve() does, the model covers every variable
+            labels = list(theory.vars())
+            numbers = {label: number for number, label in enumerate(labels, start=1)}
+            clauses = array("i")
+            for clause in theory.children:
+                clauses.extend(numbers[var.name] if var.true else -numbers[var.name] for var in clause.children)
+                clauses.append(0)
+            future.source = ("buffer", len(labels), len(theory.children), clauses)
+
+            def decode(literals):
+                values = [False] * (len(labels) + 1)
+                for literal in literals:
+                    values[literal] = True
+                return {label: values[number] for label, number in numbers.items()}
+            future.decode = decode
+        else:
+            raise TypeError(f"Cannot solve a {type(theory).__name__} in a solver executor")
+
+        with self.lock:
+            if self.closed:
+                raise RuntimeError("Cannot submit a theory to a solver executor that is shut down")
+            self.pending.append(future)
+            self._dispatch()
+        return future
+
+    def solve(self, theory):
+        """
+        Solves a theory in a worker and waits for its solution, the solve is cancelled if waiting is interrupted.
+        """
+        future = self.submit(theory)
+        try:
+            return future.result()
+        except BaseException:
+            future.cancel()
+            raise
+
+    def cancel(self, label):
+        """
+        Cancels every theory submitted with a label that is not solved yet.
+
+        Returns:
+            int: The number of theories cancelled.
+        """
+        with self.lock:
+            labelled = [future for future in [*self.pending, *self.solving.values()] if future is not None and future.label == label and not future.done()]
+        return sum(future.cancel() for future in labelled)
+
+    def session(self, label):
+        """
+        Returns a Session submitting theories with a label.
+        """
+        return Session(self, label)
+
+    def shutdown(self, wait=True, cancel=False):
+        """
+        Stops the workers once the theories submitted are solved.
+
+        Args:
+            wait (bool, optional): Wait until the workers are stopped.
+            cancel (bool, optional): Cancel the theories that are not solved yet instead.
+        """
+        with self.lock:
+            if self.closed:
+                return
+            self.closed = True
+            left = [*self.pending, *(future for future in self.solving.values() if future is not None)]
+        if cancel:
+            for future in left:
+                future.cancel()
+        else:
+            futures.wait(left)
+        with self.lock:
+            for channel in self.channels.values():
+                try:
+                    channel.send(None)
+                except OSError:
+                    pass
+        self.waker.send(None)
+        atexit.unregister(self.shutdown)
+        if wait:
+            self.collector.join()
+            for worker in list(self.channels):
+                worker.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, kind, value, traceback):
+        self.shutdown(cancel=kind is not None)
+
+    def _dispatch(self):
+        """
+        Sends the theories waiting to the idle workers, with the lock held.
+        """
+        for worker, future in self.solving.items():
+            if len(self.pending) == 0:
+                break
+            if future is None:
+                future = self.pending.pop(0)
+                self.solving[worker] = future
+                try:
+                    self.channels[worker].send((future.number, future.source))
+                except OSError: #the worker died, the theory fails when it is replaced
+                    pass
+                future.source = None
+
+    def _abort(self, future):
+        """
+        Removes a theory waiting for a worker, or kills the kissat process of a theory being solved.
+        """
+        with self.lock:
+            if future in self.pending:
+                self.pending.remove(future)
+            elif future.pid is not None:
+                try:
+                    os.kill(future.pid, signal.SIGKILL)
+                except ProcessLookupError:
+                    pass
+        if future.cleanup is not None:
+            future.cleanup()
+
+    def _finish(self, future, result=None, error=None):
+        """
+        Sets the result of a theory, unless it was cancelled.
+        """
+        future.pid = None
+        if future.cleanup is not None:
+            future.cleanup()
+            if error is None:
+                future.theory.keep(result) #the DIMACS file is deleted, see CNFEncoding.solve()
+        try:
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(result)
+        except futures.InvalidStateError: #cancelled meanwhile
+            pass
+
+    def _collect(self):
+        """
+        Receives the messages of the workers and replaces the workers that die, in the collector thread.
+        """
+        while True:
+            with self.lock:
+                channels = {channel: worker for worker, channel in self.channels.items()}
+                sentinels = {worker.sentinel: worker for worker in self.channels}
+            ready = connection.wait([self.wakeup, *channels, *sentinels])
+            if self.wakeup in ready:
+                break
+            for ready_object in ready:
+                if ready_object in channels:
+                    worker = channels[ready_object]
+                    try:
+                        message = ready_object.recv()
+                    except (EOFError, OSError):
+                        continue #the worker died, see its sentinel
+                    self._receive(worker, message)
+            for ready_object in ready:
+                if ready_object in sentinels:
+                    self._replace(sentinels[ready_object])
+
+    def _receive(self, worker, message):
+        with self.lock:
+            if message[0] == "ready":
+                self.ready.add(worker)
+                return
+            future = self.solving.get(worker)
+            if future is None or future.number != message[1]:
+                return
+            if message[0] == "started":
+                future.pid = message[2]
+                if future.cancelled(): #cancelled before kissat was started
+                    self._abort(future)
+                return
+            self.solving[worker] = None
+            if message[0] == "failed":
+                self._finish(future, error=RuntimeError(message[2]))
+            elif message[2] == "killed":
+                self._finish(future, error=RuntimeError("kissat was killed")) #ignored if the theory was cancelled
+            else:
+                try:
+                    solution = None if message[2] == "unsat" else future.decode(message[3])
+                    self._finish(future, solution)
+                except Exception as error:
+                    self._finish(future, error=error)
+            self._dispatch()
+
+    def _replace(self, worker):
+        """
+        Replaces a worker that died, the theory it was solving fails. A worker that dies before it has started is not
+        replaced (i.e. the main module of the process can not be imported), the theories fail once no worker is left.
+        """
+        with self.lock:
+            worker.join()
+            future = self.solving[worker]
+            if future is not None:
+                if future.pid is not None: #kissat outlives its worker, it is not reaped so its pid is not reused
+                    try:
+                        os.kill(future.pid, signal.SIGKILL)
+                    except ProcessLookupError:
+                        pass
+                self._finish(future, error=RuntimeError(f"The solver worker exited with code {worker.exitcode}"))
+            del self.solving[worker]
+            self.channels.pop(worker).close()
+            if worker in self.ready:
+                self.ready.remove(worker)
+                if not self.closed:
+                    self._start_worker()
+            if len(self.channels) == 0:
+                self.closed = True
+                for future in self.pending:
+                    self._finish(future, error=RuntimeError("The solver workers could not be started"))
+                self.pending = []
+            self._dispatch()
+
+class Session:
+    """
+    Submits theories to a SolverExecutor under a label, so every theory of a request can be cancelled together, see
+    SolverExecutor.cancel().
+
+    Methods:
+    - submit(theory): Submits a theory with the label of the session.
+    - solve(theory): Solves a theory with the label of the session and waits for its solution.
+    - cancel(): Cancels the theories of the session that are not solved yet.
+    """
+    def __init__(self, executor, label):
+        self.executor = executor
+        self.label = label
+
+    def submit(self, theory):
+        return self.executor.submit(theory, self.label)
+
+    def solve(self, theory):
+        future = self.submit(theory)
+        try:
+            return future.result()
+        except BaseException:
+            future.cancel()
+            raise
+
+    def cancel(self):
+        return self.executor.cancel(self.label)
@@ -0,0 +1,313 @@
+import sys
+from datetime import datetime
+import numpy as np
+
+import datalayer
+
+"""
+Room and Instructor Occupancy Matrices
+
+Builds vectorized occupancy matrices of room x time-slot and instructor x time-slot for every term of a
+catalog from the meeting times of its Sections. The matrices are used to report double-booked rooms and
+instructors and each room's utilization, this is used to sanity-check a data drop before it goes into the solver.
+
+A week is split into fixed width time slots (5 minutes by default). Every meeting of every section is written
+into the matrices at once using a difference array, so the whole catalog is computed in one pass instead of
+comparing sections pairwise. As with Section.has_conflict(), only the weekly pattern of a meeting is considered.
+
+Classes:
+- OccupancyMatrix: Represents the occupancy of a set of resources (rooms or instructors) over the time slots of a term.
+- Clash: Represents a resource that is double-booked during a specific time.
+
+Functions:
+- build_occupancy(sections, slot_minutes): Builds the room and instructor OccupancyMatrix objects for each term.
+- find_clashes(matrix): Finds all double-booked resources of an OccupancyMatrix.
+- room_utilization(matrix, first_hour, last_hour, days): Computes the fraction of teaching time each room is in use.
+- occupancy_report(objects, slot_minutes): Creates a JSON serializable clash and utilization report for a data layer.
+"""
+
+WEEK_DAYS = ["Sunday", "Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday"]
+TEACHING_DAYS = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday"]
+
+#Placeholder values used by the catalog when a room or instructor is not known, these are never double-booked
+PLACEHOLDERS = {"", "TBA", "TBD", "Staff", "STAFF"}
+
+class OccupancyMatrix:
+    """
+    Represents the occupancy of a set of resources (rooms or instructors) over the time slots of a term.
+
+    Attributes:
+    - term: The datalayer Term Enum of the matrix.
+    - kind: The kind of resource ("room" or "instructor").
+    - labels: A list of resource names, one per row of the matrix.
+    - slot_minutes: The width of a time slot in minutes.
+    - counts: A (resources x slots) integer numpy array holding the number of meetings in each resource and slot.
+    - meeting_rows: A numpy array holding the row of each meeting.
+    - meeting_starts: A numpy array holding the first slot of each meeting.
+    - meeting_ends: A numpy array holding the slot after the last slot of each meeting.
+    - meeting_sections: A list holding the Section of each meeting.
+
+    Methods:
+    - slot_label(slot): Returns a human-readable day and time for a slot.
+    """
+    def __init__(self, term, kind, labels, slot_minutes, counts, meeting_rows, meeting_starts, meeting_ends, meeting_sections):
+        self.term = term
+        self.kind = kind
+        self.labels = labels
+        self.slot_minutes = slot_minutes
+        self.counts = counts
+        self.meeting_rows = meeting_rows
+        self.meeting_starts = meeting_starts
+        self.meeting_ends = meeting_ends
+        self.meeting_sections = meeting_sections
+
+    def slot_label(self, slot):
+        """
+        Returns a human-readable day and time for a slot.
+
+        Args:
+            slot (int): A slot index.
+
+        Returns:
+            str: The day and time the slot starts at (i.e. Monday 09:30).
+        """
+        slots_per_day = (24 * 60) // self.slot_minutes
+        day, minutes = divmod(int(slot), slots_per_day)
+        minutes *= self.slot_minutes
+        return f"{WEEK_DAYS[day]} {minutes // 60:02d}:{minutes % 60:02d}"
+
+    def __str__(self):
+        return f"{self.kind} occupancy {self.term}: {len(self.labels)} x {self.counts.shape[1]}"
+
+class Clash:
+    """
+    Represents a resource (a room or an instructor) that is double-booked during a specific time.
+
+    Attributes:
+    - term: The datalayer Term Enum of the clash.
+    - kind: The kind of resource ("room" or "instructor").
+    - resource: The name of the double-booked resource.
+    - start: A human-readable start of the clash (i.e. Monday 09:30).
+    - end: A human-readable end of the clash (i.e. Monday 10:30).
+    - sections: A sorted list of the section ids involved in the clash.
+
+    Methods:
+    - to_dict(): Converts the Clash object to a dictionary for JSON serialization.
+    """
+    def __init__(self, term, kind, resource, start, end, sections):
+        self.term = term
+        self.kind = kind
+        self.resource = resource
+        self.start = start
+        self.end = end
+        self.sections = sections
+
+    def to_dict(self):
+        return {"term": str(self.term), "kind": self.kind, "resource": self.resource, "start": self.start, "end": self.end, "sections": self.sections}
+
+    def __str__(self):
+        return f"{self.kind} {self.resource} is double-booked {self.start} - {self.end} in {self.term}: {self.sections}"
+
+def meeting_slots(date, slot_minutes):
+    """
+    Maps a SectionDate to the range of weekly slots it occupies.
+
+    Args:
+        date (SectionDate): A SectionDate object.
+        slot_minutes (int): The width of a time slot in minutes.
+
+    Returns:
+        tuple or None: The (start, end) slots of the meeting, or None if the meeting has no determined day or time.
+    """
+    if date.is_tba() or date.day not in WEEK_DAYS:
+        return None
+    try:
+        start_time = datetime.strptime(date.start_time, "%H:%M")
+        end_time = datetime.strptime(date.end_time, "%H:%M")
+    except (TypeError, ValueError):
+        return None
+
+    day_offset = WEEK_DAYS.index(date.day) * 24 * 60
+    start = (day_offset + start_time.hour * 60 + start_time.minute) // slot_minutes
+    end = -(-(day_offset + end_time.hour * 60 + end_time.minute) // slot_minutes) #round the end up to a full slot
+    if end <= start:
+        return None
+    return start, end
+
+def combined_groups(sections):
+    """
+    Groups the sections that are combined with each other (i.e. cross-listed sections sharing a room and an instructor).
+
+    Args:
+        sections (list): A list of Section objects.
+
+    Returns:
+        dict: A dictionary mapping each section class number to the class number representing its group.
+    """
+    parent = {}
+
+    def find(class_number):
+        parent.setdefault(class_number, class_number)
+        while parent[class_number] != class_number:
+            parent[class_number] = parent[parent[class_number]]
+            class_number = parent[class_number]
+        return class_number
+
+    for section in sections:
+        find(section.class_number)
+        for other in section.combined_with or []:
+            root, other_root = find(section.class_number), find(str(other))
+            if root != other_root:
+                parent[max(root, other_root)] = min(root, other_root)
+
+    return {class_number: find(class_number) for class_number in parent}
+
+def _build_matrix(term, kind, meetings, slot_minutes):
+    """
+    Builds the OccupancyMatrix of a term from a list of (resource, start, end, section) meetings.
+    """
+    labels = sorted({resource for resource, _, _, _ in meetings})
+    row_of = {label: row for row, label in enumerate(labels)}
+    total_slots = 7 * 24 * 60 // slot_minutes
+
+    rows = np.fromiter((row_of[m[0]] for m in meetings), dtype=np.int64, count=len(meetings))
+    starts = np.fromiter((m[1] for m in meetings), dtype=np.int64, count=len(meetings))
+    ends = np.fromiter((m[2] for m in meetings), dtype=np.int64, count=len(meetings))
+
+    #difference array: +1 where a meeting starts and -1 where it ends, the running sum over the slots is the occupancy
+    diff = np.zeros((len(labels), total_slots + 1), dtype=np.int32)
+    np.add.at(diff, (rows, starts), 1)
+    np.add.at(diff, (rows, ends), -1)
+    counts = np.cumsum(diff, axis=1)[:, :total_slots]
+
+    return OccupancyMatrix(term, kind, labels, slot_minutes, counts, rows, starts, ends, [m[3] for m in meetings])
+
+def build_occupancy(sections, slot_minutes=5):
+    """
+    Builds the room and instructor occupancy matrices for each term from the meeting times of a collection of sections.
+
+    Args:
+        sections (Sections): A datalayer Sections collection (typically Sections.ALLSECTIONS).
+        slot_minutes (int, optional): The width of a time slot in minutes. Defaults to 5.
+
+    Returns:
+        dict: A dictionary mapping each Term to a dictionary of {"room": OccupancyMatrix, "instructor": OccupancyMatrix}.
+    """
+    occupancy = {}
+    for term in datalayer.Term:
+        term_sections = sections.get_term_collection(term)
+        groups = combined_groups(term_sections)
+
+        #combined sections meet together, so each (group, resource, start, end) is only booked once
+        seen = set()
+        room_meetings = []
+        instructor_meetings = []
+        for section in term_sections:
+            group = groups[section.class_number]
+            for date in section.dates:
+                slots = meeting_slots(date, slot_minutes)
+                if slots is None:
+                    continue
+
+                if date.location not in PLACEHOLDERS and ("room", group, date.location, slots) not in seen:
+                    seen.add(("room", group, date.location, slots))
+                    room_meetings.append((date.location, slots[0], slots[1], section))
+
+                for instructor in date.instructors or []:
+                    if instructor not in PLACEHOLDERS and ("instructor", group, instructor, slots) not in seen:
+                        seen.add(("instructor", group, instructor, slots))
+                        instructor_meetings.append((instructor, slots[0], slots[1], section))
+
+        occupancy[term] = {
+            "room": _build_matrix(term, "room", room_meetings, slot_minutes),
+            "instructor": _build_matrix(term, "instructor", instructor_meetings, slot_minutes),
+        }
+    return occupancy
+
+def find_clashes(matrix):
+    """
+    Finds all double-booked resources of an OccupancyMatrix.
+
+    Every contiguous run of slots in which a resource holds more than one meeting is reported once, together with
+    the sections whose meetings overlap that run.
+
+    Args:
+        matrix (OccupancyMatrix): The occupancy matrix to check.
+
+    Returns:
+        list: A list of Clash objects.
+    """
+    if matrix.counts.size == 0:
+        return []
+
+    clashing = matrix.counts > 1
+    if not clashing.any():
+        return []
+
+    #runs of clashing slots per row, found from the edges of the boolean mask
+    padded = np.zeros((clashing.shape[0], clashing.shape[1] + 2), dtype=np.int8)
+    padded[:, 1:-1] = clashing
+    edges = np.diff(padded, axis=1)
+    run_rows, run_starts = np.nonzero(edges == 1)
+    _, run_ends = np.nonzero(edges == -1)
+
+    #a meeting takes part in a run if it overlaps it, checked for all meetings and runs of a row at once
+    clashes = []
+    for row, start, end in zip(run_rows, run_starts, run_ends):
+        in_row = matrix.meeting_rows == row
+        overlapping = in_row & (matrix.meeting_starts < end) & (matrix.meeting_ends > start)
+        sections = sorted({matrix.meeting_sections[i].id for i in np.nonzero(overlapping)[0]})
+        clashes.append(Clash(matrix.term, matrix.kind, matrix.labels[row], matrix.slot_label(start), matrix.slot_label(end), sections))
+    return clashes
+
+def room_utilization(matrix, first_hour=8, last_hour=22, days=TEACHING_DAYS):
+    """
+    Computes the fraction of teaching time each room is in use.
+
+    Args:
+        matrix (OccupancyMatrix): A room occupancy matrix.
+        first_hour (int, optional): The first teaching hour of a day. Defaults to 8.
+        last_hour (int, optional): The hour teaching ends at. Defaults to 22.
+        days (list, optional): The teaching days of the week. Defaults to Monday to Friday.
+
+    Returns:
+        dict: A dictionary mapping each room to its utilization between 0 and 1.
+    """
+    slots_per_day = (24 * 60) // matrix.slot_minutes
+    window = np.zeros(matrix.counts.shape[1], dtype=bool)
+    for day in days:
+        offset = WEEK_DAYS.index(day) * slots_per_day
+        window[offset + first_hour * 60 // matrix.slot_minutes: offset + last_hour * 60 // matrix.slot_minutes] = True
+
+    used = np.count_nonzero((matrix.counts > 0) & window, axis=1)
+    utilization = used / max(np.count_nonzero(window), 1)
+    return {label: round(float(value), 4) for label, value in zip(matrix.labels, utilization)}
+
+def occupancy_report(objects, slot_minutes=5):
+    """
+    Creates a clash and utilization report for a data layer.
+
+    Args:
+        objects (dict): A dictionary containing the datalayer collections.
+        slot_minutes (int, optional): The width of a time slot in minutes. Defaults to 5.
+
+    Returns:
+        dict: A JSON serializable dictionary with, for each term, the double-booked rooms, the double-booked instructors and the room utilization.
+    """
+    occupancy = build_occupancy(objects["sections"], slot_minutes)
+    report = {}
+    for term, matrices in occupancy.items():
+        report[str(term)] = {
+            "room_clashes": [clash.to_dict() for clash in find_clashes(matrices["room"])],
+            "instructor_clashes": [clash.to_dict() for clash in find_clashes(matrices["instructor"])],
+            "room_utilization": room_utilization(matrices["room"]),
+        }
+    return report
+
+if __name__ == "__main__":
+    import utils
+
+    if len(sys.argv) != 2:
+        print("\n\tpython3 occupancy.py <data location>\n")
+        exit(1)
+    utils.display_occupancy_report(occupancy_report(utils.create_data_layer(sys.argv[1])))
@@ -0,0 +1,358 @@
+from collections import defaultdict
+from itertools import combinations
+
+"""
+CNF Preprocessing
+
+Simplifies the integer clauses of a cnf.CNFEncoding before they are handed to kissat. The theories are redundant by
+construction: constants pinned by unit clauses, the same clause written by several constraint families, binary clauses
+that subsume longer ones and chains of equivalent enrolments (i.e. the only section of a course in a term is taken if
+and only if the term is). The techniques run in a fixed order:
+- propagate: Substitutes the constants of the unit clauses, until no new constants are found.
+- deduplicate: Removes repeated literals, tautologies and duplicate clauses.
+- substitute: Replaces every literal by the representative of its equivalence class, the strongly connected components
+  of the implication graph of the binary clauses.
+- subsume: Removes the clauses that contain every literal of a shorter clause.
+- eliminate: Bounded variable elimination, replaces the clauses of a variable by their resolvents when there are no
+  more resolvents than clauses.
+
+Every removed variable is recorded so that a model of the simplified clauses can be extended into a model of the
+original clauses, see Preprocessor.extend(): fixed variables take their constant, substituted variables the value of
+their representative and eliminated variables the value that satisfies their clauses, in the reverse order of removal.
+
+Classes:
+- Preprocessor: Simplifies a list of clauses and reconstructs the models of the original clauses.
+"""
+
+#the largest occurrence list scanned for the clauses a clause subsumes
+SUBSUMPTION_OCCURRENCES = 1000
+
+#the longest clause checked for a subsuming binary clause
+SUBSUMPTION_LENGTH = 32
+
+#a variable is only eliminated if it occurs in at most this many clauses of each sign
+ELIMINATION_OCCURRENCES = 16
+
+#a variable is only eliminated if none of its resolvents are longer
+ELIMINATION_LENGTH = 16
+
+TECHNIQUES = ["propagate", "deduplicate", "substitute", "subsume", "eliminate"]
+
+class Preprocessor:
+    """
+    Simplifies a list of clauses over the variables 1 to variables, and reconstructs the models of the original clauses.
+
+    Attributes:
+    - clauses: The list of clauses, each a list of non-zero integer literals.
+    - variables: The number of variables.
+    - values: The value of every literal fixed by a unit clause, indexed by the literal itself (negative literals index
+      from the end of the list), None if the literal is not fixed.
+    - stack: The ("equivalent", variable, literal) and ("eliminated", variable, clauses) removals, in order.
+    - contradiction: True if the empty clause was derived, the clauses are unsatisfiable.
+    - statistics: The number of variables or clauses removed by each technique.
+
+    Methods:
+    - run(techniques): Runs the techniques in order, see TECHNIQUES.
+    - propagate(), deduplicate(), substitute(), subsume(), eliminate(): The techniques.
+    - extend(model): Extends a model of the simplified clauses into a model of the original clauses.
+    """
+    def __init__(self, clauses, variables):
+        self.clauses = clauses
+        self.variables = variables
+        self.values = [None] * (2 * variables + 1)
+        self.stack = []
+        self.contradiction = False
+        self.statistics = {technique: 0 for technique in TECHNIQUES}
+
+    def run(self, techniques=TECHNIQUES):
+        """
+        Runs the techniques in the order of TECHNIQUES. The duplicates and constants left by substitute() and
+        eliminate() are removed and propagated again.
+
+        Args:
+            techniques (list, optional): The techniques to run, every technique by default.
+
+        Returns:
+            dict: The number of variables or clauses removed by each technique.
+        """
+        for technique in TECHNIQUES:
+            if technique in techniques and not self.contradiction:
+                getattr(self, technique)()
+                if technique in ("substitute", "eliminate"):
+                    if "deduplicate" in techniques:
+                        self.deduplicate()
+                    if "propagate" in techniques:
+                        self.propagate()
+        if self.contradiction:
+            self.clauses = [[]]
+        return self.statistics
+
+    #TECHNIQUES
+    def assign(self, literal):
+        if self.values[literal] is False:
+            self.contradiction = True
+        elif self.values[literal] is None:
+            self.statistics["propagate"] += 1
+        self.values[literal] = True
+        self.values[-literal] = False
+
+    def propagate(self):
+        """
+        Substitutes the constants of the unit clauses. Satisfied clauses are dropped and false literals are removed, a
+        clause left with a single literal fixes another constant, until no new constants are found.
+        """
+        values = self.values
+        remaining = []
+        changed = False #the other techniques never leave a fixed literal in a clause, only new units are propagated
+        for clause in self.clauses:
+            if len(clause) == 1:
+                self.assign(clause[0])
+                changed = True
+            elif len(clause) == 0:
+                self.contradiction = True
+            else:
+                remaining.append(clause)
+
+        while changed and not self.contradiction:
+            changed = False
+            kept = []
+            for clause in remaining:
+                reduced = []
+                for literal in clause:
+                    value = values[literal]
+                    if value is None:
+                        reduced.append(literal)
+                    elif value:
+                        break #the clause is satisfied
+                else:
+                    if len(reduced) == 0:
+                        self.contradiction = True
+                    elif len(reduced) == 1:
+                        self.assign(reduced[0])
+                        changed = True
+                    else:
+                        kept.append(reduced)
+            remaining = kept
+        self.clauses = remaining
+
+    def deduplicate(self):
+        """
+        Removes the repeated literals of every clause, the tautologies and the duplicate clauses.
+        """
+        seen = set()
+        remaining = []
+        for clause in self.clauses:
+            literals = set(clause)
+            key = tuple(sorted(literals))
+            if key in seen or any(-literal in literals for literal in key if literal > 0):
+                continue
+            seen.add(key)
+            remaining.append(list(key))
+        self.statistics["deduplicate"] += len(self.clauses) - len(remaining)
+        self.clauses = remaining
+
+    def substitute(self):
+        """
+        Replaces every literal by the representative of its equivalence class. The binary clause a | b is the pair of
+        implications ~a -> b and ~b -> a, the literals of a strongly connected component of the implications are
+        equivalent. The representative of a component is its literal with the smallest variable, a component with a
+        literal and its negation makes the clauses unsatisfiable.
+        """
+        implications = defaultdict(list)
+        for clause in self.clauses:
+            if len(clause) == 2:
+                implications[-clause[0]].append(clause[1])
+                implications[-clause[1]].append(clause[0])
+
+        representative = {}
+        for component in strongly_connected(implications):
+            if len(component) < 2:
+                continue
+            first = min(component, key=abs)
+            if -first in component:
+                self.contradiction = True
+                return
+            #the negated literals form the negated component, that is given the negated representative
+            for literal in component:
+                representative[literal] = first
+                representative[-literal] = -first
+
+        substituted = set()
+        for literal, first in representative.items():
+            variable = abs(literal)
+            if variable != abs(first) and variable not in substituted:
+                substituted.add(variable)
+                self.stack.append(("equivalent", variable, first if literal == variable else -first))
+        self.statistics["substitute"] += len(substituted)
+        if len(substituted) > 0:
+            self.clauses = [[representative.get(literal, literal) for literal in clause] for clause in self.clauses]
+
+    def subsume(self):
+        """
+        Removes the clauses that contain every literal of a shorter clause. A clause is subsumed by a binary clause if
+        one of its pairs of literals is a binary clause (clauses of up to SUBSUMPTION_LENGTH literals), the clauses
+        containing a longer clause are found in the occurrences of its least frequent literal.
+        """
+        binary = {tuple(clause) for clause in self.clauses if len(clause) == 2}
+        removed = [False] * len(self.clauses)
+        for index, clause in enumerate(self.clauses):
+            if 2 < len(clause) <= SUBSUMPTION_LENGTH and any(pair in binary for pair in combinations(clause, 2)):
+                removed[index] = True
+
+        #deduplicate() sorts the literals of every clause, so the pairs of a clause are sorted as the binary clauses
+        occurrences = defaultdict(list)
+        for index, clause in enumerate(self.clauses):
+            if len(clause) > 2 and not removed[index]:
+                for literal in clause:
+                    occurrences[literal].append(index)
+        longer = [index for index, clause in enumerate(self.clauses) if len(clause) > 2 and not removed[index]]
+        for index in sorted(longer, key=lambda index: len(self.clauses[index])):
+            clause = self.clauses[index]
+            if removed[index]:
+                continue
+            candidates = min((occurrences[literal] for literal in clause), key=len)
+            if len(candidates) > SUBSUMPTION_OCCURRENCES:
+                continue
+            for other in candidates:
+                if other != index and not removed[other] and len(self.clauses[other]) > len(clause):
+                    if all(literal in self.clauses[other] for literal in clause):
+                        removed[other] = True
+
+        remaining = [clause for index, clause in enumerate(self.clauses) if not removed[index]]
+        self.statistics["subsume"] += len(self.clauses) - len(remaining)
+        self.clauses = remaining
+
+    def eliminate(self):
+        """
+        Bounded variable elimination. The clauses of a variable are replaced by the non tautological resolvents of its
+        positive and negative clauses, if there are no more resolvents than clauses. The variables with the fewest
+        occurrences are eliminated first, a variable is skipped if it occurs too often (ELIMINATION_OCCURRENCES) or a
+        resolvent is too long (ELIMINATION_LENGTH). The positive clauses of an eliminated variable are kept to
+        reconstruct its value.
+        """
+        clauses = self.clauses
+        occurrences = defaultdict(list)
+        for index, clause in enumerate(clauses):
+            for literal in clause:
+                occurrences[literal].append(index)
+
+        def live(literal):
+            return [index for index in occurrences[literal] if clauses[index] is not None]
+
+        candidates = sorted(
+            {abs(literal) for literal in occurrences},
+            key=lambda variable: len(occurrences[variable]) * len(occurrences[-variable]),
+        )
+        for variable in candidates:
+            positive, negative = live(variable), live(-variable)
+            if len(positive) > ELIMINATION_OCCURRENCES or len(negative) > ELIMINATION_OCCURRENCES:
+                continue
+            if len(positive) + len(negative) == 0:
+                continue
+
+            resolvents = []
+            for first in positive:
+                for second in negative:
+                    resolvent = set(clauses[first]) | set(clauses[second])
+                    resolvent.discard(variable)
+                    resolvent.discard(-variable)
+                    if any(-literal in resolvent for literal in resolvent if literal > 0):
+                        continue #a tautology
+                    resolvents.append(sorted(resolvent))
+                    if len(resolvents) > len(positive) + len(negative) or len(resolvent) > ELIMINATION_LENGTH:
+                        break
+                else:
+                    continue
+                break
+            else:
+                self.stack.append(("eliminated", variable, [clauses[index] for index in positive]))
+                self.statistics["eliminate"] += 1
+                for index in positive + negative:
+                    clauses[index] = None
+                for resolvent in resolvents:
+                    if len(resolvent) == 0:
+                        self.contradiction = True
+                    for literal in resolvent:
+                        occurrences[literal].append(len(clauses))
+                    clauses.append(resolvent)
+
+        self.clauses = [clause for clause in clauses if clause is not None]
+
+    #RECONSTRUCTION
+    def extend(self, model):
+        """
+        Extends a model of the simplified clauses into a model of the original clauses, in place.
+
+        Args:
+            model (list): The value of every variable indexed by the variable, the variables removed by the
+                preprocessing are overwritten.
+
+        Returns:
+            list: The model.
+        """
+        for variable in range(1, self.variables + 1):
+            if self.values[variable] is not None:
+                model[variable] = self.values[variable]
+
+        def value(literal):
+            return model[literal] if literal > 0 else not model[-literal]
+
+        for kind, variable, removed in reversed(self.stack):
+            if kind == "equivalent":
+                model[variable] = value(removed)
+            else:
+                #false unless a positive clause needs it, the resolvents guarantee the negative clauses are then satisfied
+                model[variable] = False
+                model[variable] = any(not any(value(literal) for literal in clause if literal != variable) for clause in removed)
+        return model
+
+def strongly_connected(graph):
+    """
+    Returns the strongly connected components of a directed graph, Tarjan's algorithm without recursion.
+
+    Args:
+        graph (dict): A dictionary mapping every node to the list of its successors.
+
+    Returns:
+        list: The components, each a list of nodes.
+    """
+    index = {}
+    lowlink = {}
+    on_stack = set()
+    stack = []
+    components = []
+    counter = 0
+    for root in list(graph):
+        if root in index:
+            continue
+        work = [(root, 0)]
+        while work:
+            node, position = work.pop()
+            if position == 0:
+                index[node] = lowlink[node] = counter
+                counter += 1
+                stack.append(node)
+                on_stack.add(node)
+            successors = graph.get(node, ())
+            for position in range(position, len(successors)):
+                successor = successors[position]
+                if successor not in index:
+                    work.append((node, position + 1))
+                    work.append((successor, 0))
+                    break
+                if successor in on_stack:
+                    lowlink[node] = min(lowlink[node], index[successor])
+            else:
+                if lowlink[node] == index[node]:
+                    component = []
+                    while True:
+                        member = stack.pop()
+                        on_stack.discard(member)
+                        component.append(member)
+                        if member == node:
+                            break
+                    components.append(component)
+                if work:
+                    parent = work[-1][0]
+                    lowlink[parent] = min(lowlink[parent], lowlink[node])
+    return components
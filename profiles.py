@@ -0,0 +1,110 @@
+"""
+Multiplicity Encoding of Identical Student Profiles
+
+Large cohorts contain many students with the same academic year, program, completed courses and wish list, that have
+no mutual friendships and are not part of a study group. The constraints of these students are identical, only the
+capacity of the sections couples them, so each profile is encoded once for a few representative students (variants)
+instead of once per student.
+
+Every variant stands for a number of students of its profile (its weight), the weights are the powers of two up to the
+size of the profile and the remainder, i.e. 1, 2, 4, 8, 16, 32 and 37 for a profile of 100 students. A variant takes a
+single timetable that is shared by the students it stands for, so it is counted weight times by the capacity of its
+sections. The theory grows with the number of profiles and the logarithm of their size instead of the number of students.
+
+The students of a variant are assigned the timetable of the variant after solving, see sat_solver.expand_profiles().
+A split of a profile across timetables that the weights can not express (i.e. three timetables for three students with
+weights 1 and 2) is not found, so an unsatisfiable multiplicity theory is solved again with every student encoded. Every
+cohort that is truly unsatisfiable is then built and solved twice, and the capacity counters of the sections still grow
+with the number of students the variants stand for. The encoding is therefore off unless "multiplicity_encoding" is set
+in config.json; counting the students of every profile per section would lift both limits.
+
+Classes:
+- Profile: Represents the students of a cohort with an identical profile and their variants.
+
+Functions:
+- profile_key(student): Returns the profile of a student.
+- variant_weights(count): Returns the weights of the variants of a profile.
+- find_profiles(students, friendships, study_groups): Groups the students of a cohort by profile.
+"""
+
+class Profile:
+    """
+    Represents the students of a cohort with an identical profile and their variants.
+
+    Attributes:
+    - key: The profile, see profile_key().
+    - students: The Student objects with the profile.
+    - variants: A list of (Student, weight, [Student]) tuples, the encoded student, the number of students it stands
+      for and the students (itself first) that are assigned its timetable.
+    """
+    def __init__(self, key, students):
+        self.key = key
+        self.students = students
+        self.variants = []
+        start = 0
+        for weight in variant_weights(len(students)):
+            members = students[start:start + weight]
+            self.variants.append((members[0], weight, members))
+            start += weight
+
+    def __str__(self):
+        return f"Profile: {len(self.students)} students encoded as {len(self.variants)} variants ({', '.join(str(weight) for _, weight, _ in self.variants)})"
+
+def profile_key(student):
+    """
+    Returns the profile of a student, the students with equal profiles have identical constraints.
+
+    Returns:
+        tuple: The academic year, program, completed course ids and wished course ids of the student.
+    """
+    return (
+        str(student.academic_year),
+        str(student.program),
+        tuple(sorted(course.id for course in list(student.completed_courses) if course is not None)),
+        tuple(sorted(course.id for course in list(student.course_wish_list) if course is not None)),
+    )
+
+def variant_weights(count):
+    """
+    Returns the weights of the variants of a profile, the powers of two below the size of the profile and the remainder.
+
+    Args:
+        count (int): The number of students with the profile.
+
+    Returns:
+        list: The weights, summing up to count.
+    """
+    weights = []
+    weight = 1
+    while sum(weights) + weight <= count:
+        weights.append(weight)
+        weight *= 2
+    if sum(weights) < count:
+        weights.append(count - sum(weights))
+    return weights
+
+def find_profiles(students, friendships=(), study_groups=None):
+    """
+    Groups the students of a cohort by profile. Students with a mutual friendship or in a study group have constraints
+    of their own and are never part of a profile.
+
+    Args:
+        students (Students): The students of the cohort.
+        friendships (list, optional): The mutual friendships, see sat_solver.reciprocal_friendships().
+        study_groups (StudyGroups, optional): The study groups of the cohort.
+
+    Returns:
+        list: The Profile objects of at least two students.
+    """
+    grouped = set()
+    for student, friend, courses in friendships:
+        grouped.update((student.name, friend.name))
+    for group in (study_groups if study_groups is not None else []):
+        grouped.update(member.name for member in group.members)
+
+    profiles = {}
+    for student in students:
+        if student.name not in grouped:
+            profiles.setdefault(profile_key(student), []).append(student)
+
+    return [Profile(key, members) for key, members in profiles.items() if len(members) > 1]
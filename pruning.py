@@ -0,0 +1,176 @@
+"""
+Pre-Encoding Pruning of Sections
+
+Removes the sections a student can never be enrolled in before any proposition is created, so that the theory does not
+carry their StudentEnrolledCourseSection propositions, at most one clauses, capacity and time conflict clauses only to
+force them false:
+- Sections without seats left (enrollment_total >= enrollment_capacity), for every student.
+- Sections that conflict with every section of a wished course the student must take during the same term. A wished
+  course must be taken (see sat_solver CONSTRAINT 10), so a course with a single term left is taken during that term.
+- Terms left without sections.
+
+Pruning a section can leave another course with a single term, so the conflicts are pruned until nothing changes.
+Every pruned term and section is recorded with its reason, so an unsatisfiable cohort can still be explained.
+
+Classes:
+- Pruned: Represents a section or term that was pruned for a student.
+- Offerings: Represents the terms and sections of every wished course that are left for each student.
+
+Functions:
+- prune(objects): Prunes the sections of every student of a data layer.
+"""
+
+class Pruned:
+    """
+    Represents a section or term that was pruned for a student.
+
+    Attributes:
+    - student: The name of the student.
+    - course: The course code.
+    - term: The Term of the section.
+    - section: The Section id, None if the whole term was pruned.
+    - reason: A human-readable reason.
+    """
+    def __init__(self, student, course, term, section, reason):
+        self.student = student
+        self.course = course
+        self.term = term
+        self.section = section
+        self.reason = reason
+
+    def to_dict(self):
+        return {"student": self.student, "course": self.course, "term": str(self.term), "section": self.section, "reason": self.reason}
+
+    def __str__(self):
+        if self.section is None:
+            return f"{self.student}: {self.course} {self.term} pruned, {self.reason}"
+        return f"{self.student}: {self.course} {self.term} {self.section} pruned, {self.reason}"
+
+class Offerings:
+    """
+    Represents the terms and sections of every wished course that are left for each student after pruning. The builder
+    reads the offerings from here instead of course.sections, a course without an entry (i.e. a course that is not
+    wished for) keeps all of its sections.
+
+    Attributes:
+    - pruned: A list of Pruned objects, one for every pruned term and section.
+
+    Methods:
+    - terms(student, course): Returns the terms of a course left for a student.
+    - sections(student, course, term): Returns the sections of a course during a term left for a student.
+    - is_pruned(student, course, term): Returns True if the course is offered during the term but no section is left for the student.
+    - pruned_for(student, course): Returns the pruned terms and sections of a course for a student.
+    """
+    def __init__(self):
+        self._offerings = {} #(student, course id) -> {term: [sections]}
+        self.pruned = []
+
+    def set(self, student, course, offering):
+        self._offerings[(student.name, course.id)] = offering
+
+    def _offering(self, student, course):
+        offering = self._offerings.get((student.name, course.id))
+        if offering is None:
+            offering = {term: course.sections.get_term_collection(term) for term in course.sections.get_term_offerings()}
+        return offering
+
+    def terms(self, student, course):
+        """
+        Returns the terms of a course left for a student.
+
+        Returns:
+            list: A list of Term Enums, in the order of Sections.get_term_offerings().
+        """
+        return list(self._offering(student, course))
+
+    def sections(self, student, course, term):
+        """
+        Returns the sections of a course during a term left for a student.
+
+        Returns:
+            list: A list of Section objects, empty if the term was pruned or the course is not offered during the term.
+        """
+        return self._offering(student, course).get(term, [])
+
+    def is_pruned(self, student, course, term):
+        """
+        Returns True if the course is offered during the term but no section is left for the student, the propositions of
+        the term are false in every model.
+        """
+        return term in course.sections.get_term_offerings() and term not in self._offering(student, course)
+
+    def pruned_for(self, student, course):
+        """
+        Returns the pruned terms and sections of a course for a student.
+
+        Returns:
+            list: A list of Pruned objects.
+        """
+        return [pruned for pruned in self.pruned if pruned.student == student.name and pruned.course == course.id]
+
+    def __str__(self):
+        return f"Offerings: {len(self._offerings)} courses, {len(self.pruned)} sections and terms pruned"
+
+def _has_seat(section):
+    return section.enrollment_total < section.enrollment_capacity
+
+def prune(objects):
+    """
+    Prunes the sections of every student of a data layer.
+
+    Args:
+        objects (dict): A dictionary of datalayer collections.
+
+    Returns:
+        Offerings: The terms and sections left for each student, and the pruned terms and sections.
+    """
+    offerings = Offerings()
+
+    for student in objects["students"]:
+        #SECTIONS WITHOUT SEATS
+        left = {}
+        for course in student.course_wish_list:
+            left[course] = {}
+            for term in course.sections.get_term_offerings():
+                sections = []
+                for section in course.sections.get_term_collection(term):
+                    if _has_seat(section):
+                        sections.append(section)
+                    else:
+                        offerings.pruned.append(Pruned(student.name, course.id, term, section.id, "no seats left"))
+                if len(sections) > 0:
+                    left[course][term] = sections
+                else:
+                    offerings.pruned.append(Pruned(student.name, course.id, term, None, "no section with seats left"))
+
+        #SECTIONS THAT CONFLICT WITH A COURSE THAT MUST BE TAKEN DURING THE SAME TERM
+        wished = list(left) #the Courses iterator is shared, so it can not be nested
+        changed = True
+        while changed:
+            changed = False
+            for fixed in wished:
+                if len(left[fixed]) != 1:
+                    continue
+                term, fixed_sections = next(iter(left[fixed].items()))
+
+                for course in wished:
+                    if course is fixed or term not in left[course]:
+                        continue
+                    sections = []
+                    for section in left[course][term]:
+                        if all(section.has_conflict(fixed_section) for fixed_section in fixed_sections):
+                            offerings.pruned.append(Pruned(student.name, course.id, term, section.id, f"conflicts with every section of {fixed.id}, which must be taken during {term}"))
+                        else:
+                            sections.append(section)
+                    if len(sections) < len(left[course][term]):
+                        changed = True
+                        if len(sections) > 0:
+                            left[course][term] = sections
+                        else:
+                            del left[course][term]
+                            offerings.pruned.append(Pruned(student.name, course.id, term, None, f"every section conflicts with {fixed.id}"))
+
+        for course, offering in left.items():
+            offerings.set(student, course, offering)
+
+    return offerings
@@ -7,6 +7,8 @@ import json
 import datalayer
 import os
 import sat_solver
+import cnf
+import decomposition
 import utils
 import threading
 import webapp_api
@@ -98,6 +100,14 @@ def normal_mode(cases):
             break
     
         result = utils.sat_solve_request(test_case)
+        if result != None and result != False and result.get("Statistics") is not None:
+            print(result["Statistics"]) #what every constraint family adds to the theory, see encoding_report.py
+
+        if result != None and result != False and len(result.get("Screening", [])) > 0:
+            print(f"{TextColor.FAIL}The theory was not built, the cohort failed the screening:{TextColor.ENDC}") #see screening.py
+            for impossibility in result["Screening"]:
+                print("   %s" % impossibility)
+
         if  result != None and result != False and result["Solution"] is not None:
             T = result["Theory"]
             S = result["Solution"]
@@ -107,9 +117,12 @@ def normal_mode(cases):
                 utils.display_propositions(S)#show all propositions
             
             print("\n")
-            print("Satisfiable: %s" % T.satisfiable())
-            print("# Solutions: %d" % count_solutions(T))
-            if count_solutions(T) != 0:
+            print("Satisfiable: %s" % (S is not None))
+            if isinstance(T, (cnf.CNFEncoding, decomposition.ComponentTheories)): #model counting needs the compiled bauhaus theory of the cohort
+                print(T)
+            else:
+                print("# Solutions: %d" % count_solutions(T))
+            if S is not None:
                 print("   Solution:")
                 print("\n")
                 utils.display_course_selection(S, O)
@@ -174,6 +187,11 @@ def dev_mode():
             print("\n")
         
 
+        if result != None and result != False and len(result.get("Screening", [])) > 0:
+            print(f"{TextColor.FAIL}The theory was not built, the cohort failed the screening:{TextColor.ENDC}") #see screening.py
+            for impossibility in result["Screening"]:
+                print("   %s" % impossibility)
+
         if  result != None and result != False and result["Solution"] is not None:
             T = result["Theory"]
             S = result["Solution"]
@@ -184,9 +202,12 @@ def dev_mode():
                 utils.display_propositions(S)#show all propositions
             
             print("\n")
-            print("Satisfiable: %s" % T.satisfiable())
-            print("# Solutions: %d" % count_solutions(T))
-            if count_solutions(T) != 0:
+            print("Satisfiable: %s" % (S is not None))
+            if isinstance(T, (cnf.CNFEncoding, decomposition.ComponentTheories)): #model counting needs the compiled bauhaus theory of the cohort
+                print(T)
+            else:
+                print("# Solutions: %d" % count_solutions(T))
+            if S is not None:
                 print("   Solution:")
                 print("\n")
                 utils.display_course_selection(S, O)
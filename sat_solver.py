@@ -1,34 +1,354 @@
 
 from bauhaus import Encoding, proposition, constraint
 from bauhaus.utils import count_solutions, likelihood
+from bauhaus.core import CustomNNF
 from bauhaus import Encoding, proposition, constraint, Or, And
 
 import datalayer
 import utils
+import cnf
+import cardinality
+import screening
+import pruning
+import conflicts
+import profiles
+import preprocessing
+import encoding_report
+import decomposition
+from cardinality import CardinalityConstraints
+from tseitin import FormulaDefinitions
 
 """
     Builds, Creates and Compiles the course scheduling solver, also defines propostions and constraints for modeling course
     scheduling and enrolment considering various enrolment requirements and time conflicts.
 """
 
+from functools import wraps
+from concurrent import futures
+from array import array
+import math
+import multiprocessing
+import time
+import numpy as np
+import nnf
 from nnf import config
 config.sat_backend = "kissat"
 
 E = Encoding()
 
-class Hashable:
-    def __hash__(self):
-        return hash(str(self))
+class PropositionTable:
+    """
+    Interns the propositions of a data layer.
 
-    def __eq__(self, __value: object) -> bool:
-        return hash(self) == hash(__value)
+    Every proposition is stored under its class and a tuple of integer ids, where datalayer objects are identified by
+    their uid and Terms by their position. Constructing the same proposition twice returns the same object, so
+    propositions hash in O(1) and compare by identity without formatting their string representation.
+
+    The uids restart at 0 for every data layer, so every datalayer.Layer has a table of its own: a proposition is
+    interned in the table of the first of its arguments with a layer, the student, or the course of a proposition
+    without a student. The propositions of data layers alive at the same time never mix, and a table is freed with
+    its data layer.
+
+    Attributes:
+    - propositions: A dictionary mapping (class, ids...) keys to proposition objects.
+    - symbols: A dictionary mapping values without a datalayer uid (i.e. a course code) to negative ids.
+
+    Methods:
+    - of(args): Returns the table of the propositions over some arguments.
+    - key_of(value): Returns the integer id of a proposition argument.
+    - reference(proposition): Returns a reference to a proposition that can be sent to another process.
+    - resolve(reference, students): Returns the proposition of a reference.
+    """
+    TERM_IDS = {"FALL": 0, "WINTER": 1, "SUMMER": 2}
+    UNMAPPED = datalayer.Layer() #the layer of the propositions over objects that were not mapped by the datalayer
+
+    def __init__(self):
+        self.propositions = {}
+        self.symbols = {}
+
+    @staticmethod
+    def of(args):
+        """
+        Returns the table of the propositions over some arguments, the table of the first argument with a layer.
+
+        Args:
+            args (tuple): The arguments of a proposition.
+
+        Returns:
+            PropositionTable: The table of the layer of the arguments, created on first use.
+        """
+        for value in args:
+            layer = getattr(value, "layer", None)
+            if layer is not None:
+                break
+        else:
+            layer = PropositionTable.UNMAPPED
+        if layer.propositions is None:
+            layer.propositions = PropositionTable()
+        return layer.propositions
+
+    def key_of(self, value):
+        """
+        Returns the integer id of a proposition argument.
+
+        Args:
+            value: A datalayer Student, Course, Section or Term, or a name.
+
+        Returns:
+            int: The uid of the datalayer object, or a negative symbol id for values that are not part of the data layer.
+        """
+        uid = getattr(value, "uid", None)
+        if uid is not None:
+            return uid
+
+        if isinstance(value, datalayer.Term):
+            return PropositionTable.TERM_IDS[value.name]
+
+        #symbols start at -2 since hash(-1) == hash(-2), bauhaus constraint builders compare by hash so keys must not collide
+        symbol = self.symbols.get(value)
+        if symbol is None:
+            symbol = -(len(self.symbols) + 2)
+            self.symbols[value] = symbol
+        return symbol
+
+    @staticmethod
+    def reference(proposition):
+        """
+        Returns a reference to a proposition that can be sent to another process, the integer ids of the keys are only
+        valid in the process that created them.
+
+        Returns:
+            tuple: The class id of the proposition and its arguments, Students, Courses and Sections are replaced by a
+            (class name, name or id) tuple.
+        """
+        arguments = []
+        for value in proposition._args:
+            if isinstance(value, datalayer.Student):
+                value = ("Student", value.name)
+            elif isinstance(value, datalayer.Course):
+                value = ("Course", value.id)
+            elif isinstance(value, datalayer.Section):
+                value = ("Section", value.id)
+            arguments.append(value)
+        return (type(proposition).class_id, tuple(arguments))
+
+    @staticmethod
+    def resolve(reference, students):
+        """
+        Returns the proposition of a reference returned by reference().
+
+        Args:
+            reference (tuple): The reference.
+            students (dict): A dictionary mapping the names of the students of the cohort to their Student object.
+
+        Returns:
+            The interned proposition.
+        """
+        class_id, arguments = reference
+        values = []
+        for value in arguments:
+            if isinstance(value, tuple):
+                kind, name = value
+                if kind == "Student":
+                    value = students[name]
+                elif kind == "Course":
+                    value = datalayer.Courses.ALLCOURSES[name]
+                else:
+                    value = datalayer.Sections.ALLSECTIONS[name]
+            values.append(value)
+        return PropositionClass.CLASSES[class_id](*values)
+
+class PropositionClass(type):
+    """
+    Metaclass of the propositions. Calling a proposition class returns the interned proposition of its arguments from
+    the PropositionTable of their data layer, and the names of the proposition classes stay classes, so isinstance()
+    and type() work against them. Every new proposition is registered with the bauhaus Encoding E as the instances of a
+    @proposition decorated class are.
+
+    Attributes:
+    - CLASSES: The proposition classes by class id, the class ids are part of the references sent to other processes.
+    """
+    CLASSES = []
+
+    def __init__(cls, name, bases, namespace):
+        super().__init__(name, bases, namespace)
+        if len(bases) > 0: #not the Hashable base class
+            cls.class_id = len(PropositionClass.CLASSES)
+            PropositionClass.CLASSES.append(cls)
+
+    def __call__(cls, *args):
+        table = PropositionTable.of(args)
+        ids = [table.key_of(value) for value in args]
+        key = (cls, *ids) #the class itself, the classes of a reloaded module do not share the propositions of the old ones
+        prop = table.propositions.get(key)
+        if prop is None:
+            prop = super().__call__(*args)
+            prop._hash = hash((cls.class_id, *ids))
+            prop._args = args
+            prop._var = nnf.Var(prop)
+            E.propositions[cls.__qualname__][id(prop)] = prop
+            table.propositions[key] = prop
+        return prop
+
+class Clauses:
+    """
+    The integer clauses of an NNFBackend, added to the custom constraints of E as a single constraint. The nnf clauses are
+    only created when bauhaus compiles the custom constraints with compile().
+
+    The clauses form a hash-consed DAG: a clause is stored once under its sorted literals however often the constraint
+    families add it, and every nnf literal is created once and shared by the clauses it appears in. The sub-formulas of
+    the requirement rules are shared through their Tseitin definitions (see tseitin.py), so every node of the compiled
+    theory is unique and the theory is already in CNF.
+
+    Attributes:
+    - literals: A list mapping each integer variable to its nnf variable, index 0 is unused.
+    - clauses: A dictionary whose keys are the clauses, tuples of sorted integer literals.
+    - added: The number of clauses added, including the duplicates.
+    - added_literals: The number of literals of the clauses added.
+    """
+    def __init__(self, literals):
+        self.literals = literals #the nnf variable of each integer variable
+        self.clauses = {}
+        self.added = 0
+        self.added_literals = 0
+
+    def add(self, literals):
+        self.added += 1
+        self.added_literals += len(literals)
+        self.clauses[tuple(sorted(set(literals)))] = None
+
+    def compile(self):
+        positive = self.literals
+        negative = [None] + [~literal for literal in positive[1:]]
+        return nnf.And([nnf.Or([positive[literal] if literal > 0 else negative[-literal] for literal in clause]) for clause in self.clauses])
+
+class NNFBackend(CardinalityConstraints, FormulaDefinitions):
+    """
+    Encoding backend that adds the constraints of the theory to the bauhaus Encoding E as hash-consed nnf clauses.
+
+    The constraint families are written against the primitives of a backend, so that the same families can either
+    build a bauhaus theory (NNFBackend) or write integer clauses directly (cnf.CNFEncoding). Cardinality constraints and
+    requirement formulas are encoded over integer literals (see cardinality.py and tseitin.py) that are mapped back to nnf
+    variables, so every constraint is a clause of the single Clauses constraint of E.
+
+    Attributes:
+    - E: The bauhaus Encoding.
+    - variables: A dictionary mapping propositions to their integer variable.
+    - literals: A list mapping each integer variable to its nnf variable, index 0 is unused.
+    - clauses: The integer clauses of every constraint, see Clauses.
+    - definitions: The Tseitin definitions of sub-formulas, see tseitin.FormulaDefinitions.
+    - units: A dictionary mapping variables fixed by a unit clause to their value.
+
+    Methods:
+    - detach(): Removes the clauses of the backend from E, before another theory is built.
+    - add_clauses(clauses, count, units): Appends a flat buffer of integer clauses, each followed by a 0, see cnf.CNFEncoding.add_clauses().
+    - add_clause(positive, negative): Adds the clause OR(positive) | OR(~negative).
+    - add_implication(premise, options): premise -> OR(options).
+    - add_exclusion(premise, others): premise -> ~OR(others).
+    - add_conflict(propositions): ~AND(propositions).
+    - add_exactly_one(propositions), add_at_most_one(propositions), add_at_most_k(k, propositions), add_none_of(propositions):
+      Cardinality constraints, see cardinality.CardinalityConstraints.
+    - add_equivalence(proposition, formula): proposition <-> formula, see tseitin.FormulaDefinitions.
+    - add_formula(formula): Adds an arbitrary bauhaus formula through the Tseitin definitions of its sub-formulas.
+    """
+    def __init__(self, encoding):
+        self.E = encoding
+        self.variables = {}
+        self.literals = [None]
+        self.definitions = {}
+        self.units = {}
+        self.clauses = Clauses(self.literals)
+        self.E.add_constraint(self.clauses)
+
+    def detach(self):
+        """
+        Removes the clauses of the backend from E. E.clear_constraints() keeps the custom constraints of bauhaus, the
+        clauses of a previous theory would otherwise be compiled into the next theory built on E.
+        """
+        self.E._custom_constraints.discard(self.clauses)
+
+    def var(self, proposition):
+        variable = self.variables.get(proposition)
+        if variable is None:
+            variable = len(self.literals)
+            self.variables[proposition] = variable
+            self.literals.append(proposition._var)
+        return variable
+
+    def aux(self, count=1):
+        first = len(self.literals)
+        self.literals.extend(nnf.Var(f"aux{variable}") for variable in range(first, first + count))
+        return first
+
+    def add_literals(self, literals):
+        if len(literals) == 1:
+            self.units[abs(literals[0])] = literals[0] > 0
+        self.clauses.add(literals)
+
+    def add_clauses(self, clauses, count, units):
+        self.units.update(units)
+        clause = []
+        for literal in clauses:
+            if literal == 0:
+                self.clauses.add(clause)
+                clause = []
+            else:
+                clause.append(literal)
+
+    def add_clause(self, positive, negative=()):
+        self.add_literals([self.var(proposition) for proposition in positive] + [-self.var(proposition) for proposition in negative])
+
+    def add_implication(self, premise, options):
+        self.add_literals([-self.var(premise)] + [self.var(option) for option in options])
+
+    def add_exclusion(self, premise, others):
+        for other in others:
+            self.add_literals([-self.var(premise), -self.var(other)])
+
+    def add_conflict(self, propositions):
+        self.add_literals([-self.var(proposition) for proposition in propositions])
+
+    def add_formula(self, formula):
+        self.add_literals([self.literal(formula)])
+
+B = NNFBackend(E) #the backend the constraint families are written to, selected by build_theory
+ENCODINGS = dict(cardinality.DEFAULT_FAMILIES) #the cardinality encoding of each constraint family, selected by build_theory
+OFFERINGS = pruning.Offerings() #the terms and sections left for each student after pruning, see pruning.py
+CONFLICTS = conflicts.ConflictIndex() #the conflicting section pairs of every term, see conflicts.py
+CONFLICT_ENCODING = "auto" #the time conflict encoding, "pairwise", "slot" or "auto", selected by build_theory
+WEIGHTS = {} #the number of students each encoded profile variant stands for, by student name, see profiles.py
+BUILD_TIMES = {} #the seconds spent on the constraints of each student by name, see theory_constraints()
+STATISTICS = encoding_report.EncodingReport() #the statistics of every constraint family of the theory, see family()
+
+class Hashable(metaclass=PropositionClass):
+    """
+    Base class of every proposition. Propositions are interned by their class, see PropositionClass, so the hash is
+    precomputed from the integer ids of the proposition and equality is identity. The operators build bauhaus formulas
+    over propositions, as they do for a @proposition decorated class.
+    """
+    def __hash__(self):
+        return self._hash
 
     def __repr__(self):
         return str(self)
 
+    def __and__(self, other):
+        return CustomNNF("var", [self._var]) & other
+
+    def __or__(self, other):
+        return CustomNNF("var", [self._var]) | other
+
+    def __invert__(self):
+        return ~CustomNNF("var", [self._var])
+
+    def __rshift__(self, other):
+        return CustomNNF("var", [self._var]) >> other
+
+    def compile(self):
+        return self._var
+
 #PROPOSITIONS
 #region
-@proposition(E)
 class StudentEnrolledCourse(Hashable): #A student enrolled in a specific course 
     """
     Represents a student's enrollment in a specific course.
@@ -52,7 +372,6 @@ class StudentEnrolledCourse(Hashable): #A student enrolled in a specific course
         else:
             return f"({str(self.student)} -> {str(self.course)})"
 
-@proposition(E)
 class StudentEnrolledCourseTerm(Hashable): #A student enrolled in a specific course of a specific term
     """
     Represents a student's enrollment in a specific course in a given term of a given year.
@@ -74,7 +393,6 @@ class StudentEnrolledCourseTerm(Hashable): #A student enrolled in a specific cou
     def __repr__(self):
         return f"({str(self.student.name)} -> {str(self.course.id)} Term: {str(self.term)})"
 
-@proposition(E)
 class StudentEnrolledCourseSection(Hashable): #A student enrolled in a specific course of a specific term in a specific section
     """
     Represents a student's enrollment in a specific course section for a given term of a given year.
@@ -98,7 +416,6 @@ class StudentEnrolledCourseSection(Hashable): #A student enrolled in a specific
     def __repr__(self):
         return f"({str(self.student.name)} -> {str(self.course.id)} Term: {str(self.term)} Section: {str(self.section.class_number)})"
 
-@proposition(E)
 class CourseTermSectionTimeConflict(Hashable): #Models a conflict between 2 sections of 2 differnt courses in different terms
     def __init__(self, student, term, course1, section1, course2, section2):
         self.student = student #a datalayer Student object
@@ -113,7 +430,17 @@ class CourseTermSectionTimeConflict(Hashable): #Models a conflict between 2 sect
     def __repr__(self):
         return f"({str(self.student.name)} -> CONFLICT [{self.course1.id}-{str(self.section1.class_number)}, {self.course2.id}-{str(self.section2.class_number)}] in Term: {str(self.term)})"
 
-@proposition(E)
+class StudentCourseTimeSlot(Hashable): #Models a course of a student occupying a time slot of a term, see conflicts.py
+    def __init__(self, student, term, course, day, start):
+        self.student = student #a datalayer Student object
+        self.term = term #a datalayer Term Enum
+        self.course = course #a datalayer Course object
+        self.day = day #the day of the slot
+        self.start = start #the start of the slot in minutes since midnight
+
+    def __repr__(self):
+        return f"({str(self.student.name)} -> {str(self.course.id)} occupies {self.day} {self.start // 60:02d}:{self.start % 60:02d} in Term: {str(self.term)})"
+
 class CourseTermSectionAvailableCapacity(Hashable): #Models a classes availability, depending on capacity
     def __init__(self, course, term, section):
         self.term = term #a datalayer Term Enum
@@ -123,7 +450,6 @@ class CourseTermSectionAvailableCapacity(Hashable): #Models a classes availabili
     def __repr__(self):
         return f"({str(self.course.id)} Term: {str(self.term)} Section: {str(self.section.class_number)} has capacity:)"
 
-@proposition(E)
 class CourseExclusionRequirement(Hashable):#Models if a exclusion requirement for a student's specific course is satisfied
     """
     Represents a student's course exclusion requirement.
@@ -146,20 +472,19 @@ class CourseExclusionRequirement(Hashable):#Models if a exclusion requirement fo
         else:
             return f"({str(self.student)}: {str(self.course)} has met the exclusion requirement)"
 
-@proposition(E)
 class CheckCourseExclusionsExists(Hashable): #Models an exclusion requirement for a student's specific course 
     def __init__(self, student, course, excluded_course):
-        self.student = student #string
+        self.student = student #a datalayer Student object
         self.course = course #a string
         self.excluded_course = excluded_course #a string
 
     def __repr__(self):
-        if isinstance(self.student, datalayer.Student): #allows for datalayer objects or strings to be passed on initialization, important for the dynamic rule evaluation
-            return f"({self.student.name}: {self.excluded_course.id} is an exclusion for {self.course.id} and is exisits"
+        student = self.student.name if isinstance(self.student, datalayer.Student) else self.student
+        if isinstance(self.course, datalayer.Course): #allows for datalayer objects or strings to be passed on initialization, important for the dynamic rule evaluation
+            return f"({student}: {self.excluded_course.id} is an exclusion for {self.course.id} and is exisits"
         else:
-            return f"({self.student}: {self.excluded_course} is an exclusion for {self.course} and the course exisits"
+            return f"({student}: {self.excluded_course} is an exclusion for {self.course} and the course exisits"
 
-@proposition(E)
 class CoursePrerequisiteRequirement(Hashable): #Models if a prerequisite requirement for a student's specific course is satisfied
     """
     Represents a student's course prerequisite requirement.
@@ -182,20 +507,19 @@ class CoursePrerequisiteRequirement(Hashable): #Models if a prerequisite require
         else:
             return f"({str(self.student)}: {str(self.course)} has met the prerequisite requirement)"
 
-@proposition(E)
 class CheckCoursePrerequisitesExists(Hashable): #Models an prerequisite requirement for a student's specific course 
     def __init__(self, student, course, required_course):
-        self.student = student #string
+        self.student = student #a datalayer Student object
         self.course = course #a string
         self.required_course = required_course #a string
 
     def __repr__(self):
-        if isinstance(self.student, datalayer.Student): #allows for datalayer objects or strings to be passed on initialization, important for the dynamic rule evaluation
-            return f"({self.student.name}: {self.required_course.id} is a prerequisite for {self.course.id} and is satisfied"
+        student = self.student.name if isinstance(self.student, datalayer.Student) else self.student
+        if isinstance(self.course, datalayer.Course): #allows for datalayer objects or strings to be passed on initialization, important for the dynamic rule evaluation
+            return f"({student}: {self.required_course.id} is a prerequisite for {self.course.id} and is satisfied"
         else:
-           return f"({self.student}: {self.required_course} is a prerequisite for {self.course} and is satisfied"
+            return f"({student}: {self.required_course} is a prerequisite for {self.course} and is satisfied"
 
-@proposition(E)
 class CourseCorequisiteRequirement(Hashable): #Models if a corequisite requirement for a student's specific course is satisfied
     """
     Represents a student's course corequisite requirement.
@@ -218,20 +542,19 @@ class CourseCorequisiteRequirement(Hashable): #Models if a corequisite requireme
         else:
             return f"({str(self.student)}: {str(self.course)} has met the corequisite requirement)"
 
-@proposition(E)
 class CheckCourseCorequisitesExists(Hashable): #Models an corequisite requirement for a student's specific course 
     def __init__(self, student, course, required_course):
-        self.student = student #string
+        self.student = student #a datalayer Student object
         self.course = course #a string
         self.required_course = required_course #a string
 
     def __repr__(self):
-        if isinstance(self.student, datalayer.Student): #allows for datalayer objects or strings to be passed on initialization, important for the dynamic rule evaluation
-            return f"({self.student.name}: {self.required_course.id} is a corequisite for {self.course.id} and is satisfied"
+        student = self.student.name if isinstance(self.student, datalayer.Student) else self.student
+        if isinstance(self.course, datalayer.Course): #allows for datalayer objects or strings to be passed on initialization, important for the dynamic rule evaluation
+            return f"({student}: {self.required_course.id} is a corequisite for {self.course.id} and is satisfied"
         else:
-           return f"({self.student}: {self.required_course} is a corequisite for {self.course} and is satisfied"
+            return f"({student}: {self.required_course} is a corequisite for {self.course} and is satisfied"
 
-@proposition(E)
 class StudentCourseRequiredTerm(Hashable): #Models the fact that a student may be required to take a specific course during a specific term to satisfy prerequisites
     def __init__(self, student, course, term):
         self.student = student #a datalayer Student object
@@ -241,7 +564,6 @@ class StudentCourseRequiredTerm(Hashable): #Models the fact that a student may b
     def __repr__(self):
         return f"({self.student}: {self.course} must be taken in {self.term}"
 
-@proposition(E)
 class Friendship(Hashable): #Models a friendship among student
     def __init__(self, student1, student2):
         self.student1 = student1 #a datalayer Student object
@@ -249,6 +571,16 @@ class Friendship(Hashable): #Models a friendship among student
 
     def __repr__(self):
         return f"({self.student1.name} + {self.student2.name})"
+
+class GroupCourseSection(Hashable): #Models a group of friends or a study group meeting in a section of a course
+    def __init__(self, group, course, term, section):
+        self.group = group #the name of the group
+        self.course = course #a datalayer Course object
+        self.term = term #a datalayer Term Enum
+        self.section = section #a datalayer Section object
+
+    def __repr__(self):
+        return f"({self.group} -> {str(self.course.id)} Term: {str(self.term)} Section: {str(self.section.class_number)})"
 #endregion
 
 
@@ -260,7 +592,24 @@ def build_propositions(objects):
 
     
 #CONSTRAINTS
-def enrolment_rules(objects):
+#Every constraint family is a generator yielding the constraints of one student as (primitive, arguments...) tuples, the
+#primitive being the name of a backend method (i.e. ("add_implication", premise, options) for B.add_implication(premise,
+#options)). The families of a student share the terms and sections left for each of the student's courses, looked up once
+#by student_offerings(), and the constraints are encoded as they are yielded, see encode(). The builder yields every
+#family as a whole, see family(), so what each family adds to the theory is recorded in STATISTICS.
+def student_offerings(student):
+    """
+    Returns the terms and sections left for every wished course of a student after pruning.
+
+    Args:
+        student (Student): The student.
+
+    Returns:
+        list: A (Course, [(Term, [Section])]) tuple for every wished course of the student.
+    """
+    return [(course, [(term, OFFERINGS.sections(student, course, term)) for term in OFFERINGS.terms(student, course)]) for course in list(student.course_wish_list)]
+
+def enrolment_rules(student, offerings):
     """
     Enrolment Rules for Student Course Enrolment
 
@@ -268,473 +617,431 @@ def enrolment_rules(objects):
     Covers rules such as course-term limits and section limts.
 
     Args:
-        objects (dict): A dictionary containing datalayer collections.
+        student (Student): The student.
+        offerings (list): The terms and sections left for the wished courses of the student, see student_offerings().
 
-    Returns:
-        None
+    Yields:
+        tuple: The constraints of the student, see encode().
     """
-    
-    students = objects["students"]
-    
-    #CONSTRAINT 0 - Course -> Term
-    #For every student and course, if a student is taking a course they must be taking the course in one of the terms.
-    for student in students:
-        if len(student.course_wish_list) != 0:
-            for course in student.course_wish_list:
-                offered_terms = course.sections.get_term_offerings()
-                offerings = []
-                
-                for term in offered_terms: #loop over "WINTER", "SUMMER", "FALL" terms depending on course offering
-                    offerings.append(StudentEnrolledCourseTerm(student, course, term))
-                    
-                offerings = Or(offerings)  
-                E.add_constraint(StudentEnrolledCourse(student, course) >> (offerings))
-        else:
-            utils.warn(f"{student} does not wish to take any courses is this an error?")
-        
-    #CONSTRAINT 0.1 - One Term Per Course
-    #For every student and course, they can be enrolled in the course during only one term ex: one of "Fall", "Winter", "Summer" depending on a courses offering.
-    for student in students:
-        for course in student.course_wish_list:
-            
-            offered_terms = course.sections.get_term_offerings()
-            for term in offered_terms: #loop over "WINTER", "SUMMER", "FALL" terms depending on course offering
-                other_terms = []
-                for other_term in offered_terms:
-                    if term != other_term:
-                        other_terms.append(StudentEnrolledCourseTerm(student, course, other_term))
+    if len(offerings) == 0:
+        utils.warn(f"{student} does not wish to take any courses is this an error?")
 
-                other_terms = Or(other_terms)
-                E.add_constraint(StudentEnrolledCourseTerm(student, course, term) >> (~other_terms))
+    for course, terms in offerings:
+        #CONSTRAINT 0 - Course -> Term
+        #For every student and course, if a student is taking a course they must be taking the course in one of the terms.
+        all_terms = [StudentEnrolledCourseTerm(student, course, term) for term, sections in terms] #"WINTER", "SUMMER", "FALL" terms depending on course offering
+        yield ("add_implication", StudentEnrolledCourse(student, course), all_terms)
 
-    
-    #CONSTRAINT 1 - Term -> Section
-    #For every student and course, they can be enrolled in exactly one section of a course.
-    for student in students:
-        for course in student.course_wish_list:
-            offered_terms = course.sections.get_term_offerings()
-            for term in offered_terms: #loop over "WINTER", "SUMMER", "FALL" terms depending on course offering
-                term_offerings = course.sections.get_term_collection(term)#get course term offerings
-                
-                ENROLLED_COURSE_SECTIONS = [] #a list of all sections during a term for a particular course
-                
-                for section in term_offerings: #get the Section objects from the term_offering
-                    ENROLLED_COURSE_SECTIONS.append(StudentEnrolledCourseSection(student, course, term, section))
-                    
-                ENROLLED_COURSE_SECTIONS_OPTIONS = Or(ENROLLED_COURSE_SECTIONS)
-                E.add_constraint(StudentEnrolledCourseTerm(student, course, term) >> ENROLLED_COURSE_SECTIONS_OPTIONS)
-                #constraint.add_at_most_one(E, ENROLLED_COURSE_SECTIONS) #BUG
-    
-    #CONSTRAINT 1.1 - One Section per Course 
-    for student in students:
-        for course in student.course_wish_list:
-            offered_terms = course.sections.get_term_offerings()
-            for term in offered_terms: #loop over "WINTER", "SUMMER", "FALL" terms depending on course offering
-                term_offerings = course.sections.get_term_collection(term)#get course term offerings
-                
-                
-                for section in term_offerings: #get the Section objects from the term_offering
-                    all_other_sections = []
-                    for other_section in term_offerings: #get the Section objects from the term_offering
-                        if section != other_section:
-                            all_other_sections.append(StudentEnrolledCourseSection(student, course, term, other_section))
-                    
-                    all_other_sections = Or(all_other_sections)
-                    E.add_constraint(StudentEnrolledCourseSection(student, course, term, section) >> ~all_other_sections)
-    
-    #CONSTRAINT 1.2 - Not Term Course -> Not Term Course Sections
-    #For every student and course, if they are enrolled in a course in a specific term they must be taking the course during that term.
-    for student in students:
-        for course in student.course_wish_list:
-            offered_terms = course.sections.get_term_offerings()
-            for term in offered_terms: #loop over "WINTER", "SUMMER", "FALL" terms depending on course offering
-                term_offerings = course.sections.get_term_collection(term)#get course term offerings
-                for section in term_offerings: #get the Section objects from the term_offering
+        #CONSTRAINT 0.1 - One Term Per Course
+        #For every student and course, they can be enrolled in the course during only one term ex: one of "Fall", "Winter", "Summer" depending on a courses offering.
+        yield ("add_at_most_one", all_terms, ENCODINGS["term"])
 
-                    E.add_constraint(StudentEnrolledCourseSection(student, course, term, section) >> StudentEnrolledCourseTerm(student, course, term))
+        for term, sections in terms:
+            enrolled_term = StudentEnrolledCourseTerm(student, course, term)
+            all_sections = [StudentEnrolledCourseSection(student, course, term, section) for section in sections] #a list of all sections during a term for a particular course
 
-    #CONSTRAINT 10 - A student can take at most 10 courses, and wishes to take the most possible courses up to 10
-    for student in students:
-        all_courses = []
-        for course in student.course_wish_list:
-            all_courses.append(StudentEnrolledCourse(student, course))
-            constraint.add_exactly_one(E, StudentEnrolledCourse(student, course)) #forces all 'wished' courses to be taken (if there is a conflict there will be no solutions)
-
-        # k = len(all_courses)
-        # if k > 10:
-        #     k = 10
-        # constraint.add_at_most_k(E, k, all_courses)
-    
-def enrolment_restrictions(objects):
+            #CONSTRAINT 1 - Term -> Section
+            #For every student and course, they can be enrolled in exactly one section of a course.
+            yield ("add_implication", enrolled_term, all_sections)
+
+            #CONSTRAINT 1.1 - One Section per Course
+            #Encoded as an at most one constraint over the sections of a term, see cardinality.py for the encodings.
+            yield ("add_at_most_one", all_sections, ENCODINGS["section"])
+
+            #CONSTRAINT 1.2 - Not Term Course -> Not Term Course Sections
+            #For every student and course, if they are enrolled in a course in a specific term they must be taking the course during that term.
+            for enrolled_section in all_sections:
+                yield ("add_implication", enrolled_section, [enrolled_term])
+
+        #CONSTRAINT 10 - A student can take at most 10 courses, and wishes to take the most possible courses up to 10
+        yield ("add_exactly_one", [StudentEnrolledCourse(student, course)]) #forces all 'wished' courses to be taken (if there is a conflict there will be no solutions)
+
+def enrolment_restrictions(student, offerings, candidates):
     """
     Enrolment Restrictions for Student Course Enrolment
 
     Defines constraints related to enrolment restrictions, such as course section time conflicts and enrolment capacity limits.
+    The enrolment capacity of a section is shared by the cohort, so the sections of the student are only recorded in
+    candidates and constrained once every student is encoded, see capacity().
 
     Args:
-        objects (dict): A dictionary containing datalayer collections.
+        student (Student): The student.
+        offerings (list): The terms and sections left for the wished courses of the student, see student_offerings().
+        candidates (dict): Maps section ids to the enrolments of the cohort in the section and their weights.
 
-    Returns:
-        None
+    Yields:
+        tuple: The constraints of the student, see encode().
     """
-    
-    students = objects["students"]
-    
     #CONSTRAINT 5 - Course Section Time Conflict
     #For every student and every course if any sections of a course have a time conflict, both of the sections cannot be taken.
-    for student in students:
-        for course1 in student.course_wish_list:
-            for course2 in student.course_wish_list:
-                if course1 != course2: #check to ensure that the courses are different
-                    offered_terms_course1 = course1.sections.get_term_offerings()
-                    offered_terms_course2 = course1.sections.get_term_offerings()
-                    for term1 in offered_terms_course1: #loop over "WINTER", "SUMMER", "FALL" terms depending on course offering of course1
-                        for term2 in offered_terms_course2: #loop over "WINTER", "SUMMER", "FALL" terms depending on course offering of course2
-                            if term1 == term2: #ensure that the terms are not different
-                                term_offerings_course1 = course1.sections.get_term_collection(term1)#get course term offerings for course1
-                                term_offerings_course2 = course2.sections.get_term_collection(term2)#get course term offerings for course2
-                                for section_course1 in term_offerings_course1: #get the Section objects from the term offering for course 1
-                                    for section_course2 in term_offerings_course2: #get the Section objects from the term offering for course 2
-                                        if section_course1.has_conflict(section_course2):
-                                            time_conflict_instance = CourseTermSectionTimeConflict(student, term1, course1, section_course1, course2, section_course2)
-                                            constraint.add_exactly_one(E,[time_conflict_instance]) #force the premise to true
-                                            E.add_constraint(time_conflict_instance >> ~(StudentEnrolledCourseSection(student, course1, term1, section_course1) & StudentEnrolledCourseSection(student, course2, term2, section_course2)))
+    #Only the pairs of sections that conflict are visited, looked up from the conflict index. The pairs are written as binary
+    #clauses, or as at most one course occupying each time slot, whichever is smaller for the student (see conflicts.py).
+    owners = {} #the sections of the wished courses during each term, mapped to their course
+    for course, terms in offerings:
+        for term, sections in terms:
+            for section in sections:
+                owners.setdefault(term, {})[section] = course
+
+    encoding = CONFLICT_ENCODING
+    if encoding == "auto":
+        pairwise = sum(conflicts.estimate_clauses("pairwise", owner, term, CONFLICTS) for term, owner in owners.items())
+        slot = sum(conflicts.estimate_clauses("slot", owner, term, CONFLICTS) for term, owner in owners.items())
+        encoding = "slot" if slot < pairwise else "pairwise"
+
+    for term, owner in owners.items():
+        if encoding == "slot":
+            slots = conflicts.time_slots(owner)
+            for slot in slots:
+                occupancy = []
+                for course, sections in slot.courses.items():
+                    running = [StudentEnrolledCourseSection(student, course, term, section) for section in sections]
+                    if len(running) == 1:
+                        occupancy.append(running[0])
+                    else:
+                        occupied = StudentCourseTimeSlot(student, term, course, slot.day, slot.start)
+                        for enrolled in running:
+                            yield ("add_implication", enrolled, [occupied])
+                        occupancy.append(occupied)
+                yield ("add_at_most_one", occupancy, "auto")
+            pairs = conflicts.uncovered_pairs(owner, term, CONFLICTS, slots)
+        else:
+            pairs = conflicts.conflicting_pairs(owner, term, CONFLICTS)
+
+        for section1, section2 in pairs:
+            yield ("add_conflict", [StudentEnrolledCourseSection(student, owner[section1], term, section1), StudentEnrolledCourseSection(student, owner[section2], term, section2)])
 
     #CONSTRAINT 6 - Section Enrolment Capacity
     #A Student can only enroll in a section if there is capacity
-    for student in students:
-        for course in student.course_wish_list:
-            offered_terms_course = course.sections.get_term_offerings()
-            for term in offered_terms_course: #loop over "WINTER", "SUMMER", "FALL" terms depending on course offering of course
-                term_offerings_course = course.sections.get_term_collection(term)#get course term offerings for course
-                for section_course in term_offerings_course: #get the Section objects from the term offering for course
-                    
-                    has_capacity = CourseTermSectionAvailableCapacity(course, term, section_course)
-                    
-                    if section_course.enrollment_total < section_course.enrollment_capacity: #if a section has capacity for a student enrolment set it to true
-                        constraint.add_exactly_one(E,[has_capacity])
-                    else:
-                        constraint.add_none_of(E,[has_capacity]) #otherwise false
-                        
-                    E.add_constraint(StudentEnrolledCourseSection(student, course, term, section_course) >> CourseTermSectionAvailableCapacity(course, term, section_course)) #if a student is enrolled in a section, there must be capacity.
+    for course, terms in offerings:
+        for term, sections in terms: #"WINTER", "SUMMER", "FALL" terms depending on course offering of course
+            for section_course in sections:
+                has_capacity = CourseTermSectionAvailableCapacity(course, term, section_course)
+                enrolled = StudentEnrolledCourseSection(student, course, term, section_course)
+
+                if section_course.enrollment_total < section_course.enrollment_capacity: #if a section has capacity for a student enrolment set it to true
+                    yield ("add_exactly_one", [has_capacity])
+                else:
+                    yield ("add_none_of", [has_capacity]) #otherwise false
+
+                yield ("add_implication", enrolled, [has_capacity]) #if a student is enrolled in a section, there must be capacity.
+
+                #record the students who might wish to enroll in the section, see capacity()
+                enrolments, weights = candidates.setdefault(section_course.id, ([], []))
+                enrolments.append(enrolled)
+                weights.append(WEIGHTS.get(student.name, 1)) #the number of students each enrolment stands for, see profiles.py
 
+def capacity(candidates):
+    """
+    Section Capacity Constraints
+
+    Enrolls only as many students in a section as there is room, over the enrolments recorded by enrolment_restrictions().
+
+    Args:
+        candidates (dict): Maps section ids to the enrolments of the cohort in the section and their weights.
 
+    Yields:
+        tuple: The constraints of the cohort, see encode().
+    """
     #CONSTRAINT 7 -Enroll only as many Students in a Section as there is room
-    sections = {}
-    for student in students:
-        for course in student.course_wish_list:
-            offered_terms_course = course.sections.get_term_offerings()
-            for term in offered_terms_course: #loop over "WINTER", "SUMMER", "FALL" terms depending on course offering of course
-                term_offerings_course = course.sections.get_term_collection(term)#get course term offerings for course
-                for section_course in term_offerings_course: #get the Section objects from the term offering for course
-                    
-                    #create a dictionary of all students who might wish to enroll in a course
-                    if section_course in sections:
-                        sections[section_course.id].append(StudentEnrolledCourseSection(student, course, term, section_course))
-                    else:
-                        sections[section_course.id] = [StudentEnrolledCourseSection(student, course, term, section_course)]
-    
-    for id, possible_students in sections.items():
+    for id, (possible_students, weights) in candidates.items():
         allowed_enrolment = datalayer.Sections.ALLSECTIONS[id].enrollment_capacity - datalayer.Sections.ALLSECTIONS[id].enrollment_total
-        number_wish_enrolled = len(possible_students)
-        
-        if allowed_enrolment == 0: #no room for enrolment, dont enroll anyone
-            constraint.add_none_of(E, [possible_students])
-        
+        number_wish_enrolled = sum(weights)
+
+        if allowed_enrolment <= 0: #no room for enrolment, dont enroll anyone
+            yield ("add_none_of", possible_students)
+
         elif number_wish_enrolled > allowed_enrolment: #enroll only x amount of students, where x is the number of students till ocupancy is full
-            constraint.add_at_most_k(E, allowed_enrolment, [possible_students])
-        
-def enrolment_requirements(objects):
+            yield ("add_at_most_k", allowed_enrolment, possible_students, ENCODINGS["capacity"], weights if len(WEIGHTS) > 0 else None)
+
+def enrolment_requirements(student, offerings):
     """
     Enrolment Requirements for Student Course Enrolment
 
     Defines constraints related to course prerequisites, exclusions, and corequisites.
     Ensures that students meet necessary requirements before enrolling in courses.
+    Every kind of requirement is its own constraint family, see family().
 
     Args:
-        objects (dict): A dictionary containing datalayer collections.
+        student (Student): The student.
+        offerings (list): The terms and sections left for the wished courses of the student, see student_offerings().
 
-    Returns:
-        None
+    Yields:
+        tuple: The constraints of the student, see encode().
+    """
+    yield family("exclusions", course_exclusions(student, offerings))
+    yield family("prerequisites", course_prerequisites(student, offerings))
+    yield family("corequisites", course_corequisites(student, offerings))
+    yield family("requirements", requirements_met(student, offerings))
+
+def course_exclusions(student, offerings):
+    """
+    Course Exclusion Requirements, see enrolment_requirements().
+
+    Yields:
+        tuple: The constraints of the student, see encode().
     """
-    students = objects["students"]
-    
     #CONSTRAINT 6 - Course Exclusions
     #For every student and every course in a students wishlist, if a course that a student wish's to take has an exclusion rule in
     # its requirements, then no course in the students course history or in the courses they wish to take should contain an excluded course.
     # If an exclusion is present then the propositon CourseExclusionExists will be true
-    for student in students:
-        for course in student.course_wish_list:
-            if isinstance(course.requirements, datalayer.CourseRequirement): #if the course object has a datalayer requirement object then proceed.
-                #NOTE: not all objects have datalayer requirements
-                exclusion_rule = course.requirements["EXCLUSION"].criteria #get the exclusion rule
-                if exclusion_rule != "NONE":
-                    excluded_courses = utils.extract_courses(exclusion_rule) #get all the courses in the exclusion rule
+    for course, terms in offerings:
+        if isinstance(course.requirements, datalayer.CourseRequirement): #if the course object has a datalayer requirement object then proceed.
+            #NOTE: not all objects have datalayer requirements
+            exclusion_rule = course.requirements["EXCLUSION"].rule #get the exclusion rule, parsed once when the requirements are loaded
+            if exclusion_rule is not None:
+                exclusions = {} #maps every course in the exclusion rule to its exclusion proposition
+                
+                for check_course in exclusion_rule.courses: #loop over all courses in the exclusion rule
                     
-                    for check_course in excluded_courses: #loop over all courses in the exclusion rule
-                        
-                        exclusion_exists = CheckCourseExclusionsExists(student.name, course.id, check_course) #create a course exclusion propositon
-                        
-                        #If a course that is in the exclusion rule has been taken, or a student wishes to take the course then the exclusion rule has been broken
-                        if check_course in str(student.completed_courses):
-                            constraint.add_exactly_one(E,[exclusion_exists]) #force the proposition to true, i.e an exclusion is present
-
-                        elif check_course in str(student.course_wish_list) and check_course+'A' not in str(student.course_wish_list) and check_course+'B' not in str(student.course_wish_list):
-                            offered_terms = course.sections.get_term_offerings()
-                            for term in offered_terms: #loop over "WINTER", "SUMMER", "FALL" terms depending on course offering
-                                other_terms = []
-                                
-                                if term == datalayer.Term.FALL:
-                                    if datalayer.Term.WINTER in offered_terms:
-                                        other_terms.append(datalayer.Term.WINTER)
-                                    if datalayer.Term.SUMMER in offered_terms:
-                                        other_terms.append(datalayer.Term.SUMMER)
-                                    
-                                elif term == datalayer.Term.WINTER and datalayer.Term.SUMMER in offered_terms and datalayer.Term.SUMMER:
+                    exclusion_exists = CheckCourseExclusionsExists(student, course.id, check_course) #create a course exclusion propositon
+                    
+                    #If a course that is in the exclusion rule has been taken, or a student wishes to take the course then the exclusion rule has been broken
+                    if student.has_completed(check_course):
+                        yield ("add_exactly_one", [exclusion_exists]) #force the proposition to true, i.e an exclusion is present
+
+                    elif student.wishes_for(check_course):
+                        offered_terms = course.sections.get_term_offerings() #the ordering of the terms is decided on every offered term, pruned terms are false
+                        for term in offered_terms: #loop over "WINTER", "SUMMER", "FALL" terms depending on course offering
+                            other_terms = []
+                            
+                            if term == datalayer.Term.FALL:
+                                if datalayer.Term.WINTER in offered_terms:
+                                    other_terms.append(datalayer.Term.WINTER)
+                                if datalayer.Term.SUMMER in offered_terms:
                                     other_terms.append(datalayer.Term.SUMMER)
+                                
+                            elif term == datalayer.Term.WINTER and datalayer.Term.SUMMER in offered_terms and datalayer.Term.SUMMER:
+                                other_terms.append(datalayer.Term.SUMMER)
 
-                                        
-                                if other_terms != []:
-                                    options = []
-                                    for o_term in other_terms:
-                                        options.append(StudentEnrolledCourseTerm(student, course, o_term))
-                                    options = Or(options)
-                                    
-                                    E.add_constraint(StudentEnrolledCourseTerm(student, student.course_wish_list[check_course], term) >> (options))
                                     
-                                    
-                                else:
-                                    E.add_constraint(StudentEnrolledCourseTerm(student, course, term) >> ~(StudentEnrolledCourse(student, student.course_wish_list[check_course])))
-                                    
-                            constraint.add_none_of(E,[exclusion_exists]) #force the proposition to false, i.e an exclusion is not present
+                            if other_terms != []:
+                                options = []
+                                for o_term in other_terms:
+                                    if not OFFERINGS.is_pruned(student, course, o_term):
+                                        options.append(StudentEnrolledCourseTerm(student, course, o_term))
+                                if not OFFERINGS.is_pruned(student, student.course_wish_list[check_course], term):
+                                    yield ("add_implication", StudentEnrolledCourseTerm(student, student.course_wish_list[check_course], term), options)
+                                
+                                
+                            elif not OFFERINGS.is_pruned(student, course, term):
+                                yield ("add_exclusion", StudentEnrolledCourseTerm(student, course, term), [StudentEnrolledCourse(student, student.course_wish_list[check_course])])
+                                
+                        yield ("add_none_of", [exclusion_exists]) #force the proposition to false, i.e an exclusion is not present
 
-                        else:
-                            constraint.add_none_of(E,[exclusion_exists]) #force the proposition to false, i.e an exclusion is not present
-                            
-                        #We must now evaluate the exclusion rule. This is complicated because the exculusion rule is a dynamic logical expression.
-                        #Therefore we must use the exec function to dynamically create constraints.
-                        #Given the exclusion rule we will map the operators "AND", "OR", "NOT" to the corresponding bauhaus operators "&", "|", "~".
-                        #We will then map each course code to the propositions that were created in above step "CheckCourseExclusionsExists()".
-                        #We will then build a bauhaus constraint as a string.
-                        #The constraint is that the exclusion rule implies if the CourseExclusionRequirement is satisfied or not.
-                        #Example "E.add_constraint((CheckCourseExclusionsExists('Student', 'Course', 'ExcludedCourse1') | CheckCourseExclusionsExists('Student', 'Course', 'ExcludedCourse1') >> ~(CourseExclusionRequirement('Student', 'Course')))"
-                        #The string constraint that has been formed will then be executed using exec()
+                    else:
+                        yield ("add_none_of", [exclusion_exists]) #force the proposition to false, i.e an exclusion is not present
                         
-                        exclusion_rule = exclusion_rule.replace(check_course, f"CheckCourseExclusionsExists('{student.name}', '{course.id}', '{check_course}')" )
-                        exclusion_rule = exclusion_rule.replace("AND","&").replace("OR","|").replace("NOT", "~")
+                    exclusions[check_course] = exclusion_exists
                         
-                    exclusion_rule = f"(~({exclusion_rule}))"
-                    requirement_met = f"(CourseExclusionRequirement('{student.name}', '{course.id}'))"
-                    
-                    #Equivalence Relationship
-                    #new_constraint = f"E.add_constraint(({exclusion_rule} >> {requirement_met}) & ({requirement_met} >> {exclusion_rule}))"
-                    new_constraint = f"E.add_constraint(({exclusion_rule} & {requirement_met}) | (~{requirement_met} & ~{exclusion_rule}))"
-                    
-                    exec(new_constraint)
-                else:
-                    constraint.add_exactly_one(E,[CourseExclusionRequirement(student, course)]) #Force True
-            
+                #We must now evaluate the exclusion rule. The rule was parsed into a tree of "AND", "OR", "NOT" nodes when the requirements
+                #were loaded (see datalayer.RequirementRule), walking the tree maps each course to its "CheckCourseExclusionsExists()" proposition
+                #and the operators to the corresponding bauhaus operators "&", "|", "~".
+                #The exclusion requirement is met if and only if none of the excluded courses are present, i.e. the rule is false.
+                
+                #Equivalence Relationship, Tseitin encoded with a definition per sub-formula (see tseitin.py)
+                yield ("add_equivalence", CourseExclusionRequirement(student, course), ~exclusion_rule.instantiate(exclusions.__getitem__))
             else:
-                constraint.add_exactly_one(E,[CourseExclusionRequirement(student, course)]) #Force True
+                yield ("add_exactly_one", [CourseExclusionRequirement(student, course)]) #Force True
+        
+        else:
+            yield ("add_exactly_one", [CourseExclusionRequirement(student, course)]) #Force True
+
+def course_prerequisites(student, offerings):
+    """
+    Course Prerequisite Requirements, see enrolment_requirements().
 
+    Yields:
+        tuple: The constraints of the student, see encode().
+    """
     #CONSTRAINT 7 - Course Prerequisites             
     #For every student and every course in a students wishlist, if a course that a student wish's to take has a prerequisite rule in
     # its requirements, then a prerequisite course must be in the students course history.
-    for student in students:
-        for course in student.course_wish_list:
-            if isinstance(course.requirements, datalayer.CourseRequirement): #if the course object has a datalayer requirement object then proceed.
-                #NOTE: not all objects have datalayer requirements
-                prerequisite_rule = course.requirements["PREREQUISITE"].criteria #get the prerequisite rule
-                if prerequisite_rule != "NONE":
-                    prerequisite_courses = utils.extract_courses(prerequisite_rule) #get all the courses in the prerequisite rule
+    for course, terms in offerings:
+        if isinstance(course.requirements, datalayer.CourseRequirement): #if the course object has a datalayer requirement object then proceed.
+            #NOTE: not all objects have datalayer requirements
+            prerequisite_rule = course.requirements["PREREQUISITE"].rule #get the prerequisite rule, parsed once when the requirements are loaded
+            if prerequisite_rule is not None:
+                prerequisites = {} #maps every course in the prerequisite rule to its prerequisite proposition
+                
+                for check_course in prerequisite_rule.courses: #loop over all courses in the prerequisite rule
                     
-                    for check_course in prerequisite_courses: #loop over all courses in the prerequisite rule
-                        
-                        prerequisite_exists = CheckCoursePrerequisitesExists(student.name, course.id, check_course) #create a course prerequisite propositon
-                        
-                        #If a course that is in the prerequisite rule has  been taken, then the prerequisite rule has been satisfied
-                        if check_course in str(student.completed_courses) or check_course+'A' in str(student.completed_courses) or check_course+'B' in str(student.completed_courses):
-                            constraint.add_exactly_one(E,[prerequisite_exists]) #force the proposition to true, i.e an prerequisite is present
-                        
-                        #If a course that is in the prerequisite rule has not already been taken and is not being taken before the course in question, then the prerequisite rule has been broken,
-                        #therefore if a student is planning on taking a corequisite course, they must be taken at the same time or before.
-                        elif check_course in str(student.course_wish_list) and check_course+'A' not in str(student.course_wish_list) and check_course+'B' not in str(student.course_wish_list):
-                            offered_terms = course.sections.get_term_offerings()
-                            for term in offered_terms: #loop over "WINTER", "SUMMER", "FALL" terms depending on course offering
-                                other_terms = []
-                                
-                                if term == datalayer.Term.FALL:
-                                    if datalayer.Term.WINTER in offered_terms:
-                                        other_terms.append(datalayer.Term.WINTER)
-                                    if datalayer.Term.SUMMER in offered_terms:
-                                        other_terms.append(datalayer.Term.SUMMER)
-                                    
-                                elif term == datalayer.Term.WINTER and datalayer.Term.SUMMER in offered_terms and datalayer.Term.SUMMER:
+                    prerequisite_exists = CheckCoursePrerequisitesExists(student, course.id, check_course) #create a course prerequisite propositon
+                    
+                    #If a course that is in the prerequisite rule has  been taken, then the prerequisite rule has been satisfied
+                    if student.has_completed(check_course):
+                        yield ("add_exactly_one", [prerequisite_exists]) #force the proposition to true, i.e an prerequisite is present
+                    
+                    #If a course that is in the prerequisite rule has not already been taken and is not being taken before the course in question, then the prerequisite rule has been broken,
+                    #therefore if a student is planning on taking a corequisite course, they must be taken at the same time or before.
+                    elif student.wishes_for(check_course):
+                        offered_terms = course.sections.get_term_offerings() #the ordering of the terms is decided on every offered term, pruned terms are false
+                        for term in offered_terms: #loop over "WINTER", "SUMMER", "FALL" terms depending on course offering
+                            other_terms = []
+                            
+                            if term == datalayer.Term.FALL:
+                                if datalayer.Term.WINTER in offered_terms:
+                                    other_terms.append(datalayer.Term.WINTER)
+                                if datalayer.Term.SUMMER in offered_terms:
                                     other_terms.append(datalayer.Term.SUMMER)
+                                
+                            elif term == datalayer.Term.WINTER and datalayer.Term.SUMMER in offered_terms and datalayer.Term.SUMMER:
+                                other_terms.append(datalayer.Term.SUMMER)
 
-                                        
-                                if other_terms != []:
-                                    options = []
-                                    for o_term in other_terms:
-                                        options.append(StudentEnrolledCourseTerm(student, student.course_wish_list[check_course], o_term))
-                                    options = Or(options)
-                                    
-                                    E.add_constraint(StudentEnrolledCourseTerm(student, course, term) >> (options))
-                                    
-                                    
-                                else:
-                                    E.add_constraint(StudentEnrolledCourseTerm(student, student.course_wish_list[check_course], term) >> ~(StudentEnrolledCourse(student, course)))
                                     
-                            constraint.add_exactly_one(E,[prerequisite_exists]) #force the proposition to true, i.e a prerequisite is present
+                            if other_terms != []:
+                                options = []
+                                for o_term in other_terms:
+                                    if not OFFERINGS.is_pruned(student, student.course_wish_list[check_course], o_term):
+                                        options.append(StudentEnrolledCourseTerm(student, student.course_wish_list[check_course], o_term))
+                                if not OFFERINGS.is_pruned(student, course, term):
+                                    yield ("add_implication", StudentEnrolledCourseTerm(student, course, term), options)
+                                
+                                
+                            elif not OFFERINGS.is_pruned(student, student.course_wish_list[check_course], term):
+                                yield ("add_exclusion", StudentEnrolledCourseTerm(student, student.course_wish_list[check_course], term), [StudentEnrolledCourse(student, course)])
+                                
+                        yield ("add_exactly_one", [prerequisite_exists]) #force the proposition to true, i.e a prerequisite is present
+                    
+                    else:
+                        yield ("add_none_of", [prerequisite_exists]) #force the proposition to false, i.e an prerequisite is not present
                         
-                        else:
-                            constraint.add_none_of(E,[prerequisite_exists]) #force the proposition to false, i.e an prerequisite is not present
-                            
-                        #We must now evaluate the prerequisite rule. This is complicated because the prerequisite rule is a dynamic logical expression.
-                        #Therefore we must use the exec function to dynamically create constraints.
-                        #Given the prerequisite rule we will map the operators "AND", "OR", "NOT" to the corresponding bauhaus operators "&", "|", "~".
-                        #We will then map each course code to the propositions that were created in above step "CheckCoursePrerequisitesExists()".
-                        #We will then build a bauhaus constraint as a string.
-                        #The constraint is that the prerequisite rule implies if the CoursePrerequisiteRequirement is satisfied or not.
-                        #Example "E.add_constraint(~(CheckCoursePrerequisitesExists('Student', 'Course', 'PrerequisiteCourse1') | CheckCoursePrerequisitesExists('Student', 'Course', 'PrerequisiteCourse1') >> ~(CoursePrerequisiteRequirement('Student', 'Course')))"
-                        #The string constraint that has been formed will then be executed using exec()
+                    prerequisites[check_course] = prerequisite_exists
                         
-                        prerequisite_rule = prerequisite_rule.replace(check_course, f"CheckCoursePrerequisitesExists('{student.name}', '{course.id}', '{check_course}')" )
-                        prerequisite_rule = prerequisite_rule.replace("AND","&").replace("OR","|").replace("NOT", "~")
-                        prerequisite_rule = f"({prerequisite_rule})"
-                        requirement_met = f"(CoursePrerequisiteRequirement('{student.name}', '{course.id}'))"
-                    
-                    #Equivalence Relationship
-                    new_constraint = f"E.add_constraint(({prerequisite_rule} & {requirement_met}) | (~{requirement_met} & ~{prerequisite_rule}))"
-                    exec(new_constraint)
+                #We must now evaluate the prerequisite rule. The rule was parsed into a tree of "AND", "OR", "NOT" nodes when the requirements
+                #were loaded (see datalayer.RequirementRule), walking the tree maps each course to its "CheckCoursePrerequisitesExists()" proposition
+                #and the operators to the corresponding bauhaus operators "&", "|", "~".
+                
+                #Equivalence Relationship, Tseitin encoded with a definition per sub-formula (see tseitin.py)
+                yield ("add_equivalence", CoursePrerequisiteRequirement(student, course), prerequisite_rule.instantiate(prerequisites.__getitem__))
 
-                else:
-                    constraint.add_exactly_one(E,[CoursePrerequisiteRequirement(student, course)]) #Force True
-            
             else:
-                constraint.add_exactly_one(E,[CoursePrerequisiteRequirement(student, course)]) #Force True
+                yield ("add_exactly_one", [CoursePrerequisiteRequirement(student, course)]) #Force True
+        
+        else:
+            yield ("add_exactly_one", [CoursePrerequisiteRequirement(student, course)]) #Force True
+
+def course_corequisites(student, offerings):
+    """
+    Course Corequisite Requirements, see enrolment_requirements().
 
+    Yields:
+        tuple: The constraints of the student, see encode().
+    """
     #CONSTRAINT 8 - Course Corequisites
     #For every student and every course in a students wishlist, if a course that a student wish's to take has a corequisite rule in
     # its requirements, then a coerequisite course must be in the students course history.
-    for student in students:
-        for course in student.course_wish_list:
-            if isinstance(course.requirements, datalayer.CourseRequirement): #if the course object has a datalayer requirement object then proceed.
-                #NOTE: not all objects have datalayer requirements
-                corequisite_rule = course.requirements["COREQUISITE"].criteria #get the corequisite rule
+    for course, terms in offerings:
+        if isinstance(course.requirements, datalayer.CourseRequirement): #if the course object has a datalayer requirement object then proceed.
+            #NOTE: not all objects have datalayer requirements
+            corequisite_rule = course.requirements["COREQUISITE"].rule #get the corequisite rule, parsed once when the requirements are loaded
+            
+            if corequisite_rule is not None:
+                corequisites = {} #maps every course in the corequisite rule to its corequisite proposition
                 
-                if corequisite_rule != "NONE":
-                    corequisite_courses = utils.extract_courses(corequisite_rule) #get all the courses in the corequisite rule
+                for check_course in corequisite_rule.courses: #loop over all courses in the corequisite rule
+                    rule_course = check_course
                     
-                    check_index = -1
-                    for check_course in corequisite_courses: #loop over all courses in the corequisite rule
-                        check_index +=1
-                        
-                        corequisite_exists = CheckCourseCorequisitesExists(student.name, course.id, check_course) #create a course corequisite propositon
-                        
-                        #If a course that is in the corequisite rule has not already been taken, then the corequisite rule has been broken
-                        if check_course in str(student.completed_courses) or check_course+'A' in str(student.completed_courses) or check_course+'B' in str(student.completed_courses):
-                            constraint.add_exactly_one(E,[corequisite_exists]) #force the proposition to true, i.e a corequisite is present
-                        
-                        #If a course that is in the corequisite rule has not already been taken and is not being taken at the same time as the course in question or before,
-                        # then the corequisite rule has been broken,
-                        #therefore if a student is planning on taking a corequisite course, they must be taken at the same time or before.
-                        
-                        elif check_course in str(student.course_wish_list) and check_course+'A' not in str(student.course_wish_list) and check_course+'B' not in str(student.course_wish_list):
-                            offered_terms = course.sections.get_term_offerings()
-                            for term in  offered_terms: #loop over "WINTER", "SUMMER", "FALL" terms depending on course offering
-                                other_terms = []
-                                if term == datalayer.Term.SUMMER:
-                                    if datalayer.Term.FALL in offered_terms:
-                                        other_terms.append(datalayer.Term.FALL)
-                                    if datalayer.Term.WINTER in offered_terms:
-                                        other_terms.append(datalayer.Term.WINTER)
-                                    other_terms.append(datalayer.Term.SUMMER)
-                                        
-                                elif term == datalayer.Term.WINTER:
-                                    if datalayer.Term.FALL in offered_terms:
-                                        other_terms.append(datalayer.Term.FALL)
+                    corequisite_exists = CheckCourseCorequisitesExists(student, course.id, check_course) #create a course corequisite propositon
+                    
+                    #If a course that is in the corequisite rule has not already been taken, then the corequisite rule has been broken
+                    if student.has_completed(check_course):
+                        yield ("add_exactly_one", [corequisite_exists]) #force the proposition to true, i.e a corequisite is present
+                    
+                    #If a course that is in the corequisite rule has not already been taken and is not being taken at the same time as the course in question or before,
+                    # then the corequisite rule has been broken,
+                    #therefore if a student is planning on taking a corequisite course, they must be taken at the same time or before.
+                    
+                    elif student.wishes_for(check_course):
+                        offered_terms = course.sections.get_term_offerings() #the ordering of the terms is decided on every offered term, pruned terms are false
+                        for term in  offered_terms: #loop over "WINTER", "SUMMER", "FALL" terms depending on course offering
+                            other_terms = []
+                            if term == datalayer.Term.SUMMER:
+                                if datalayer.Term.FALL in offered_terms:
+                                    other_terms.append(datalayer.Term.FALL)
+                                if datalayer.Term.WINTER in offered_terms:
                                     other_terms.append(datalayer.Term.WINTER)
+                                other_terms.append(datalayer.Term.SUMMER)
                                     
-                                elif term == datalayer.Term.FALL:
+                            elif term == datalayer.Term.WINTER:
+                                if datalayer.Term.FALL in offered_terms:
                                     other_terms.append(datalayer.Term.FALL)
+                                other_terms.append(datalayer.Term.WINTER)
                                 
-                                options = []
-                                for o_term in other_terms:
+                            elif term == datalayer.Term.FALL:
+                                other_terms.append(datalayer.Term.FALL)
+                            
+                            options = []
+                            for o_term in other_terms:
+                                if not OFFERINGS.is_pruned(student, student.course_wish_list[check_course], o_term):
                                     options.append(StudentEnrolledCourseTerm(student, student.course_wish_list[check_course], o_term))
-                                options = Or(options)
-                                
-                                E.add_constraint(StudentEnrolledCourseTerm(student, course, term) >> (options))
-                                
-                                constraint.add_exactly_one(E,[corequisite_exists]) #force the proposition to true, i.e a corequisite is present
-                        
-                        #Full Year Corequisites
-                        elif check_course+'A' in str(student.course_wish_list) and check_course+'B' in str(student.course_wish_list):
-                            corequisite_rule = corequisite_rule.replace(check_course, check_course+'B')
-                            check_course = check_course+'B'
-                            corequisite_courses[check_index] = check_course+'B'
-                            corequisite_exists = CheckCourseCorequisitesExists(student.name, course.id, check_course)
-
-                            offered_terms = course.sections.get_term_offerings()
-                            for term in  offered_terms: #loop over "WINTER", "SUMMER", "FALL" terms depending on course offering
-                                other_terms = []
-                                if term == datalayer.Term.SUMMER:
-                                    if datalayer.Term.FALL in offered_terms:
-                                        other_terms.append(datalayer.Term.FALL)
-                                    if datalayer.Term.WINTER in offered_terms:
-                                        other_terms.append(datalayer.Term.WINTER)
-                                    other_terms.append(datalayer.Term.SUMMER)
-                                        
-                                elif term == datalayer.Term.WINTER:
-                                    if datalayer.Term.FALL in offered_terms:
-                                        other_terms.append(datalayer.Term.FALL)
+                            if not OFFERINGS.is_pruned(student, course, term):
+                                yield ("add_implication", StudentEnrolledCourseTerm(student, course, term), options)
+                            
+                            yield ("add_exactly_one", [corequisite_exists]) #force the proposition to true, i.e a corequisite is present
+                    
+                    #Full Year Corequisites
+                    elif student.wishes_for(check_course+'A') and student.wishes_for(check_course+'B'):
+                        check_course = check_course+'B' #the rule course is satisfied by the second half of the full year course
+                        corequisite_exists = CheckCourseCorequisitesExists(student, course.id, check_course)
+
+                        offered_terms = course.sections.get_term_offerings() #the ordering of the terms is decided on every offered term, pruned terms are false
+                        for term in  offered_terms: #loop over "WINTER", "SUMMER", "FALL" terms depending on course offering
+                            other_terms = []
+                            if term == datalayer.Term.SUMMER:
+                                if datalayer.Term.FALL in offered_terms:
+                                    other_terms.append(datalayer.Term.FALL)
+                                if datalayer.Term.WINTER in offered_terms:
                                     other_terms.append(datalayer.Term.WINTER)
+                                other_terms.append(datalayer.Term.SUMMER)
                                     
-                                elif term == datalayer.Term.FALL:
+                            elif term == datalayer.Term.WINTER:
+                                if datalayer.Term.FALL in offered_terms:
                                     other_terms.append(datalayer.Term.FALL)
+                                other_terms.append(datalayer.Term.WINTER)
                                 
-                                options = []
-                                for o_term in other_terms:
-                                    options.append(StudentEnrolledCourseTerm(student, student.course_wish_list[check_course], o_term))
-                                options = Or(options)
-                                
-                                E.add_constraint(StudentEnrolledCourseTerm(student, course, term) >> (options))
-                                
-                                constraint.add_exactly_one(E,[corequisite_exists]) #force the proposition to true, i.e a corequisite is present
-
+                            elif term == datalayer.Term.FALL:
+                                other_terms.append(datalayer.Term.FALL)
                             
-                        else:
-                            constraint.add_none_of(E,[corequisite_exists]) #force the proposition to false, i.e a corequisite is not present
+                            options = []
+                            for o_term in other_terms:
+                                if not OFFERINGS.is_pruned(student, student.course_wish_list[check_course], o_term):
+                                    options.append(StudentEnrolledCourseTerm(student, student.course_wish_list[check_course], o_term))
+                            if not OFFERINGS.is_pruned(student, course, term):
+                                yield ("add_implication", StudentEnrolledCourseTerm(student, course, term), options)
                             
-                        #We must now evaluate the corequisite rule. This is complicated because the corequisite rule is a dynamic logical expression.
-                        #Therefore we must use the exec function to dynamically create constraints.
-                        #Given the corequisite rule we will map the operators "AND", "OR", "NOT" to the corresponding bauhaus operators "&", "|", "~".
-                        #We will then map each course code to the propositions that were created in above step "CheckCoursePrerequisitesExists()".
-                        #We will then build a bauhaus constraint as a string.
-                        #The constraint is that the corequisite rule implies if the CourseCorequisiteRequirement is satisfied or not.
-                        #Example "E.add_constraint(~(CheckCourseCorequisitesExists('Student', 'Course', 'CorequisiteCourse1') | CheckCourseCorequisitesExists('Student', 'Course', 'CorequisiteCourse1') >> ~(CourseCorequisiteRequirement('Student', 'Course')))"
-                        #The string constraint that has been formed will then be executed using exec()
+                            yield ("add_exactly_one", [corequisite_exists]) #force the proposition to true, i.e a corequisite is present
+
                         
-                        corequisite_rule = corequisite_rule.replace(check_course, f"CheckCourseCorequisitesExists('{student.name}', '{course.id}', '{check_course}')" )
-                        corequisite_rule = corequisite_rule.replace("AND","&").replace("OR","|").replace("NOT", "~")
-                        corequisite_rule = f"({corequisite_rule})"
-                        requirement_met = f"(CourseCorequisiteRequirement('{student.name}', '{course.id}'))"
-                    
-                    #Equivalence Relationship
-                    new_constraint = f"E.add_constraint(({corequisite_rule} & {requirement_met}) | (~{requirement_met} & ~{corequisite_rule}))"
-                    exec(new_constraint)
-                else:
-                    constraint.add_exactly_one(E,[CourseCorequisiteRequirement(student, course)]) #Force True
-            
-            else:
-                constraint.add_exactly_one(E,[CourseCorequisiteRequirement(student, course)]) #Force True
+                    else:
+                        yield ("add_none_of", [corequisite_exists]) #force the proposition to false, i.e a corequisite is not present
+                        
+                    corequisites[rule_course] = corequisite_exists
+                        
+                #We must now evaluate the corequisite rule. The rule was parsed into a tree of "AND", "OR", "NOT" nodes when the requirements
+                #were loaded (see datalayer.RequirementRule), walking the tree maps each course to its "CheckCourseCorequisitesExists()" proposition
+                #and the operators to the corresponding bauhaus operators "&", "|", "~".
                 
+                #Equivalence Relationship, Tseitin encoded with a definition per sub-formula (see tseitin.py)
+                yield ("add_equivalence", CourseCorequisiteRequirement(student, course), corequisite_rule.instantiate(corequisites.__getitem__))
+            else:
+                yield ("add_exactly_one", [CourseCorequisiteRequirement(student, course)]) #Force True
+        
+        else:
+            yield ("add_exactly_one", [CourseCorequisiteRequirement(student, course)]) #Force True
+            
+def requirements_met(student, offerings):
+    """
+    Course Requirements Are Met, see enrolment_requirements().
+
+    Yields:
+        tuple: The constraints of the student, see encode().
+    """
     #CONSTRAINT 9 - Course -> Requirements Are Met
     #For every student and every course in a students wishlist, if a courses exclusions, prerequisites, corequisistes and program requirements
     # are all satisfied then the student can enroll in the course.
-    for student in students:
-        for course in student.course_wish_list:
-            E.add_constraint(StudentEnrolledCourse(student, course) >> (CourseExclusionRequirement(student, course) & CoursePrerequisiteRequirement(student, course) & CourseCorequisiteRequirement(student, course)))
+    for course, terms in offerings:
+        for requirement in [CourseExclusionRequirement(student, course), CoursePrerequisiteRequirement(student, course), CourseCorequisiteRequirement(student, course)]:
+            yield ("add_implication", StudentEnrolledCourse(student, course), [requirement])
 
 def friendship(objects):
     """
@@ -753,74 +1060,404 @@ def friendship(objects):
     students = objects["students"]
     
     #CONSTRAINT 11 - If students are friends, then they must have a friendship
-    for student1 in students:
-        for student2 in students:
-            if student1 != student2:
-                if student1 in student2.friends and student2 in student1.friends:
-                    constraint.add_exactly_one(E, Friendship(student1, student2))
-
-                else:
-                    constraint.add_none_of(E, Friendship(student1, student2))
+    #Only the mutual friendships get a proposition, a pair of students that are not friends is never referenced.
+    friendships = reciprocal_friendships(students)
+    for student, friend, courses in friendships:
+        yield ("add_exactly_one", [Friendship(student, friend)])
                 
     #CONSTRAINT 12 - If students are friends and wish to be enrolled in the same course, they may. If and only if there are no prior restrictions that affect them both.
+    #Friends and study groups are enrolled as groups: the group meets in at most one section of the course, and every member
+    #enrolled in a section selects the section for the group, O(members * sections) instead of a formula per pair of members.
+    for name, course, members in enrollment_groups(friendships, objects.get("groups")):
+        selectors = {}
+        for member in members:
+            for term in datalayer.Term:
+                for section in OFFERINGS.sections(member, course, term): #the sections left for the member after pruning
+                    selector = GroupCourseSection(name, course, term, section)
+                    selectors[selector] = None
+                    yield ("add_implication", StudentEnrolledCourseSection(member, course, term, section), [selector])
+        yield ("add_at_most_one", list(selectors), ENCODINGS["group"])
+
+def reciprocal_friendships(students):
+    """
+    Returns the mutual friendships of a cohort and the courses both friends wish to share, from the Friends of each
+    student. A course is shared if it is in the shared courses of both friends and in the wish list of either of them,
+    see Student.is_reciprocal().
+
+    Args:
+        students (Students): The students of the cohort.
+
+    Returns:
+        list: A (Student, Student, [Course]) tuple for every mutual friendship, each pair of friends once.
+    """
+    friendships = []
     for student in students:
-        if student.has_friends():
-            for friend in student.friends:
-                for course in friend.shared_courses:
-                    if student.is_reciprocal(friend, course): #if the friendship and course selection is mutual
-                        friend = datalayer.Students.ALLSTUDENTS[friend.name]
-                        
-                        term_options = [] #the term options 2 students can take a course in
-                        section_options = [] #the section options 2 students can take a course in
-                        for term in datalayer.Term:
-                            term_offerings_course = course.sections.get_term_collection(term)
-                            term_options.append(StudentEnrolledCourseTerm(student, course, term) & StudentEnrolledCourseTerm(friend, course, term))
-                            
-                            for section in term_offerings_course:
-                                section_options.append(StudentEnrolledCourseSection(student, course, term, section) & StudentEnrolledCourseSection(friend, course, term, section))
-                        
-                        common_term = Or(term_options)
-                        common_section = Or(section_options)
-                        
-                            
-                        E.add_constraint((StudentEnrolledCourse(student, course) & StudentEnrolledCourse(friend, course) & Friendship(student1, student2)) >> (common_section))
-    
+        for friend in list(student.friends):
+            other = friend.student
+            if other is None or other.uid <= student.uid or student.name not in other.friends.friends:
+                continue
+            shared = {course.id for course in other.friends[student.name].shared_courses}
+            courses = [course for course in friend.shared_courses if course.id in shared and (course in student.course_wish_list or course in other.course_wish_list)]
+            friendships.append((student, other, courses))
+    return friendships
+
+def enrollment_groups(friendships, study_groups=None):
+    """
+    Returns the groups of students that must be enrolled in the same section of a course. Mutual friends sharing a course
+    are in the same group, and so are the members of a study group, joined across pairs (if A and B, and B and C take a
+    course together, all three meet in the same section). Only the members wishing for the course are part of a group,
+    the course is never taken by the others.
+
+    Args:
+        friendships (list): The mutual friendships returned by reciprocal_friendships().
+        study_groups (StudyGroups, optional): The study groups of the cohort.
+
+    Returns:
+        list: A (name, Course, [Student]) tuple for every group of at least two students.
+    """
+    parents = {} #(course id, student name) -> (course id, student name), a union-find forest per course
+    courses = {}
+    members = {}
+
+    def find(node):
+        while parents[node] != node:
+            parents[node] = parents[parents[node]]
+            node = parents[node]
+        return node
+
+    def join(course, students):
+        students = [student for student in students if course in student.course_wish_list]
+        if len(students) < 2:
+            return
+        courses[course.id] = course
+        members.update((student.name, student) for student in students)
+        nodes = [(course.id, student.name) for student in students]
+        for node in nodes:
+            parents.setdefault(node, node)
+        for node in nodes[1:]:
+            parents[find(node)] = find(nodes[0])
+
+    for student, friend, shared in friendships:
+        for course in shared:
+            join(course, [student, friend])
+    for group in (study_groups if study_groups is not None else []):
+        for course in list(group.courses):
+            join(course, group.members)
+
+    groups = {}
+    for node in parents:
+        groups.setdefault(find(node), []).append(members[node[1]])
+    return [(" + ".join(student.name for student in group), courses[root[0]], group) for root, group in groups.items()]
 
 #BUILDER
-def build_theory(objects):
+def backend_counters():
+    """
+    Returns the (propositions, variables, clauses, literals) counters of the backend B, see encoding_report.py.
+    """
+    if isinstance(B, NNFBackend):
+        return len(B.variables), len(B.literals) - 1, B.clauses.added, B.clauses.added_literals
+    return len(B.variables), len(B.labels) - 1, B.clause_count, B.size()
+
+def family(name, constraints):
+    """
+    Returns a constraint family as a single constraint of the stream, the ("family", name, constraints) tuple. encode()
+    encodes the constraints of the family and records what they add to the backend B in STATISTICS, see
+    encode_family(), so the constraints are not passed through another generator on their way to the backend.
+
+    Args:
+        name (str): The family, see encoding_report.FAMILIES.
+        constraints (iterable): The constraints of the family, see encode().
+
+    Returns:
+        tuple: The family constraint, see encode().
+    """
+    return ("family", name, constraints)
+
+def student_constraints(student, candidates):
+    """
+    Yields the constraints of every family of a student in a single pass over the student's wished courses.
+
+    Args:
+        student (Student): The student.
+        candidates (dict): Collects the section enrolments of the student for the capacity constraints, see capacity().
+
+    Yields:
+        tuple: The constraints of the student, see encode().
+    """
+    offerings = student_offerings(student)
+    yield family("rules", enrolment_rules(student, offerings))
+    yield family("restrictions", enrolment_restrictions(student, offerings, candidates))
+    yield from enrolment_requirements(student, offerings)
+
+def theory_constraints(objects, build_times=None):
+    """
+    Yields the constraints of the theory as a stream, student by student, followed by the constraints shared by the
+    cohort, see cohort_constraints().
+
+    Args:
+        objects (dict): A dictionary of datalayer collections.
+        build_times (dict, optional): Filled with the seconds spent on the constraints of each student by name, including
+            the time the consumer spends encoding them.
+
+    Yields:
+        tuple: The constraints of the theory, see encode().
+    """
+    candidates = {}
+    for student in objects["students"]:
+        start = time.perf_counter()
+        yield from student_constraints(student, candidates)
+        if build_times is not None:
+            build_times[student.name] = time.perf_counter() - start
+    yield from cohort_constraints(objects, candidates)
+
+def cohort_constraints(objects, candidates):
     """
-    Creates the theory by executing sub-functions for enrolment rules, restrictions, requirements, and friendship constraints.
+    Yields the constraints shared by the students of the cohort (section capacities and friendships), once the
+    constraints of every student are encoded.
 
     Args:
         objects (dict): A dictionary of datalayer collections.
+        candidates (dict): The section enrolments of the cohort, see enrolment_restrictions().
+
+    Yields:
+        tuple: The constraints of the cohort, see encode().
+    """
+    yield family("capacity", capacity(candidates))
+    yield family("friendship", friendship(objects))
+
+def encode(constraints):
+    """
+    Adds a stream of constraints to the backend B as they are yielded.
+
+    Args:
+        constraints (iterable): (primitive, arguments...) tuples, the name of a backend method and its arguments, or the
+            ("family", name, constraints) tuple of a constraint family, see family().
+
     Returns:
-        BauhausTheory: A compiled bauhaus theory.
+        int: The number of constraints added, not counting the constraints of the families.
+    """
+    count = 0
+    for primitive, *arguments in constraints:
+        if primitive == "family":
+            encode_family(*arguments)
+        else:
+            getattr(B, primitive)(*arguments)
+            count += 1
+    return count
+
+def encode_family(name, constraints):
+    """
+    Adds the constraints of a constraint family to the backend B, recording the constraints, the change of the backend
+    counters and the time spent generating and encoding them in STATISTICS.
+
+    Args:
+        name (str): The family, see encoding_report.FAMILIES.
+        constraints (iterable): The constraints of the family, see encode().
     """
-    enrolment_rules(objects)
-    enrolment_restrictions(objects)
-    enrolment_requirements(objects)
-    friendship(objects)
+    before = backend_counters()
+    start = time.perf_counter()
+    count = encode(constraints)
+    STATISTICS.record(name, before, backend_counters(), count, time.perf_counter() - start)
+
+#PARALLEL BUILDER
+#The students can be sharded across a pool of worker processes forked from the builder, that inherit the data layer and
+#the settings of the build. A worker encodes the constraints of its students into integer clauses of its own
+#cnf.CNFEncoding and returns the clause buffer with a reference to the proposition of every variable. The builder
+#numbers the propositions in its backend, renumbers the clause buffers and encodes the cohort constraints itself.
+SHARD_STUDENTS = [] #the students sharded across the worker processes, see build_shards()
+SHARDS_PER_WORKER = 4 #more shards than workers balance the students with more constraints
+
+def build_shard(bounds):
+    """
+    Encodes the constraints of a shard of the students into integer clauses, in a worker process.
+
+    Args:
+        bounds (tuple): The start and stop positions of the shard in SHARD_STUDENTS.
+
+    Returns:
+        tuple: The references of the propositions of the variables (None for auxiliary variables, see
+            PropositionTable.reference()), the clause buffer, the number of clauses, the units, the section enrolments by
+            section id as variables and weights, the build time of each student and the statistics of the constraint
+            families of the shard.
+    """
+    global B, STATISTICS
+    B = cnf.CNFEncoding()
+    STATISTICS = encoding_report.EncodingReport("cnf")
+    candidates = {}
+    build_times = {}
+    for student in SHARD_STUDENTS[bounds[0]:bounds[1]]:
+        start = time.perf_counter()
+        encode(student_constraints(student, candidates))
+        build_times[student.name] = time.perf_counter() - start
+
+    labels = [None if label is None else PropositionTable.reference(label) for label in B.labels]
+    enrolments = {id: ([B.var(enrolment) for enrolment in possible_students], weights) for id, (possible_students, weights) in candidates.items()}
+    return labels, B.clauses, B.clause_count, B.units, enrolments, build_times, STATISTICS
+
+def merge_shard(shard, students, candidates):
+    """
+    Adds the clauses of a shard to the backend B, renumbering the variables of the shard.
+
+    Args:
+        shard (tuple): The shard returned by build_shard().
+        students (dict): A dictionary mapping the names of the students of the cohort to their Student object.
+        candidates (dict): Collects the section enrolments of the cohort, see enrolment_restrictions().
+    """
+    labels, clauses, count, units, enrolments, build_times, statistics = shard
+    propositions = [None if label is None else PropositionTable.resolve(label, students) for label in labels]
+    numbers = np.array([0] + [B.aux() if proposition is None else B.var(proposition) for proposition in propositions[1:]], dtype=np.intc)
+    if count > 0:
+        literals = np.frombuffer(clauses, dtype=np.intc)
+        renumbered = np.sign(literals) * numbers[np.abs(literals)]
+        B.add_clauses(array("i", renumbered.astype(np.intc).tobytes()), count, {int(numbers[variable]): value for variable, value in units.items()})
+
+    for id, (variables, weights) in enrolments.items():
+        possible_students, section_weights = candidates.setdefault(id, ([], []))
+        possible_students.extend(propositions[variable] for variable in variables)
+        section_weights.extend(weights)
+    BUILD_TIMES.update(build_times)
+    STATISTICS.merge(statistics)
+
+def build_shards(students, workers):
+    """
+    Encodes the constraints of the students across a pool of worker processes and merges them into the backend B in
+    the order of the students.
+
+    Args:
+        students (list): The students of the cohort.
+        workers (int): The number of worker processes.
+
+    Returns:
+        dict: The section enrolments of the cohort, see enrolment_restrictions().
+    """
+    global SHARD_STUDENTS
+    SHARD_STUDENTS = students
+    size = max(1, math.ceil(len(students) / (workers * SHARDS_PER_WORKER)))
+    bounds = [(start, min(start + size, len(students))) for start in range(0, len(students), size)]
+    lookup = {student.name: student for student in students}
+
+    candidates = {}
+    try:
+        with multiprocessing.get_context("fork").Pool(workers) as pool:
+            for shard in pool.imap(build_shard, bounds): #merged as the shards are finished, in order
+                merge_shard(shard, lookup, candidates)
+    finally:
+        SHARD_STUDENTS = []
+    return candidates
+
+def build_theory(objects, backend="nnf", encodings=None, offerings=None, conflict_encoding="auto", cohort_profiles=None, workers=1, stream=False):
+    """
+    Creates the theory by encoding the constraints of the enrolment rules, restrictions, requirements, and friendship
+    constraints in a single pass over the students, see theory_constraints(). What every constraint family adds to the
+    theory is recorded in STATISTICS, see encoding_report.py.
+
+    Args:
+        objects (dict): A dictionary of datalayer collections.
+        backend (str, optional): "nnf" to build a bauhaus Encoding, or "cnf" to write integer clauses directly.
+        encodings (dict, optional): The cardinality encoding of each constraint family, see cardinality.DEFAULT_FAMILIES.
+        offerings (pruning.Offerings, optional): The sections left for each student, pruned from objects by default.
+        conflict_encoding (str, optional): The time conflict encoding, "pairwise", "slot" or "auto", see conflicts.py.
+        cohort_profiles (list, optional): The Profile objects of the cohort, only their variants are encoded, see profiles.py.
+        workers (int, optional): The number of worker processes the students are sharded across, 1 to build the theory in
+            this process. Sharding needs the fork start method, the theory is built in this process without it.
+        stream (bool, optional): Write the clauses of a "cnf" theory into a DIMACS file as they are encoded instead of
+            keeping them in memory, see cnf.DimacsStream.
+    Returns:
+        Encoding or CNFEncoding: The bauhaus theory, or the integer CNF theory.
+    """
+    global B, ENCODINGS, OFFERINGS, CONFLICTS, CONFLICT_ENCODING, WEIGHTS, BUILD_TIMES, STATISTICS
+    if conflict_encoding not in conflicts.ENCODINGS:
+        raise ValueError(f"Unknown time conflict encoding {conflict_encoding}")
+    if stream and backend != "cnf":
+        utils.warn(f"Keeping the theory in memory: only the cnf backend streams its clauses")
+    if isinstance(B, NNFBackend):
+        B.detach()
+    B = cnf.CNFEncoding(cnf.DimacsStream() if stream else None) if backend == "cnf" else NNFBackend(E)
+    ENCODINGS = {**cardinality.DEFAULT_FAMILIES, **(encodings or {})}
+    OFFERINGS = offerings if offerings is not None else pruning.prune(objects) #remove the sections that can never be chosen before any proposition is created
+    CONFLICTS = conflicts.index_offerings(objects["students"], OFFERINGS)
+    CONFLICT_ENCODING = conflict_encoding
+    WEIGHTS = {}
+    BUILD_TIMES = {}
+    STATISTICS = encoding_report.EncodingReport(backend)
+    if cohort_profiles:
+        #the students a variant stands for share its timetable, they are assigned after solving by expand_profiles()
+        represented = {member.name for profile in cohort_profiles for variant, weight, members in profile.variants for member in members[1:]}
+        objects = {**objects, "students": [student for student in objects["students"] if student.name not in represented]}
+        WEIGHTS = {variant.name: weight for profile in cohort_profiles for variant, weight, members in profile.variants}
+
+    if workers > 1 and "fork" not in multiprocessing.get_all_start_methods():
+        utils.warn(f"Building the theory in a single process: worker processes need the fork start method")
+        workers = 1
+
+    if workers > 1:
+        candidates = build_shards(list(objects["students"]), workers)
+        encode(cohort_constraints(objects, candidates))
+    else:
+        encode(theory_constraints(objects, BUILD_TIMES))
                       
-    return E
+    return E if isinstance(B, NNFBackend) else B
+
+def expand_profiles(solution, cohort_profiles):
+    """
+    Assigns the timetable of every encoded profile variant to the students it stands for.
+
+    Args:
+        solution (dict): The solution of a theory built with profiles, None if it is unsatisfiable.
+        cohort_profiles (list): The Profile objects the theory was built with.
+
+    Returns:
+        dict: The solution with the course, term and section enrolments of every student, None if unsatisfiable.
+    """
+    represented = {variant: members[1:] for profile in cohort_profiles for variant, weight, members in profile.variants if weight > 1}
+    if solution is None or len(represented) == 0:
+        return solution
+
+    copies = {
+        StudentEnrolledCourse: lambda student, prop: StudentEnrolledCourse(student, prop.course),
+        StudentEnrolledCourseTerm: lambda student, prop: StudentEnrolledCourseTerm(student, prop.course, prop.term),
+        StudentEnrolledCourseSection: lambda student, prop: StudentEnrolledCourseSection(student, prop.course, prop.term, prop.section),
+    }
+    expanded = dict(solution)
+    for prop, value in solution.items():
+        copy = copies.get(type(prop))
+        if copy is not None and prop.student in represented:
+            for student in represented[prop.student]:
+                expanded[copy(student, prop)] = value
+    return expanded
 
 #EXECUTER               
-def execute(objects):
+def prepare_theory(objects, backend="nnf", encodings=None, offerings=None, conflict_encoding="auto", cohort_profiles=None, workers=1, stream=False, preprocess=False):
     """
-    Creates and attempts to compile the theory. If successful, returns the theory and its solution.
+    Builds the theory and prepares it to be solved: a "cnf" theory is simplified, a bauhaus theory is compiled.
 
     Args:
-        objects (dict): A dictionary of datalayer collections.
-        
+        See build_theory().
+        preprocess (bool, optional): Preprocess the clauses of a "cnf" theory before it is solved, see preprocessing.py.
+            Otherwise only the constants of the unit clauses are propagated.
+
     Returns:
-        dict: A dictionary containing the compiled bauhaus theory and its solution.
+        CNFEncoding or nnf.And: The theory, the compiled bauhaus theory in CNF or the CNFEncoding.
     """
-    
-    T = build_theory(objects)
+    T = build_theory(objects, backend, encodings, offerings, conflict_encoding, cohort_profiles, workers, stream)
+
+    if backend == "cnf":
+        if T.clause_count == 0:
+            if T.stream is not None:
+                T.stream.remove()
+            utils.warn(f"The theory has no clauses: Does the student wish to take any courses?")
+            raise SystemExit()
+        if T.stream is None:
+            T.simplify(preprocessing.TECHNIQUES if preprocess else ["propagate"]) #propagate the constants pinned by unit clauses before the theory is written out
+        return T
     
     # Don't compile until you're finished adding all your constraints!
     try:
         # Your code that may raise the ValueError
         T = T.compile()
+        #every custom constraint of E is the conjunction of the clauses of a backend, merging them lets nnf solve the
+        #theory as CNF without converting it again
+        T = nnf.And(clause for clauses in T.children for clause in clauses.children)
     except ValueError as ve:
         if len(objects["students"]) == 1 and len(next(iter(objects["students"])).course_wish_list) == 0:
             utils.warn(f"Caught a ValueError During CompileTime: Does the student wish to take any courses?")
@@ -836,8 +1473,186 @@ def execute(objects):
         utils.warn(f"Caught a ValueError During CompileTime: Does the student wish to take any courses?")
         raise SystemExit()
     
-    return {"Theory": T, "Solution": T.solve()}
-    
+    return T
+
+def submit_theory(T, executor=None):
+    """
+    Solves a theory prepared by prepare_theory() in a worker process of an executor, or right away without one.
+
+    Args:
+        T (CNFEncoding or nnf.And): The theory.
+        executor (executor.SolverExecutor or executor.Session, optional): The executor solving the theory.
+
+    Returns:
+        concurrent.futures.Future: The future of the solution, always returned. Its result is None if the theory is unsatisfiable.
+    """
+    if executor is not None:
+        return executor.submit(T)
+    future = futures.Future()
+    future.set_result(T.solve())
+    return future
+
+def solve_theory(objects, backend="nnf", encodings=None, offerings=None, conflict_encoding="auto", cohort_profiles=None, workers=1, stream=False, preprocess=False, executor=None):
+    """
+    Builds and solves the theory.
+
+    Args:
+        See prepare_theory().
+        executor (executor.SolverExecutor or executor.Session, optional): Solve the theory in a worker process of an
+            executor, the solve is cancelled if waiting for it is interrupted. Otherwise it is solved in this thread.
+
+    Returns:
+        tuple: The theory (the compiled bauhaus theory or the CNFEncoding) and its solution, None if unsatisfiable.
+    """
+    T = prepare_theory(objects, backend, encodings, offerings, conflict_encoding, cohort_profiles, workers, stream, preprocess)
+    return T, executor.solve(T) if executor is not None else T.solve()
+
+def find_cohort_profiles(objects, multiplicity=False):
+    """
+    Returns the Profile objects of the students of a cohort encoded once, none without multiplicity, see profiles.py.
+    """
+    return profiles.find_profiles(objects["students"], reciprocal_friendships(objects["students"]), objects.get("groups")) if multiplicity else []
+
+def solve_cohort(objects, backend="nnf", encodings=None, offerings=None, conflict_encoding="auto", multiplicity=False, workers=1, stream=False, preprocess=False, executor=None):
+    """
+    Builds and solves the theory of a cohort, with multiplicity the students of identical profiles are encoded once. If
+    the multiplicity theory is unsatisfiable it is solved again with every student encoded.
+
+    Args:
+        See execute().
+
+    Returns:
+        tuple: The theory and its solution with the enrolments of every student, None if unsatisfiable.
+    """
+    cohort_profiles = find_cohort_profiles(objects, multiplicity)
+    T, S = solve_theory(objects, backend, encodings, offerings, conflict_encoding, cohort_profiles, workers, stream, preprocess, executor)
+    if S is None and len(cohort_profiles) > 0:
+        #the weights of the variants can not express every split of a profile, solve again with every student encoded
+        E.clear_constraints()
+        cohort_profiles = []
+        T, S = solve_theory(objects, backend, encodings, offerings, conflict_encoding, workers=workers, stream=stream, preprocess=preprocess, executor=executor)
+    return T, expand_profiles(S, cohort_profiles)
+
+def solve_components(objects, parts, backend="nnf", encodings=None, offerings=None, conflict_encoding="auto", multiplicity=False, workers=1, stream=False, preprocess=False, executor=None):
+    """
+    Builds and solves a theory for every part of a cohort and merges their solutions, see decomposition.py. The parts
+    are solved until one of them is unsatisfiable. With an executor the theory of a part is solved by a worker process
+    while the theories of the next parts are built, the solutions are merged as they are found and the theories still
+    being solved are cancelled once a part is unsatisfiable.
+
+    Args:
+        objects (dict): A dictionary of datalayer collections.
+        parts (list): The students of every part, see decomposition.pack().
+        See execute() for the other arguments.
+
+    Returns:
+        tuple: The decomposition.ComponentTheories of the parts solved and the merged solution, None if unsatisfiable.
+    """
+    global STATISTICS
+    report = encoding_report.EncodingReport(backend)
+    theories = []
+    solution = {}
+    submitted = [] #the cohort, the profiles, the theory and the future of the solution of every part not merged yet
+
+    def solved(block=False):
+        #the parts not merged yet that are solved, waits until one is solved if block is set
+        if block:
+            futures.wait([future for cohort, cohort_profiles, T, future in submitted], return_when=futures.FIRST_COMPLETED)
+        return [part for part in submitted if part[3].done()]
+
+    def merge(cohort, cohort_profiles, T, future):
+        nonlocal solution
+        S = future.result()
+        if S is None and len(cohort_profiles) > 0:
+            #the weights of the variants can not express every split of a profile, solve again with every student encoded
+            E.clear_constraints()
+            cohort_profiles = []
+            T, S = solve_theory(cohort, backend, encodings, offerings, conflict_encoding, workers=workers, stream=stream, preprocess=preprocess, executor=executor)
+            report.merge(STATISTICS)
+        theories.append(T)
+        if S is None:
+            solution = None
+        else:
+            solution.update(expand_profiles(S, cohort_profiles))
+
+    try:
+        for students in parts:
+            names = {student.name for student in students}
+            groups = [group for group in (objects.get("groups") or []) if any(member.name in names for member in group.members)]
+            cohort = {**objects, "students": students, "groups": groups}
+            E.clear_constraints()
+            cohort_profiles = find_cohort_profiles(cohort, multiplicity)
+            T = prepare_theory(cohort, backend, encodings, offerings, conflict_encoding, cohort_profiles, workers, stream, preprocess)
+            report.merge(STATISTICS)
+            submitted.append((cohort, cohort_profiles, T, submit_theory(T, executor)))
+            for part in solved():
+                if solution is not None:
+                    submitted.remove(part)
+                    merge(*part)
+            if solution is None:
+                break
+        while solution is not None and len(submitted) > 0:
+            for part in solved(block=True):
+                if solution is not None:
+                    submitted.remove(part)
+                    merge(*part)
+    finally:
+        for cohort, cohort_profiles, T, future in submitted:
+            future.cancel()
+    STATISTICS = report
+    return decomposition.ComponentTheories(theories), solution
+
+#EXECUTER               
+def execute(objects, backend="nnf", encodings=None, screen=True, conflict_encoding="auto", multiplicity=False, workers=1, stream=False, preprocess=False, decompose=False, executor=None):
+    """
+    Creates and attempts to compile the theory. If successful, returns the theory and its solution.
+
+    Args:
+        objects (dict): A dictionary of datalayer collections.
+        backend (str, optional): The encoding backend, "nnf" (bauhaus) or "cnf" (integer clauses solved by kissat directly).
+        encodings (dict, optional): The cardinality encoding of each constraint family, see cardinality.DEFAULT_FAMILIES.
+        screen (bool, optional): Screen the cohort for wished courses that can never be taken before building the theory,
+            see screening.py. If any are found the theory is not built and the solution is None.
+        conflict_encoding (str, optional): The time conflict encoding, "pairwise", "slot" or "auto", see conflicts.py.
+        multiplicity (bool, optional): Encode the students with identical profiles once, see profiles.py. If the theory is
+            unsatisfiable it is solved again with every student encoded. Off by default, the variants do not express every
+            split of a profile.
+        workers (int, optional): The number of worker processes the theory is built with, see build_theory().
+        stream (bool, optional): Stream the clauses of a "cnf" theory into a DIMACS file, see build_theory().
+        preprocess (bool, optional): Preprocess the clauses of a "cnf" theory before it is solved, see solve_theory().
+        decompose (bool, optional): Build and solve a theory for every independent component of the cohort, see
+            decomposition.py. The "Theory" is then a decomposition.ComponentTheories if there is more than one part.
+        executor (executor.SolverExecutor or executor.Session, optional): Solve the theories in the worker processes of
+            an executor instead of this thread, see executor.py. The parts of a decomposed cohort are solved while the
+            next ones are built. A solve that is cancelled raises concurrent.futures.CancelledError.
+        
+    Returns:
+        dict: A dictionary containing the compiled bauhaus theory and its solution, the screened impossible courses, the
+            pruned terms and sections, the encoding_report.EncodingReport of the theory (None if it was not built) and
+            the number of students of every theory solved.
+    """
     
+    offerings = pruning.prune(objects)
+    impossible = screening.screen(objects, offerings=offerings) if screen else []
+    if len(impossible) > 0:
+        for impossibility in impossible:
+            utils.warn(str(impossibility))
+        return {"Theory": None, "Solution": None, "Screening": impossible, "Pruned": offerings.pruned, "Statistics": None, "Components": []}
+
+    parts = [list(objects["students"])]
+    if decompose:
+        components = decomposition.interaction_components(objects, offerings, reciprocal_friendships(objects["students"]))
+        #the students without wished courses add no constraints to any theory
+        components = [component for component in components if any(len(list(student.course_wish_list)) > 0 for student in component)]
+        if len(components) > 1:
+            parts = decomposition.pack(components)
+
+    if len(parts) > 1:
+        T, S = solve_components(objects, parts, backend, encodings, offerings, conflict_encoding, multiplicity, workers, stream, preprocess, executor)
+    else:
+        T, S = solve_cohort(objects, backend, encodings, offerings, conflict_encoding, multiplicity, workers, stream, preprocess, executor)
+
+    return {"Theory": T, "Solution": S, "Screening": impossible, "Pruned": offerings.pruned, "Statistics": STATISTICS, "Components": [len(part) for part in parts]}
+
 if __name__ == "__main__":
     pass
\ No newline at end of file
@@ -0,0 +1,319 @@
+import datalayer
+
+"""
+Static Pre-SAT Feasibility Screening
+
+Every course on a student's wish list must be taken (see sat_solver CONSTRAINT 10), so a single wished course that can
+never be taken makes the whole theory unsatisfiable. Many of these cases can be decided from the data layer alone,
+before any proposition is created, and reported with a reason instead of a bare "No Solutions":
+- The course is not offered in any term, or every section of the course is full.
+- Every section of the course was pruned because it conflicts with a course that must be taken in the same term (see pruning.py).
+- The students wishing for the course outnumber the seats left in all of its sections.
+- An exclusion rule is broken by a completed course.
+- A prerequisite or corequisite rule can not be met by the completed and wished courses.
+
+The requirement rules are evaluated with the same leaf values sat_solver forces on the CheckCourse*Exists propositions,
+in three-valued logic so that a course is only reported when the rule is decided without the solver.
+
+The catalog requirement graph has an edge from every course to the courses of its prerequisite, corequisite and
+exclusion rules. Nodes are numbered densely and the transitive closure of every node is precomputed as a bitset, it
+is used to report the courses a missing prerequisite depends on in turn.
+
+Classes:
+- RequirementGraph: Represents the catalog-wide graph of requirement rules and its transitive closures.
+- Impossibility: Represents a wished course that can statically never be taken.
+
+Functions:
+- screen_student(student, graph): Screens the wished courses of a single student.
+- screen(objects, graph): Screens every student of a data layer, including the seats of each course.
+- screening_report(impossibilities): Creates a JSON serializable report of a screening.
+"""
+
+REQUIREMENT_TYPES = ["PREREQUISITE", "COREQUISITE", "EXCLUSION"]
+
+class RequirementGraph:
+    """
+    Represents the catalog-wide directed graph of requirement rules, with an edge from a course to every course of its
+    prerequisite, corequisite or exclusion rule.
+
+    Attributes:
+    - nodes: A dictionary mapping course codes to their dense node id.
+    - codes: A list mapping node ids back to course codes.
+    - edges: A dictionary mapping each requirement type to a list of bitsets, the direct successors of each node.
+    - closures: A dictionary mapping each requirement type to a list of bitsets, the transitive successors of each node.
+    - malformed: A dictionary mapping course codes to the ValueError of their malformed rules.
+
+    Methods:
+    - requires(course_id, type): Returns the course codes in the rule of a course.
+    - closure(course_id, type): Returns the course codes reachable from a course through rules of a type.
+    - is_cyclic(course_id, type): Returns True if a course transitively requires itself.
+    """
+    def __init__(self, requirements):
+        """
+        Builds the graph of a CourseRequirements collection and precomputes its transitive closures.
+
+        Args:
+            requirements (CourseRequirements): The requirements of the catalog, i.e. CourseRequirements.ALLREQUIREMENTS.
+        """
+        self.nodes = {}
+        self.codes = []
+        self.edges = {type: [] for type in REQUIREMENT_TYPES}
+        self.malformed = {}
+
+        for course_requirement in (requirements if requirements is not None else []):
+            node = self._node(course_requirement.id)
+            for type in REQUIREMENT_TYPES:
+                if type not in course_requirement:
+                    continue
+                try:
+                    rule = course_requirement[type].rule
+                except ValueError as error:
+                    self.malformed[course_requirement.id] = error
+                    continue
+                if rule is not None:
+                    for code in rule.courses:
+                        self._add_edge(type, node, self._node(code))
+
+        self.closures = {type: self._close(self.edges[type]) for type in REQUIREMENT_TYPES}
+
+    def _node(self, code):
+        node = self.nodes.get(code)
+        if node is None:
+            node = len(self.codes)
+            self.nodes[code] = node
+            self.codes.append(code)
+            for type in REQUIREMENT_TYPES:
+                self.edges[type].append(0)
+        return node
+
+    def _add_edge(self, type, source, target):
+        self.edges[type][source] |= 1 << target
+
+    @staticmethod
+    def _close(edges):
+        """
+        Computes the transitive closure of every node by propagating the successor bitsets until nothing changes, the
+        number of rounds is bounded by the longest chain of rules.
+        """
+        closures = list(edges)
+        changed = True
+        while changed:
+            changed = False
+            for node, reachable in enumerate(closures):
+                expanded = reachable
+                successors = reachable
+                while successors:
+                    lowest = successors & -successors
+                    expanded |= closures[lowest.bit_length() - 1]
+                    successors ^= lowest
+                if expanded != reachable:
+                    closures[node] = expanded
+                    changed = True
+        return closures
+
+    def _decode(self, bits):
+        codes = []
+        while bits:
+            lowest = bits & -bits
+            codes.append(self.codes[lowest.bit_length() - 1])
+            bits ^= lowest
+        return codes
+
+    def requires(self, course_id, type="PREREQUISITE"):
+        """
+        Returns the course codes in the rule of a course.
+
+        Args:
+            course_id (str): A course code, i.e. "CISC-121".
+            type (str, optional): One of "PREREQUISITE", "COREQUISITE", "EXCLUSION".
+
+        Returns:
+            list: The course codes of the rule, empty if the course has no rule of this type.
+        """
+        node = self.nodes.get(course_id)
+        return [] if node is None else self._decode(self.edges[type][node])
+
+    def closure(self, course_id, type="PREREQUISITE"):
+        """
+        Returns the course codes reachable from a course through rules of a type, i.e. every course that appears in the
+        prerequisite rule of a course, of its prerequisites, and so on.
+
+        Args:
+            course_id (str): A course code, i.e. "CISC-121".
+            type (str, optional): One of "PREREQUISITE", "COREQUISITE", "EXCLUSION".
+
+        Returns:
+            list: The reachable course codes.
+        """
+        node = self.nodes.get(course_id)
+        return [] if node is None else self._decode(self.closures[type][node])
+
+    def is_cyclic(self, course_id, type="PREREQUISITE"):
+        """
+        Returns True if a course transitively requires itself through rules of a type.
+        """
+        node = self.nodes.get(course_id)
+        return node is not None and (self.closures[type][node] >> node) & 1 == 1
+
+    def __str__(self):
+        return f"RequirementGraph: {len(self.codes)} courses, " + ", ".join(f"{sum(bin(bits).count('1') for bits in self.edges[type])} {type.lower()} edges" for type in REQUIREMENT_TYPES)
+
+class Impossibility:
+    """
+    Represents a wished course that can statically never be taken.
+
+    Attributes:
+    - student: The name of the student, None if the course is impossible for every student wishing for it.
+    - course: The course code.
+    - kind: One of "OFFERING", "CAPACITY", "CONFLICT", "SEATS", "EXCLUSION", "PREREQUISITE", "COREQUISITE".
+    - reason: A human-readable reason.
+    """
+    def __init__(self, student, course, kind, reason):
+        self.student = student
+        self.course = course
+        self.kind = kind
+        self.reason = reason
+
+    def to_dict(self):
+        return {"student": self.student, "course": self.course, "kind": self.kind, "reason": self.reason}
+
+    def __str__(self):
+        if self.student is None:
+            return f"{self.course} can not be taken: {self.reason}"
+        return f"{self.student} can not take {self.course}: {self.reason}"
+
+def _has_seat(course):
+    """
+    Returns True if a section of the course has capacity for another student, see sat_solver CONSTRAINT 6.
+    """
+    for term in course.sections.get_term_offerings():
+        for section in course.sections.get_term_collection(term):
+            if section.enrollment_total < section.enrollment_capacity:
+                return True
+    return False
+
+def _seats(course):
+    """
+    Returns the number of seats left in all sections of the course, see sat_solver CONSTRAINT 7.
+    """
+    seats = 0
+    for term in course.sections.get_term_offerings():
+        for section in course.sections.get_term_collection(term):
+            seats += max(0, section.enrollment_capacity - section.enrollment_total)
+    return seats
+
+def _rule(course, type):
+    """
+    Returns the parsed rule of a course, None if the course has no rule or a malformed rule (the builder reports those).
+    """
+    if not isinstance(course.requirements, datalayer.CourseRequirement) or type not in course.requirements:
+        return None
+    try:
+        return course.requirements[type].rule
+    except ValueError:
+        return None
+
+def screen_student(student, graph, offerings=None):
+    """
+    Screens the wished courses of a student, using the leaf values sat_solver forces on the CheckCourse*Exists propositions:
+    - Exclusions: a completed course is present, every other course is forced absent.
+    - Prerequisites: a completed or wished course is present, every other course is forced absent.
+    - Corequisites: a completed, wished or full year (both halves wished) course is present, every other course is absent.
+
+    Args:
+        student (Student): The student to screen.
+        graph (RequirementGraph): The requirement graph of the catalog.
+        offerings (pruning.Offerings, optional): The sections left for the student after pruning.
+
+    Returns:
+        list: An Impossibility for each wished course that can never be taken.
+    """
+    impossible = []
+
+    def excluded(code):
+        return student.has_completed(code)
+
+    def present(code):
+        return student.has_completed(code) or student.wishes_for(code)
+
+    def corequisite_present(code):
+        return present(code) or (student.wishes_for(code+'A') and student.wishes_for(code+'B'))
+
+    for course in student.course_wish_list:
+        if len(course.sections.get_term_offerings()) == 0:
+            impossible.append(Impossibility(student.name, course.id, "OFFERING", "the course is not offered in any term"))
+            continue
+        if not _has_seat(course):
+            impossible.append(Impossibility(student.name, course.id, "CAPACITY", "every section of the course is full"))
+        elif offerings is not None and len(offerings.terms(student, course)) == 0:
+            reasons = [f"{pruned.term} {pruned.reason}" for pruned in offerings.pruned_for(student, course) if pruned.section is None]
+            impossible.append(Impossibility(student.name, course.id, "CONFLICT", "no section is left, " + ", ".join(reasons)))
+
+        rule = _rule(course, "EXCLUSION")
+        if rule is not None and rule.evaluate(excluded) is True:
+            completed = [code for code in rule.courses if excluded(code)]
+            impossible.append(Impossibility(student.name, course.id, "EXCLUSION", f"excluded by {rule} and completed {', '.join(completed)}"))
+
+        rule = _rule(course, "PREREQUISITE")
+        if rule is not None and rule.evaluate(present) is False:
+            missing = [code for code in rule.courses if not present(code)]
+            reason = f"prerequisite {rule} is not met, not completed or wished: {', '.join(missing)}"
+            #the courses the missing prerequisites require in turn, that are not completed either
+            chain = [code for code in dict.fromkeys(code for missing_code in missing for code in graph.closure(missing_code)) if not present(code) and code not in missing]
+            if chain:
+                reason += f" (and would require {', '.join(chain)} first)"
+            impossible.append(Impossibility(student.name, course.id, "PREREQUISITE", reason))
+
+        rule = _rule(course, "COREQUISITE")
+        if rule is not None and rule.evaluate(corequisite_present) is False:
+            missing = [code for code in rule.courses if not corequisite_present(code)]
+            impossible.append(Impossibility(student.name, course.id, "COREQUISITE", f"corequisite {rule} is not met, not completed or wished: {', '.join(missing)}"))
+
+    return impossible
+
+def screen(objects, graph=None, offerings=None):
+    """
+    Screens every student of a data layer before the theory is built. The theory is unsatisfiable if any course is
+    reported, since every wished course must be taken.
+
+    Args:
+        objects (dict): A dictionary of datalayer collections.
+        graph (RequirementGraph, optional): The requirement graph of the catalog, built from objects["requirements"] by default.
+        offerings (pruning.Offerings, optional): The sections left for each student after pruning, see pruning.prune().
+
+    Returns:
+        list: An Impossibility for each wished course that can never be taken.
+    """
+    if graph is None:
+        graph = RequirementGraph(objects.get("requirements"))
+
+    impossible = []
+    wishing = {}
+    for student in objects["students"]:
+        impossible.extend(screen_student(student, graph, offerings))
+        for course in student.course_wish_list:
+            wishing.setdefault(course.id, [course, 0])[1] += 1
+
+    #every student wishing for a course takes exactly one of its sections
+    for course, count in wishing.values():
+        if count > 1 and len(course.sections.get_term_offerings()) > 0:
+            seats = _seats(course)
+            if 0 < seats < count:
+                impossible.append(Impossibility(None, course.id, "SEATS", f"{count} students wish to take the course but only {seats} seats are left"))
+
+    return impossible
+
+def screening_report(impossibilities):
+    """
+    Creates a JSON serializable report of a screening.
+
+    Args:
+        impossibilities (list): The Impossibility objects returned by screen().
+
+    Returns:
+        dict: Whether the cohort passed the screening and the reason for each impossible course.
+    """
+    return {
+        "feasible": len(impossibilities) == 0,
+        "impossible": [impossibility.to_dict() for impossibility in impossibilities],
+    }
@@ -12,9 +12,11 @@ def test_theory():
     objects = utils.create_data_layer()
     result_dict = sat_solver.execute(objects)
     T = result_dict["Theory"]
+    assert T is not None, "No theory was built -- screening decided the cohort can not be solved:\n%s" % "\n".join(str(impossibility) for impossibility in result_dict["Screening"])
+    report = result_dict["Statistics"] #the variables and clauses of every constraint family, see encoding_report.py
 
-    assert len(T.vars()) > EXPECTED_VAR_MIN, "Only %d variables -- your theory is likely not sophisticated enough for the course project." % len(T.vars())
-    assert T.size() > EXPECTED_CONS_MIN, "Only %d operators in the formula -- your theory is likely not sophisticated enough for the course project." % T.size()
+    assert len(T.vars()) > EXPECTED_VAR_MIN, "Only %d variables -- your theory is likely not sophisticated enough for the course project.\n%s" % (len(T.vars()), report)
+    assert T.size() > EXPECTED_CONS_MIN, "Only %d operators in the formula -- your theory is likely not sophisticated enough for the course project.\n%s" % (T.size(), report)
     assert not T.valid(), "Theory is valid (every assignment is a solution). Something is likely wrong with the constraints."
     assert not T.negate().valid(), "Theory is inconsistent (no solutions exist). Something is likely wrong with the constraints."
 
@@ -0,0 +1,140 @@
+import itertools, random
+
+import cardinality
+
+MAX_LITERALS = 8
+MAX_WEIGHTED = 5
+
+class Sink:
+    """
+    A clause sink collecting the clauses of a cardinality encoding, see cardinality.py.
+    """
+    def __init__(self, variables):
+        self.variables = variables
+        self.clauses = []
+
+    def aux(self, count=1):
+        self.variables += count
+        return self.variables - count + 1
+
+    def add_literals(self, literals):
+        self.clauses.append(list(literals))
+
+    def add_clauses(self, clauses, count, units):
+        clause = []
+        for literal in clauses:
+            if literal == 0:
+                self.clauses.append(clause)
+                clause = []
+            else:
+                clause.append(literal)
+
+def satisfiable(clauses, assignment):
+    """
+    Returns True if the clauses have a model extending an assignment of literals, by DPLL with unit propagation.
+    """
+    assignment = set(assignment)
+    while True:
+        unit = None
+        for clause in clauses:
+            if any(literal in assignment for literal in clause):
+                continue
+            free = [literal for literal in clause if -literal not in assignment]
+            if len(free) == 0:
+                return False
+            if len(free) == 1:
+                unit = free[0]
+                break
+            if unit is None:
+                unit = 0 #a clause left to branch on
+        if unit is None:
+            return True
+        if unit != 0:
+            assignment.add(unit)
+            continue
+        clause = next(clause for clause in clauses if not any(literal in assignment for literal in clause))
+        literal = next(literal for literal in clause if -literal not in assignment)
+        return satisfiable(clauses, assignment | {literal}) or satisfiable(clauses, assignment | {-literal})
+
+def check(encoding, n, k, weights=None):
+    """
+    Checks an at-most-k constraint over n literals against the count semantics for every assignment of the literals.
+    """
+    sink = Sink(n)
+    literals = list(range(1, n + 1))
+    cardinality.at_most_k(sink, literals, k, encoding, weights)
+    for values in itertools.product([False, True], repeat=n):
+        count = sum(weight for value, weight in zip(values, weights or [1] * n) if value)
+        assignment = [literal if value else -literal for literal, value in zip(literals, values)]
+        assert satisfiable(sink.clauses, assignment) == (count <= k), \
+            "%s at most %d of %d literals (weights %s) is wrong for %s." % (encoding, k, n, weights, values)
+
+def test_encodings():
+    for encoding in cardinality.ENCODINGS:
+        for n in range(1, MAX_LITERALS + 1):
+            for k in range(n + 1):
+                check(encoding, n, k)
+
+def test_weights():
+    rng = random.Random(0)
+    for encoding in cardinality.ENCODINGS:
+        for n in range(1, MAX_WEIGHTED + 1):
+            weights = [rng.randint(1, 3) for literal in range(n)]
+            for k in range(sum(weights) + 1):
+                check(encoding, n, k, weights)
+
+def test_repeated_literals():
+    #without weights a repeated literal is counted once
+    for encoding in cardinality.ENCODINGS:
+        sink = Sink(2)
+        cardinality.at_most_k(sink, [1, 1, 2], 1, encoding)
+        assert satisfiable(sink.clauses, [1, -2]), "%s counts a repeated literal twice." % encoding
+        assert not satisfiable(sink.clauses, [1, 2]), "%s allows two true literals." % encoding
+
+def test_estimates():
+    #the clause estimates select the encoding, they must match the clauses written
+    for encoding in ["pairwise", "sequential", "totalizer", "commander"]:
+        for n in range(2, MAX_LITERALS + 1):
+            for k in range(1, n) if encoding != "commander" else [1]:
+                sink = Sink(n)
+                cardinality.at_most_k(sink, list(range(1, n + 1)), k, encoding)
+                assert len(sink.clauses) == cardinality.estimate_clauses(encoding, n, k), \
+                    "%s at most %d of %d literals writes %d clauses, estimated %d." % (encoding, k, n, len(sink.clauses), cardinality.estimate_clauses(encoding, n, k))
+
+def batched(test):
+    """
+    Runs a test with every constraint encoded by the numpy encodings of batch.py, the constraints of the tests are
+    smaller than cardinality.BATCH_CLAUSES.
+    """
+    limit = cardinality.BATCH_CLAUSES
+    cardinality.BATCH_CLAUSES = 0
+    try:
+        test()
+    finally:
+        cardinality.BATCH_CLAUSES = limit
+
+def test_batched_encodings():
+    batched(test_encodings)
+
+def test_batched_weights():
+    batched(test_weights)
+
+def test_batched_repeated_literals():
+    batched(test_repeated_literals)
+
+def test_batched_estimates():
+    batched(test_estimates)
+
+def test_batched_clauses():
+    #batch.py writes the clauses of the encodings of cardinality.py, in another order
+    for encoding in ["pairwise", "sequential", "totalizer"]:
+        for n in range(2, MAX_LITERALS + 1):
+            for k in range(1, n) if encoding != "pairwise" else [1]:
+                literals = list(range(1, n + 1))
+                listed = Sink(n)
+                cardinality.at_most_k(listed, literals, k, encoding)
+                buffered = Sink(n)
+                batched(lambda: cardinality.at_most_k(buffered, literals, k, encoding))
+                assert listed.variables == buffered.variables, "%s at most %d of %d literals uses other variables batched." % (encoding, k, n)
+                assert sorted(map(sorted, listed.clauses)) == sorted(map(sorted, buffered.clauses)), \
+                    "%s at most %d of %d literals writes other clauses batched." % (encoding, k, n)
@@ -0,0 +1,104 @@
+import itertools, random
+
+import preprocessing
+
+MAX_VARIABLES = 8
+RANDOM_CLAUSES = 200
+
+def satisfies(model, clauses):
+    return all(any(model[literal] if literal > 0 else not model[-literal] for literal in clause) for clause in clauses)
+
+def models(clauses, variables):
+    """
+    Returns every model of the clauses over the variables 1 to variables, a list of values indexed by the variable.
+    """
+    for values in itertools.product([False, True], repeat=variables):
+        model = [None] + list(values)
+        if satisfies(model, clauses):
+            yield model
+
+def check(clauses, variables, techniques=preprocessing.TECHNIQUES):
+    """
+    Checks that the simplified clauses are satisfiable if and only if the clauses are, and that every model of the
+    simplified clauses is extended into a model of the clauses.
+    """
+    preprocessor = preprocessing.Preprocessor([list(clause) for clause in clauses], variables)
+    preprocessor.run(techniques)
+    satisfiable = any(True for model in models(clauses, variables))
+    extended = 0
+    if not preprocessor.contradiction:
+        for model in models(preprocessor.clauses, variables):
+            extended += 1
+            preprocessor.extend(model)
+            assert satisfies(model, clauses), "%s extends a model of %s into %s, not a model of %s." % (techniques, preprocessor.clauses, model, clauses)
+    assert (extended > 0) == satisfiable, "%s makes %s %s." % (techniques, clauses, "unsatisfiable" if satisfiable else "satisfiable")
+    return preprocessor
+
+def test_substitute():
+    #1 -> 2 -> 3 -> 1 is an equivalence chain, 2 and 3 are replaced by 1 and 4 by the negation of 1
+    clauses = [[-1, 2], [-2, 3], [-3, 1], [1, 4], [-1, -4], [2, 5, 6], [-3, -5], [4, 6]]
+    preprocessor = preprocessing.Preprocessor([list(clause) for clause in clauses], 6)
+    preprocessor.substitute()
+    assert preprocessor.statistics["substitute"] == 3, preprocessor.statistics
+    assert sorted(preprocessor.stack) == [("equivalent", 2, 1), ("equivalent", 3, 1), ("equivalent", 4, -1)], preprocessor.stack
+    assert all(abs(literal) not in (2, 3, 4) for clause in preprocessor.clauses for literal in clause), preprocessor.clauses
+    assert [1, 5, 6] in preprocessor.clauses and [-1, -5] in preprocessor.clauses and [-1, 6] in preprocessor.clauses, preprocessor.clauses
+    check(clauses, 6, ["substitute"])
+    check(clauses, 6)
+
+def test_substitute_contradiction():
+    #1 -> 2 -> -1 -> 3 -> 1, a literal equivalent to its negation
+    clauses = [[-1, 2], [-2, -1], [1, 3], [-3, 1]]
+    preprocessor = preprocessing.Preprocessor([list(clause) for clause in clauses], 3)
+    preprocessor.run(["substitute"])
+    assert preprocessor.contradiction and preprocessor.clauses == [[]], preprocessor.clauses
+    check(clauses, 3)
+
+def test_pure_literal():
+    #3 only occurs positively, it is eliminated first without resolvents and set true only if a clause needs it
+    clauses = [[1, 3], [2, 3], [-1, 2, 4], [1, -2, -4]]
+    preprocessor = preprocessing.Preprocessor([list(clause) for clause in clauses], 4)
+    preprocessor.eliminate()
+    assert preprocessor.stack[0] == ("eliminated", 3, [[1, 3], [2, 3]]), preprocessor.stack
+    assert all(3 not in clause for clause in preprocessor.clauses), preprocessor.clauses
+    for model in models(preprocessor.clauses, 4):
+        preprocessor.extend(model)
+        assert model[3] == (not model[1] or not model[2]), "The pure literal is %s for %s." % (model[3], model)
+    check(clauses, 4, ["eliminate"])
+
+def test_bounded_elimination():
+    #1 occurs least, its 3 clauses are replaced by its 2 resolvents 2 | 3 and 2 | 4
+    clauses = [[1, 2], [-1, 3], [-1, 4], [-2, -3], [2, -4], [-2, 4], [3, -4], [-3, 4]]
+    preprocessor = preprocessing.Preprocessor([list(clause) for clause in clauses], 4)
+    preprocessor.eliminate()
+    assert preprocessor.stack[0] == ("eliminated", 1, [[1, 2]]), preprocessor.stack
+    assert all(1 not in clause and -1 not in clause for clause in preprocessor.clauses), preprocessor.clauses
+    check(clauses, 4, ["eliminate"])
+    check(clauses, 4)
+
+def test_bounded_elimination_skipped():
+    #the 4 clauses of 1 have 4 resolvents of 2 literals, 1 is kept if a resolvent is longer than ELIMINATION_LENGTH
+    clauses = [[1, 2], [1, 3], [-1, 4], [-1, 5]]
+    limit = preprocessing.ELIMINATION_LENGTH
+    preprocessing.ELIMINATION_LENGTH = 1
+    try:
+        preprocessor = preprocessing.Preprocessor([list(clause) for clause in clauses], 5)
+        preprocessor.eliminate()
+    finally:
+        preprocessing.ELIMINATION_LENGTH = limit
+    assert all(variable != 1 for kind, variable, removed in preprocessor.stack), preprocessor.stack
+    check(clauses, 5, ["eliminate"])
+
+def test_random():
+    #random clauses with an equivalence chain, every technique alone and in order
+    rng = random.Random(0)
+    for round in range(RANDOM_CLAUSES):
+        variables = rng.randint(3, MAX_VARIABLES)
+        chain = [variable * rng.choice([1, -1]) for variable in rng.sample(range(1, variables + 1), 3)]
+        clauses = [[-chain[index], chain[(index + 1) % 3]] for index in range(3)]
+        for clause in range(rng.randint(1, 2 * variables)):
+            length = rng.randint(1, 3) if rng.random() < 0.1 else rng.randint(2, 3)
+            clauses.append([variable * rng.choice([1, -1]) for variable in rng.sample(range(1, variables + 1), length)])
+        for technique in preprocessing.TECHNIQUES:
+            check(clauses, variables, [technique])
+        check(clauses, variables)
@@ -0,0 +1,104 @@
+import itertools, json, os
+
+import datalayer
+
+REFERENCE_REQUIREMENTS = os.path.join(os.path.dirname(__file__), "data", "reference", "requirements.json")
+
+class Formula:
+    """
+    A formula over course codes built with the &, | and ~ operators, as bauhaus formulas are by instantiate().
+    """
+    def __init__(self, holds):
+        self.holds = holds #returns the value of the formula in a model
+
+    def __and__(self, other):
+        return Formula(lambda model: self.holds(model) and other.holds(model))
+
+    def __or__(self, other):
+        return Formula(lambda model: self.holds(model) or other.holds(model))
+
+    def __invert__(self):
+        return Formula(lambda model: not self.holds(model))
+
+def parse(criteria):
+    return datalayer.RequirementRule.parse(criteria)
+
+def test_precedence():
+    #NOT binds tighter than AND, and AND binds tighter than OR
+    assert str(parse("CISC-101 OR CISC-121 AND NOT MATH-110")) == "(CISC-101 OR (CISC-121 AND NOT MATH-110))"
+    assert str(parse("(CISC-101 OR CISC-121) AND NOT MATH-110")) == "((CISC-101 OR CISC-121) AND NOT MATH-110)"
+    assert str(parse("NOT (CISC-101 AND CISC-121)")) == "NOT (CISC-101 AND CISC-121)"
+    assert str(parse("CISC-101 AND CISC-121 AND CISC-124")) == "(CISC-101 AND CISC-121 AND CISC-124)"
+    assert str(parse("((CISC-101))")) == "CISC-101"
+
+def test_course_codes():
+    #course codes without a hyphen are normalized to the catalog format
+    rule = parse("MATH110 OR CMPE 333 OR MATH-110B OR CISC-101")
+    assert rule.courses == ["MATH-110", "CMPE-333", "MATH-110B", "CISC-101"], rule.courses
+    assert parse("CISC-101 AND (CISC-121 OR CISC-101)").courses == ["CISC-101", "CISC-121"]
+
+def test_malformed():
+    for criteria in ["(CISC-101 OR CISC-121", "CISC-101 OR CISC-121)", "CISC-101 OR", "AND CISC-101", "CISC-101 CISC-121",
+                     "CISC-101 OR ()", "NOT", "CISC-101 XOR CISC-121", "CISC-1O1", ""]:
+        try:
+            parse(criteria)
+        except ValueError:
+            continue
+        assert False, "The malformed rule '%s' was parsed." % criteria
+
+def test_deferred_error():
+    #a malformed rule is only an error once the rule is used, i.e. for the students that wish to take the course
+    requirement = datalayer.CourseRequirementSpecific("PREREQUISITE", "(CISC-101 OR CISC-121")
+    assert requirement.criteria == "(CISC-101 OR CISC-121"
+    try:
+        requirement.rule
+    except ValueError:
+        pass
+    else:
+        assert False, "A malformed rule did not raise ValueError when used."
+    assert datalayer.CourseRequirementSpecific("PREREQUISITE", "NONE").rule is None
+
+def test_evaluate():
+    #three-valued evaluation: a known result holds for every value of the unknown courses
+    for criteria in ["CISC-101 OR CISC-121 AND NOT MATH-110", "NOT (CISC-101 OR CISC-121) AND MATH-110", "CISC-101 AND NOT CISC-101"]:
+        rule = parse(criteria)
+        for values in itertools.product([True, False, None], repeat=len(rule.courses)):
+            known = dict(zip(rule.courses, values))
+            result = rule.evaluate(known.get)
+            unknown = [course for course in rule.courses if known[course] is None]
+            completions = set()
+            for fill in itertools.product([True, False], repeat=len(unknown)):
+                completion = {**known, **dict(zip(unknown, fill))}
+                completions.add(rule.evaluate(completion.get))
+            assert None not in completions, "'%s' is unknown for %s." % (criteria, completion)
+            if result is not None:
+                assert completions == {result}, "'%s' is %s for %s but not for every value of the unknown courses." % (criteria, result, known)
+            elif len(unknown) == 0:
+                assert False, "'%s' is unknown for %s." % (criteria, known)
+    #a true argument decides an OR and a false argument decides an AND, whatever the unknown courses
+    assert parse("CISC-101 OR CISC-121").evaluate({"CISC-101": None, "CISC-121": True}.get) is True
+    assert parse("CISC-101 AND CISC-121").evaluate({"CISC-101": None, "CISC-121": False}.get) is False
+    assert parse("CISC-101 AND CISC-121").evaluate({"CISC-101": None, "CISC-121": True}.get) is None
+
+def test_instantiate():
+    #the formula of a rule agrees with its evaluation on every assignment
+    for criteria in ["CISC-101 OR CISC-121 AND NOT MATH-110", "NOT (CISC-101 OR NOT CISC-121) AND (MATH-110 OR CISC-101)"]:
+        rule = parse(criteria)
+        formula = rule.instantiate(lambda course: Formula(lambda model: model[course]))
+        for values in itertools.product([True, False], repeat=len(rule.courses)):
+            model = dict(zip(rule.courses, values))
+            assert formula.holds(model) == rule.evaluate(model.get), "'%s' is instantiated wrong for %s." % (criteria, model)
+
+def test_reference_rules():
+    #the printed form of every well-formed rule of the reference catalog parses to the same rule
+    with open(REFERENCE_REQUIREMENTS, "r") as json_file:
+        data = json.load(json_file)
+    for course in data:
+        for requirement in course["requirements"]:
+            if requirement["criteria"] == "NONE" or requirement["type"] not in ["PREREQUISITE", "COREQUISITE", "EXCLUSION"]:
+                continue
+            try:
+                rule = parse(requirement["criteria"])
+            except ValueError:
+                continue #the malformed rules are reported when used
+            assert str(parse(str(rule))) == str(rule), "'%s' does not parse back to the same rule." % rule
@@ -189,17 +189,17 @@ def create_json(solution, objects):
             studentview = StudentView(student.name) #initialize a new StudentView to hold the current Student
             
             for course in student.course_wish_list:
-                if solution[sat_solver.StudentEnrolledCourse(student, course)]:
+                if solution.get(sat_solver.StudentEnrolledCourse(student, course), False):
                     offered_terms = course.sections.get_term_offerings()
                     
                     for term in offered_terms: #loop over "WINTER", "SUMMER", "FALL" terms depending on course offering
                         termview = TermView(str(term)) #initialize a new TermView to hold the current Term
                         
-                        if solution[sat_solver.StudentEnrolledCourseTerm(student, course, term)]:
+                        if solution.get(sat_solver.StudentEnrolledCourseTerm(student, course, term), False):
                             term_offerings = course.sections.get_term_collection(term) #get course term offerings
                             
                             for section in term_offerings: #get the Section objects from the term_offering
-                                if solution[sat_solver.StudentEnrolledCourseSection(student, course, term, section)]:
+                                if solution.get(sat_solver.StudentEnrolledCourseSection(student, course, term, section), False): #pruned sections are not part of the solution, see pruning.py
 
                                     courseview = CourseView((f"{section.courseid}-{section.class_number}"), section.dates ) #initialize a new CourseView to hold the Section a student is enrolled in
                                     termview.courses.append(courseview)
@@ -0,0 +1,129 @@
+import nnf
+
+"""
+Tseitin Definitions
+
+Encodes the requirement formulas (prerequisites, corequisites and exclusions) with an auxiliary definition variable per
+sub-formula, so the CNF of a rule stays linear in the size of the rule instead of growing with the distribution of AND
+over OR. The encodings only need the var(), aux() and add_literals() methods of an encoding backend, like cardinality.py.
+
+Definitions are hash-consed on their connective and child literals, so a sub-formula that appears for several students
+or courses is defined once. Propositions fixed by a unit clause (i.e. a CheckCoursePrerequisitesExists that is forced
+true because the course was completed) are read as the constants true or false and folded away, so students with the same
+completed and wished courses for a rule share the same definitions.
+"""
+
+class FormulaDefinitions:
+    """
+    Base class of the encoding backends, implements the Tseitin encoding of bauhaus formulas over the var(), aux() and
+    add_literals() methods of the backend. Backends record the unit clauses they add in units.
+
+    Attributes:
+    - definitions: A dictionary mapping (connective, child literals) keys to their definition literal.
+    - units: A dictionary mapping variables fixed by a unit clause to their value.
+
+    Methods:
+    - true(): Returns a literal that is always true.
+    - literal(formula): Returns a literal equivalent to a proposition, a negated proposition or a formula.
+    - add_equivalence(proposition, formula): proposition <-> formula.
+    """
+    _true = None
+
+    def true(self):
+        """
+        Returns a literal that is always true, used for constants, empty conjunctions and empty disjunctions.
+
+        Returns:
+            int: A variable forced true by a unit clause.
+        """
+        if self._true is None:
+            self._true = self.aux()
+            self.add_literals([self._true])
+        return self._true
+
+    def literal(self, formula):
+        """
+        Returns a literal equivalent to a proposition, a negated proposition or a formula.
+
+        Formulas built with the bauhaus operators (&, |, ~, >>) get a definition per connective, a conjunction is defined
+        as the negated disjunction of its negated children.
+
+        Args:
+            formula: A proposition, an nnf.Var, or a bauhaus CustomNNF formula.
+
+        Returns:
+            int: A literal equivalent to the formula.
+        """
+        if isinstance(formula, nnf.Var):
+            literal = self.var(formula.name)
+            return self._constant(literal) if formula.true else -self._constant(literal)
+
+        typ = getattr(formula, "typ", None)
+        if typ is None: #a proposition
+            return self._constant(self.var(formula))
+
+        if typ == "var":
+            return self.literal(formula.args[0])
+        if typ == "not":
+            return -self.literal(formula.args[0])
+        if typ == "imp":
+            return self.define_or([-self.literal(formula.args[0]), self.literal(formula.args[1])])
+        if typ == "and":
+            return -self.define_or([-self.literal(arg) for arg in formula.args])
+        if typ == "or":
+            return self.define_or([self.literal(arg) for arg in formula.args])
+        raise TypeError(f"Can not encode {formula}")
+
+    def _constant(self, variable):
+        """
+        Returns the constant literal of a variable fixed by a unit clause, or the variable itself.
+        """
+        value = self.units.get(variable)
+        if value is None:
+            return variable
+        return self.true() if value else -self.true()
+
+    def define_or(self, literals):
+        """
+        Returns a literal equivalent to the disjunction of literals, defining an auxiliary variable on first use.
+
+        Args:
+            literals (list): The integer literals of the disjunction.
+
+        Returns:
+            int: A literal equivalent to the disjunction.
+        """
+        if self._true is not None:
+            if self._true in literals:
+                return self._true
+            literals = [literal for literal in literals if literal != -self._true]
+
+        literals = sorted(set(literals))
+        if len(literals) == 0:
+            return -self.true()
+        if len(literals) == 1:
+            return literals[0]
+        if any(-literal in literals for literal in literals if literal > 0):
+            return self.true()
+
+        key = ("or", tuple(literals))
+        definition = self.definitions.get(key)
+        if definition is None:
+            definition = self.aux()
+            self.add_literals([-definition] + literals)
+            for literal in literals:
+                self.add_literals([definition, -literal])
+            self.definitions[key] = definition
+        return definition
+
+    def add_equivalence(self, proposition, formula):
+        """
+        proposition <-> formula
+        """
+        variable = self.var(proposition)
+        literal = self.literal(formula)
+        if self._true is not None and abs(literal) == self._true: #the formula is a constant
+            self.add_literals([variable if literal > 0 else -variable])
+            return
+        self.add_literals([-variable, literal])
+        self.add_literals([variable, -literal])
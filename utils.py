@@ -2,11 +2,17 @@ import re
 import datalayer
 import timetableview
 import sat_solver
+import screening
+import estimator
+import executor
 import requests
 import os
 import json
 import pprint
 import importlib
+import time
+import threading
+from concurrent import futures
 
 """
 Contains utility classes and functions for the timetable scheduling SAT solver. 
@@ -135,6 +141,160 @@ def get_solver_port():
         return port
 
 
+def get_encoding_backend_preference():
+    """
+    Reads and returns the user's preference for the encoding backend from the config.json configuration file.
+
+    Returns:
+        str: "nnf" to build a bauhaus theory, or "cnf" to write integer clauses directly. Defaults to "nnf".
+    """
+    with open('config.json', 'r') as config_file:
+        config = json.load(config_file)
+        
+        # Access user preferences
+        backend = config.get('encoding_backend', "nnf")
+        return backend
+
+def get_cardinality_encoding_preferences():
+    """
+    Reads and returns the user's preference for the cardinality encoding of each constraint family from the config.json configuration file.
+
+    Returns:
+        dict: A dictionary mapping constraint families ("term", "section", "capacity", "group") to a cardinality encoding, see cardinality.py.
+    """
+    with open('config.json', 'r') as config_file:
+        config = json.load(config_file)
+        
+        # Access user preferences
+        encodings = config.get('cardinality_encodings', {})
+        return encodings
+
+def get_conflict_encoding_preference():
+    """
+    Reads and returns the user's preference for the time conflict encoding from the config.json configuration file.
+
+    Returns:
+        str: "pairwise", "slot" or "auto", see conflicts.py. Defaults to "auto".
+    """
+    with open('config.json', 'r') as config_file:
+        config = json.load(config_file)
+        
+        # Access user preferences
+        encoding = config.get('conflict_encoding', "auto")
+        return encoding
+
+def get_multiplicity_preference():
+    """
+    Reads and returns the user's preference for encoding students with identical profiles once from the config.json configuration file.
+
+    Returns:
+        bool: True to encode the students with identical profiles once, see profiles.py. Defaults to False.
+    """
+    with open('config.json', 'r') as config_file:
+        config = json.load(config_file)
+        
+        # Access user preferences
+        multiplicity = config.get('multiplicity_encoding', False)
+        return multiplicity
+
+def get_build_workers_preference():
+    """
+    Reads and returns the user's preference for the number of worker processes the theory is built with from the config.json configuration file.
+
+    Returns:
+        int: The number of worker processes the students are sharded across, see sat_solver.build_theory(). Defaults to 1.
+    """
+    with open('config.json', 'r') as config_file:
+        config = json.load(config_file)
+        
+        # Access user preferences
+        workers = config.get('build_workers', 1)
+        return workers
+
+def get_stream_preference():
+    """
+    Reads and returns the user's preference for streaming the clauses of the theory into a DIMACS file from the config.json configuration file.
+
+    Returns:
+        bool: True to write the clauses of a "cnf" theory out as they are encoded, see cnf.DimacsStream. Defaults to False.
+    """
+    with open('config.json', 'r') as config_file:
+        config = json.load(config_file)
+        
+        # Access user preferences
+        stream = config.get('stream_dimacs', False)
+        return stream
+
+def get_preprocessing_preference():
+    """
+    Reads and returns the user's preference for preprocessing the clauses of the theory from the config.json configuration file.
+
+    Returns:
+        bool: True to preprocess the clauses of a "cnf" theory before it is solved, see preprocessing.py. Defaults to False.
+    """
+    with open('config.json', 'r') as config_file:
+        config = json.load(config_file)
+        
+        # Access user preferences
+        preprocess = config.get('cnf_preprocessing', False)
+        return preprocess
+
+def get_decomposition_preference():
+    """
+    Reads and returns the user's preference for solving the independent components of the cohort separately from the config.json configuration file.
+
+    Returns:
+        bool: True to build and solve a theory for every independent component of the cohort, see decomposition.py. Defaults to False.
+    """
+    with open('config.json', 'r') as config_file:
+        config = json.load(config_file)
+        
+        # Access user preferences
+        decompose = config.get('component_decomposition', False)
+        return decompose
+
+def get_solver_workers_preference():
+    """
+    Reads and returns the user's preference for the number of worker processes solving the theories from the config.json configuration file.
+
+    Returns:
+        int: The number of worker processes of the solver executor, see executor.py. Defaults to 0, the theories are solved in the thread of the request.
+    """
+    with open('config.json', 'r') as config_file:
+        config = json.load(config_file)
+        
+        # Access user preferences
+        workers = config.get('solver_workers', 0)
+        return workers
+
+def get_admission_budgets():
+    """
+    Reads and returns the budgets of the admission control of the web app from the config.json configuration file.
+
+    Returns:
+        dict: The budgets of "admission_budgets", the missing ones default to estimator.DEFAULT_BUDGETS.
+    """
+    with open('config.json', 'r') as config_file:
+        config = json.load(config_file)
+        
+        # Access user preferences
+        budgets = config.get('admission_budgets', {})
+        return {**estimator.DEFAULT_BUDGETS, **budgets}
+
+def get_screening_preference():
+    """
+    Reads and returns the user's preference for screening the cohort before building the theory from the config.json configuration file.
+
+    Returns:
+        bool: True to skip building and solving the theory when a wished course can never be taken, see screening.py. Defaults to True.
+    """
+    with open('config.json', 'r') as config_file:
+        config = json.load(config_file)
+        
+        # Access user preferences
+        screen = config.get('static_screening', True)
+        return screen
+
 def get_console_solution_preferences():
     """
     Reads and returns the user's preference for showing propositions in the console from the config.json configuration file.
@@ -199,21 +359,38 @@ def display_course_selection(sol, objects):
     for student in students:
         course_collection = {datalayer.Term.FALL: [], datalayer.Term.WINTER: [], datalayer.Term.SUMMER: []}
         for course in student.course_wish_list:
-            if sol[sat_solver.StudentEnrolledCourse(student, course)]:
+            if sol.get(sat_solver.StudentEnrolledCourse(student, course), False):
                 
                 offered_terms = course.sections.get_term_offerings()
                 for term in offered_terms: #loop over "WINTER", "SUMMER", "FALL" terms depending on course offering
-                    if sol[sat_solver.StudentEnrolledCourseTerm(student, course, term)]:
+                    if sol.get(sat_solver.StudentEnrolledCourseTerm(student, course, term), False):
                         
                         term_offerings = course.sections.get_term_collection(term)#get course term offerings
                         for section in term_offerings: #get the Section objects from the term_offering
-                            if sol[sat_solver.StudentEnrolledCourseSection(student, course, term, section)]:
+                            if sol.get(sat_solver.StudentEnrolledCourseSection(student, course, term, section), False): #pruned sections are not part of the solution, see pruning.py
                                 course_collection[term].append(f"{section.courseid}-{section.class_number}")
                                 
         print(f"{TextColor.HEADER}{student.name}:{TextColor.ENDC} Has been enrolled in {TextColor.HEADER}Fall:{TextColor.OKBLUE}{course_collection[datalayer.Term.FALL]}{TextColor.ENDC}, {TextColor.HEADER}Winter:{TextColor.OKBLUE}{course_collection[datalayer.Term.WINTER]}{TextColor.ENDC}, {TextColor.HEADER}Summer:{TextColor.OKBLUE}{course_collection[datalayer.Term.SUMMER]}{TextColor.ENDC}")
 
 
 
+def display_occupancy_report(report):
+    """
+    Displays the double-booked rooms and instructors and the room utilization of an occupancy report.
+
+    Args:
+        report (dict): A report created by occupancy.occupancy_report().
+    """
+    for term, term_report in report.items():
+        print(f"{TextColor.HEADER}{term}:{TextColor.ENDC}")
+        clashes = term_report["room_clashes"] + term_report["instructor_clashes"]
+        for clash in clashes:
+            print(f"{TextColor.FAIL}  {clash['kind']} {clash['resource']} is double-booked {clash['start']} - {clash['end']}: {clash['sections']}{TextColor.ENDC}")
+        if clashes == []:
+            print(f"{TextColor.OKGREEN}  No double-booked rooms or instructors{TextColor.ENDC}")
+        for room, utilization in sorted(term_report["room_utilization"].items(), key=lambda item: -item[1]):
+            print(f"  {room}: {TextColor.OKBLUE}{utilization:.1%}{TextColor.ENDC}")
+
 def display_timetable_view(solution, objects):
     """
     Displays the timetable view in the web app by creating and sharing the solution data.
@@ -242,22 +419,33 @@ def post_data_to_api(data):
 
 
 
-def parse_sat_test(test_number):
+def parse_sat_test(test_number, study_groups=None, admission=False):
     """
     Parses and solves a SAT test based on the given test number.
 
     Args:
         test_number (int): The id of the test to solve.
+        study_groups (list, optional): The study groups of the request, see sat_solve_request().
+        admission (bool, optional): Estimate the cost of the request and reject, defer or reroute it, see sat_solve_request().
 
     Returns:
-        dict: A dictionary indicating the status and message of the operation.
+        dict: A dictionary indicating the status and message of the operation, with the "screening" report of the cohort
+            (see screening.screening_report()), the encoding "statistics" of every constraint family of the theory (see
+            encoding_report.py) and the "admission" decision if admission is on.
     """
     AllTestCases.ALLTESTIDS
     print(f"{TextColor.OKGREEN}Executing {test_number}{TextColor.ENDC}")
     
     if test_number in AllTestCases.ALLTESTIDS:
-        result = sat_solve_request(test_number)
+        result = sat_solve_request(test_number, study_groups, admission)
         if result != False:
+            A = result.get("Admission")
+            if A is not None and not A.admitted():
+                status = "rejected" if A.decision == "reject" else "deferred"
+                return {"status": status, "message": f"Test number: {test_number} {status}: {A.reason}", "admission": A.to_dict()}
+            if result.get("Cancelled"):
+                return {"status": "cancelled", "message": f"Test number: {test_number} cancelled"}
+
             S = result["Solution"]
             O = result["Objects"]
 
@@ -268,50 +456,216 @@ def parse_sat_test(test_number):
             elif (S is None):
                 post_data_to_api("No Solution")
                 
-            return {"status": "success", "message": f"Test number: {test_number} parsed"}
+            response = {"status": "success", "message": f"Test number: {test_number} parsed", "screening": screening.screening_report(result["Screening"])}
+            if result.get("Statistics") is not None:
+                response["statistics"] = result["Statistics"].to_dict()
+            if A is not None:
+                response["admission"] = A.to_dict()
+            return response
         else:
             return {"status": "failure", "message": f"An error occured while executing the sat solver"}
     
     else:
         return {"status": "failure", "message": f"Test number: {test_number} does not exists"}
 
-def sat_solve_request(test_number):
+def estimate_sat_test(test_number, study_groups=None):
+    """
+    Estimates the cost of a SAT test and the admission decision of a request to solve it, without solving it.
+
+    Args:
+        test_number (int): The id of the test to estimate.
+        study_groups (list, optional): The study groups of the request, see sat_solve_request().
+
+    Returns:
+        dict: A dictionary indicating the status of the operation, with the "admission" decision.
+    """
+    if test_number not in AllTestCases.ALLTESTIDS:
+        return {"status": "failure", "message": f"Test number: {test_number} does not exists"}
+
+    decision = estimator.defer(busy_seconds(), get_admission_budgets())
+    if decision is None:
+        with QueuedRequest(test_number): #the data layer is loaded in turn, see QueuedRequest
+            objects = create_data_layer(AllTestCases.ALLTESTS[test_number].location)
+            if study_groups is not None:
+                objects["groups"] = datalayer.mapStudyGroups(study_groups)
+            estimate = estimator.estimate(objects, get_encoding_backend_preference(), get_multiplicity_preference())
+        decision = estimator.admit(estimate, get_admission_budgets())
+        ESTIMATES[test_number] = estimate.seconds(decision.settings.get("backend"))
+    return {"status": "success", "message": f"Test number: {test_number} estimated", "admission": decision.to_dict()}
+
+#the requests waiting for their turn or being built and solved, in the order they arrived, see QueuedRequest
+QUEUE = []
+QUEUE_CHANGED = threading.Condition()
+
+#the predicted seconds of the last request of every test case, see busy_seconds()
+ESTIMATES = {}
+
+class QueuedRequest:
+    """
+    A request waiting in QUEUE for its turn, used as a context manager around loading the data layer, building and
+    solving the theory of the request. The data layer and the theory are module globals of datalayer and sat_solver that
+    every request reloads, so only the request at the head of the queue runs and the others wait in the order they
+    arrived.
+
+    Attributes:
+    - test_number: The id of the test of the request.
+    - seconds: The predicted seconds to build and solve the request, the last estimate of its test case until the
+      request is estimated, 0 if the test case was never estimated.
+    - start: The time the request reached the head of the queue, None while it waits.
+    - cancelled: True if the request was cancelled while it waited, see cancel_sat_test(). Entering the context then
+      raises concurrent.futures.CancelledError.
+    """
+    def __init__(self, test_number):
+        self.test_number = test_number
+        self.seconds = ESTIMATES.get(test_number, 0.0)
+        self.start = None
+        self.cancelled = False
+
+    def __enter__(self):
+        with QUEUE_CHANGED:
+            QUEUE.append(self)
+            QUEUE_CHANGED.wait_for(lambda: self.cancelled or QUEUE[0] is self)
+            if self.cancelled:
+                raise futures.CancelledError()
+            self.start = time.time()
+        return self
+
+    def __exit__(self, *error):
+        with QUEUE_CHANGED:
+            QUEUE.remove(self)
+            QUEUE_CHANGED.notify_all()
+        return False
+
+def busy_seconds():
+    """
+    Returns the predicted seconds until the requests queued or being solved are done, None if there are none.
+    """
+    with QUEUE_CHANGED:
+        if len(QUEUE) == 0:
+            return None
+        now = time.time()
+        return sum(max(0.0, queued.start + queued.seconds - now) if queued.start is not None else queued.seconds for queued in QUEUE)
+
+#the solver executor of the request at the head of QUEUE, cancel_sat_test() cancels its solves from the other threads
+EXECUTOR = None
+
+def solver_executor():
+    """
+    Returns the solver executor of the requests with get_solver_workers_preference() worker processes, started on first
+    use and restarted if the number of workers changes. None if the theories are solved in the thread of the request.
+    """
+    global EXECUTOR
+    workers = get_solver_workers_preference()
+    if EXECUTOR is not None and EXECUTOR.workers != workers:
+        EXECUTOR.shutdown(wait=False)
+        EXECUTOR = None
+    if EXECUTOR is None and workers > 0:
+        EXECUTOR = executor.SolverExecutor(workers)
+    return EXECUTOR
+
+def cancel_sat_test(test_number):
+    """
+    Cancels the requests of a SAT test: the requests waiting in QUEUE are removed, and the solves of the request being
+    solved are cancelled and their kissat processes killed. A solve can only be cancelled if it is solved by the worker
+    processes of solver_executor().
+
+    Args:
+        test_number (int): The id of the test.
+
+    Returns:
+        dict: A dictionary indicating the status of the operation and the number of requests and theories "cancelled".
+    """
+    with QUEUE_CHANGED:
+        waiting = [queued for queued in QUEUE if queued.test_number == test_number and queued.start is None]
+        for queued in waiting:
+            queued.cancelled = True
+            QUEUE.remove(queued)
+        QUEUE_CHANGED.notify_all()
+        running = any(queued.test_number == test_number and queued.start is not None for queued in QUEUE)
+    if running and EXECUTOR is None:
+        return {"status": "failure", "message": f"Test number: {test_number} {len(waiting)} queued requests cancelled, solves can only be cancelled with \"solver_workers\" set in config.json", "cancelled": len(waiting)}
+    solves = EXECUTOR.cancel(test_number) if EXECUTOR is not None else 0
+    return {"status": "success", "message": f"Test number: {test_number} {len(waiting)} queued requests and {solves} solves cancelled", "cancelled": len(waiting) + solves}
+
+def sat_solve_request(test_number, study_groups=None, admission=False):
     """
     Requests a solution to a SAT problem based on the given test number.
 
     Args:
         test_number (int): The test number for which the SAT problem is to be solved.
+        study_groups (list, optional): The study groups of the request, replacing the study groups of the test case.
+            A list of dictionaries with the "name", "members" and "courses" of each group, see datalayer.mapStudyGroups().
+        admission (bool, optional): Defer the request if the requests queued ahead of it take longer than the
+            "busy_seconds" of get_admission_budgets(), then estimate its cost once it is its turn and compare it to the
+            budgets, see estimator.defer() and estimator.admit(). A rejected or deferred request is not solved, a
+            rerouted request is solved with the settings of the decision instead of the configured ones.
+
+    The requests are built and solved one at a time in the order they arrive, see QueuedRequest. The theories are solved
+    by the worker processes of solver_executor() if "solver_workers" is set, labelled with the test number so they can
+    be cancelled by cancel_sat_test().
 
     Returns:
         dict or bool: The result dictionary containing the solution and objects if successful, or False if an error occurs.
+            With admission on, the estimator.Admission of the request is under "Admission" and the "Solution" of a
+            request that is not admitted is None. The "Solution" of a cancelled request is None and "Cancelled" is True.
     """
-    try:
-        importlib.reload(sat_solver) #on each request rest the data layer and the sat_solver to clean data
-        importlib.reload(datalayer)
-        importlib.reload(timetableview)
-        datalayer.data = None
-        datalayer.Courses.ALLCOURSES = None
-        datalayer.Students.ALLSTUDENTS = None
-        datalayer.Sections.ALLSECTIONS = None
-        datalayer.CourseRequirements.ALLREQUIREMENTS = None
-        datalayer.Friends.ALLFRIENDS = None
-
-        if datalayer.data == None or datalayer.testid != test_number:
-            objects = create_data_layer(AllTestCases.ALLTESTS[test_number].location)
-            datalayer.testid = test_number
-            datalayer.data = objects
-        else:
-            datalayer.testid = test_number
-            objects = datalayer.data
-
-        objects = create_data_layer(AllTestCases.ALLTESTS[test_number].location)
+    decision = None
+    objects = None
+    if admission:
+        decision = estimator.defer(busy_seconds(), get_admission_budgets())
+        if decision is not None:
+            print(f"{TextColor.OKBLUE}{decision}{TextColor.ENDC}")
+            return {"Solution": None, "Objects": None, "Admission": decision}
 
-        result_dict = sat_solver.execute(objects)
-        result_dict["Objects"] = objects
+    try:
+        with QueuedRequest(test_number) as queued:
+            importlib.reload(sat_solver) #on each request rest the data layer and the sat_solver to clean data
+            importlib.reload(datalayer)
+            importlib.reload(timetableview)
+            datalayer.data = None
+            datalayer.Courses.ALLCOURSES = None
+            datalayer.Students.ALLSTUDENTS = None
+            datalayer.Sections.ALLSECTIONS = None
+            datalayer.CourseRequirements.ALLREQUIREMENTS = None
+            datalayer.Friends.ALLFRIENDS = None
+            datalayer.StudyGroups.ALLGROUPS = None
+
+            if datalayer.data == None or datalayer.testid != test_number:
+                objects = create_data_layer(AllTestCases.ALLTESTS[test_number].location)
+                datalayer.testid = test_number
+                datalayer.data = objects
+            else:
+                datalayer.testid = test_number
+                objects = datalayer.data
 
-        if result_dict["Solution"] is not None and get_webapp_preferences() is True:
-            display_course_selection(result_dict["Solution"], result_dict["Objects"])
-        return result_dict
+            objects = create_data_layer(AllTestCases.ALLTESTS[test_number].location)
+            if study_groups is not None:
+                objects["groups"] = datalayer.mapStudyGroups(study_groups)
+
+            backend = get_encoding_backend_preference()
+            stream = get_stream_preference()
+            if admission:
+                estimate = estimator.estimate(objects, backend, get_multiplicity_preference())
+                decision = estimator.admit(estimate, get_admission_budgets())
+                print(f"{TextColor.OKBLUE}{estimate}\n{decision}{TextColor.ENDC}")
+                if not decision.admitted():
+                    return {"Solution": None, "Objects": objects, "Admission": decision}
+                backend = decision.settings.get("backend", backend)
+                stream = decision.settings.get("stream", stream)
+                queued.seconds = ESTIMATES[test_number] = estimate.seconds(backend)
+
+            pool = solver_executor()
+            result_dict = sat_solver.execute(objects, backend, get_cardinality_encoding_preferences(), get_screening_preference(), get_conflict_encoding_preference(), get_multiplicity_preference(), get_build_workers_preference(), stream, get_preprocessing_preference(), get_decomposition_preference(), pool.session(test_number) if pool is not None else None)
+            result_dict["Objects"] = objects
+            if decision is not None:
+                result_dict["Admission"] = decision
+
+            if result_dict["Solution"] is not None and get_webapp_preferences() is True:
+                display_course_selection(result_dict["Solution"], result_dict["Objects"])
+            return result_dict
+    except futures.CancelledError:
+        print(f"{TextColor.WARNING}Test number: {test_number} cancelled{TextColor.ENDC}")
+        return {"Solution": None, "Objects": objects, "Admission": decision, "Cancelled": True}
     except Exception as e:
         print(f"{TextColor.FAIL}{e}{TextColor.ENDC}")
         return False
@@ -331,7 +685,7 @@ def create_data_layer(datalocation="default"):
         datalocation (str, optional): The location containing the json. Defaults to "default" and reads location from config.json.
 
     Returns:
-        dict: a dictionary containting the Courses, Departments, Students, Requirements data objects
+        dict: a dictionary containting the Courses, Departments, Students, Requirements, Sections and StudyGroups data objects
     """
     
     if datalocation != "default":
@@ -342,6 +696,7 @@ def create_data_layer(datalocation="default"):
         departments_file_path = os.path.join(datalocation, "departments.json")
         students_file_path = os.path.join(datalocation, "students.json")
         requirements_file_path =os.path.join(datalocation, "requirements.json")
+        study_groups_file_path = os.path.join(datalocation, "study_groups.json") #optional
         
         
     else:
@@ -356,6 +711,7 @@ def create_data_layer(datalocation="default"):
         departments_file_path = config['departments_file']
         students_file_path = config['students_file']
         requirements_file_path = config['requirements_file']
+        study_groups_file_path = config.get('study_groups_file') #optional
 
     #create data set
     all_courses = datalayer.mapCourses(courses_file_path)
@@ -363,9 +719,10 @@ def create_data_layer(datalocation="default"):
     all_students = datalayer.mapStudents(students_file_path)
     all_departments = datalayer.mapDepartments(departments_file_path)
     all_requirements = datalayer.mapRequirements(requirements_file_path)
+    all_groups = datalayer.mapStudyGroups(study_groups_file_path if study_groups_file_path is not None and os.path.exists(study_groups_file_path) else [])
     
     # Set the Module-level attribute to a dictionary containing all data sets
-    data = {"courses": all_courses, "departments": all_departments, "students": all_students, "requirements": all_requirements, "sections": all_sections}
+    data = {"courses": all_courses, "departments": all_departments, "students": all_students, "requirements": all_requirements, "sections": all_sections, "groups": all_groups}
 
 
     return data
@@ -6,8 +6,21 @@ import json
 """
 Defines a Flask API for parsing requested SAT solver test cases.
 Includes a route "/parse-test" that accepts POST requests with a JSON payload containing a
-test case number.
+test case number, and optionally the study groups of the request: a list of groups with a "name",
+the "members" (student names) and the "courses" (course ids) the members take together.
 The API then executes the SAT solver using the test case id.
+
+The requests are built and solved one at a time in the order they arrive, Flask serves them on threads but the data
+layer and the theory are module globals (see utils.QueuedRequest). Every request is admitted before its theory is built
+(see estimator.py): a request that would wait longer than "busy_seconds" for the requests queued ahead of it is
+deferred with 503 and a Retry-After header, a request predicted to exceed the "admission_budgets" of config.json is
+rejected with 413, and a request too long for the configured backend is rerouted to cheaper settings. The "admission"
+of the response holds the decision and the estimate.
+The "statistics" of the response report what every constraint family adds to the theory, see encoding_report.py.
+The route "/estimate-test" returns the estimate and the decision of a test case without solving it.
+The route "/cancel-test" cancels the requests of a test case still waiting for their turn. With "solver_workers" set in
+config.json the theories are solved by a pool of worker processes (see executor.py), and the solves of the request
+being solved are cancelled too. A cancelled "/parse-test" request answers 409.
 """
 
 app = Flask(__name__)
@@ -19,7 +32,31 @@ def handle_parse_test():
     data = request.get_json()
     if 'test_case' in data:
         test_number = data['test_case']
-        response = utils.parse_sat_test(int(test_number))
+        response = utils.parse_sat_test(int(test_number), data.get('study_groups'), admission=True)
+        if response["status"] == "rejected":
+            return jsonify(response), 413
+        if response["status"] == "deferred":
+            return jsonify(response), 503, {"Retry-After": str(response["admission"]["retry_after"])}
+        if response["status"] == "cancelled":
+            return jsonify(response), 409
+        return jsonify(response)
+    else:
+        return jsonify({"status": "error", "message": "test_number not provided"}), 400
+
+@app.route('/estimate-test', methods=['POST'])
+def handle_estimate_test():
+    data = request.get_json()
+    if 'test_case' in data:
+        response = utils.estimate_sat_test(int(data['test_case']), data.get('study_groups'))
+        return jsonify(response)
+    else:
+        return jsonify({"status": "error", "message": "test_number not provided"}), 400
+
+@app.route('/cancel-test', methods=['POST'])
+def handle_cancel_test():
+    data = request.get_json()
+    if 'test_case' in data:
+        response = utils.cancel_sat_test(int(data['test_case']))
         return jsonify(response)
     else:
         return jsonify({"status": "error", "message": "test_number not provided"}), 400